@@ -0,0 +1,177 @@
+"""
+Timing and memory benchmarks of the efficiency and plotting stages on synthetic files.
+
+For every number of events, a synthetic grid is written with synth.py and each stage
+is timed (best of --repeat runs) and run once more under tracemalloc for its peak
+memory. Results go to a JSON file that can serve as a baseline: with --compare, stages
+slower than the baseline by more than --tolerance are reported and the exit code is 1.
+"""
+
+import os, sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import tracemalloc
+
+import synth
+import numpy as np
+import uproot
+import matplotlib
+matplotlib.use("Agg")
+
+from llptrig import effs as trigger_effs
+from llptrig.utils.TrigUtils import genFileName
+from llptrig.utils.LLPTrigUtils import compute_efficiencies, findBestTrig
+from llptrig.utils.LLPTrigPlotting import plot_efficiencies
+
+class Grid:
+    """Synthetic grid of one size and what the stages need to run on it."""
+    def __init__(self, data_dir, n_events, n_l1, n_hlt, masses, channel="s", mDark=10, ctau=1):
+        self.data_dir, self.n_events, self.masses, self.channel, self.mDark, self.ctau = data_dir, n_events, masses, channel, mDark, ctau
+        synth.write_grid(data_dir, n_events, masses, [mDark], [ctau], channel, n_l1=n_l1, n_hlt=n_hlt)
+        self.l1 = [name for name in synth.trigger_names(n_l1, n_hlt) if name.startswith("L1_")]
+        self.interest = self.l1[:2]
+        self.template = os.path.join(data_dir, genFileName("{}", mDark, ctau, channel=channel))
+        self.effs_dict = None
+        self.signal = None
+
+def stage_compute_efficiencies(grid):
+    grid.effs_dict = compute_efficiencies(grid.interest, grid.data_dir, grid.masses, [grid.mDark], [grid.ctau], grid.channel, "L1", unprescaled=grid.l1)
+
+def stage_compute_efficiencies_table(grid):
+    compute_efficiencies(grid.interest, grid.data_dir, grid.masses, [grid.mDark], [grid.ctau], grid.channel, "L1", unprescaled=grid.l1, engine="table")
+
+def stage_find_best_trig(grid):
+    arrays = uproot.open(grid.template.format(grid.masses[0]))["Events"].arrays(filter_name="L1_*")
+    findBestTrig(arrays, grid.l1, exclude=grid.interest)
+
+def stage_get_effs(grid):
+    trigger_effs.get_effs(grid.template, grid.masses[0], np.array(grid.l1))
+
+def stage_get_effs_streamed(grid):
+    trigger_effs.get_effs(grid.template, grid.masses[0], np.array(grid.l1), step_size="50 MB")
+
+def setup_plot_efficiencies(grid):
+    if grid.effs_dict is None: stage_compute_efficiencies(grid)
+
+def stage_plot_efficiencies(grid):
+    outdir = tempfile.mkdtemp()
+    try:
+        plot_efficiencies(grid.effs_dict, grid.masses, [grid.ctau], [grid.mDark], grid.interest, outdir=outdir, outfname="bench")
+    finally:
+        shutil.rmtree(outdir, ignore_errors=True)
+
+def setup_plot_eff(grid):
+    if grid.signal is None:
+        grid.signal = {"name": "bench", "legname": "bench", "masses": grid.masses, "template": grid.template, "xlabel": "Mass [GeV]"}
+        trigger_effs.get_effs_sig(grid.signal, np.array(grid.l1))
+
+def stage_plot_eff(grid):
+    from llptrig import plots as trigger_plots
+    cwd = os.getcwd()
+    outdir = tempfile.mkdtemp()
+    try:
+        os.chdir(outdir)
+        trigger_plots.plot_eff(grid.signal, "axol1tl_score", "best+AD", "BESTandAD", {"loc": "best"}, "both")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(outdir, ignore_errors=True)
+
+STAGES = {
+    "compute_efficiencies": stage_compute_efficiencies,
+    "compute_efficiencies_table": stage_compute_efficiencies_table,
+    "findBestTrig": stage_find_best_trig,
+    "get_effs": stage_get_effs,
+    "get_effs_streamed": stage_get_effs_streamed,
+    "plot_efficiencies": stage_plot_efficiencies,
+    "plot_eff": stage_plot_eff,
+}
+
+# inputs of a stage that are computed before it is timed, so that only the stage itself is measured
+SETUP = {
+    "plot_efficiencies": setup_plot_efficiencies,
+    "plot_eff": setup_plot_eff,
+}
+
+def measure(stage, grid, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage(grid)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    stage(grid)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"time_s": min(times), "times_s": times, "peak_mb": peak / 1024**2}
+
+def run(events, stages, n_l1, n_hlt, masses, repeat, data_dir=None):
+    results = []
+    for n_events in events:
+        grid_dir = tempfile.mkdtemp(dir=data_dir)
+        try:
+            print("writing {} events x {} samples".format(n_events, len(masses)))
+            grid = Grid(grid_dir, n_events, n_l1, n_hlt, masses)
+            for name in stages:
+                if name in SETUP: SETUP[name](grid)
+                result = measure(STAGES[name], grid, repeat)
+                result.update({"stage": name, "events": n_events, "l1": n_l1, "hlt": n_hlt, "samples": len(masses)})
+                print("{:>22} {:>9} events: {:8.3f} s, {:8.1f} MB peak".format(name, n_events, result["time_s"], result["peak_mb"]))
+                results.append(result)
+        finally:
+            shutil.rmtree(grid_dir, ignore_errors=True)
+    return results
+
+def environment():
+    import awkward
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "numpy": np.__version__,
+        "awkward": awkward.__version__,
+        "uproot": uproot.__version__,
+        "matplotlib": matplotlib.__version__,
+    }
+
+def compare(results, baseline, tolerance):
+    """Stages that got slower than the baseline by more than tolerance, as (stage, events, ratio)."""
+    reference = {(r["stage"], r["events"], r["l1"], r["hlt"], r["samples"]): r["time_s"] for r in baseline["results"]}
+    slower = []
+    for r in results:
+        key = (r["stage"], r["events"], r["l1"], r["hlt"], r["samples"])
+        if key not in reference: continue
+        ratio = r["time_s"] / reference[key]
+        print("{:>22} {:>9} events: {:5.2f}x baseline".format(r["stage"], r["events"], ratio))
+        if ratio > 1 + tolerance: slower.append((r["stage"], r["events"], ratio))
+    return slower
+
+if __name__=="__main__":
+    from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+
+    parser = ArgumentParser(formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("-n", "--events", type=int, nargs="+", default=[1000, 100000], help="events per file, one benchmark round per value (1k to 10M)")
+    parser.add_argument("--stages", type=str, nargs="+", default=list(STAGES), choices=list(STAGES), help="stages to benchmark")
+    parser.add_argument("--l1", type=int, default=300, help="number of L1_* branches")
+    parser.add_argument("--hlt", type=int, default=600, help="number of HLT_* branches")
+    parser.add_argument("--masses", type=int, nargs="+", default=[100, 500, 1000], help="mMed values, i.e. number of samples of the grid")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="timed runs per stage, the fastest is kept")
+    parser.add_argument("-o", "--output", type=str, default="benchmark.json", help="output JSON file")
+    parser.add_argument("--data-dir", type=str, default=None, help="directory for the synthetic files (system temp directory if not given)")
+    parser.add_argument("--compare", type=str, default=None, help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown with respect to the baseline")
+    args = parser.parse_args()
+
+    results = run(args.events, args.stages, args.l1, args.hlt, args.masses, args.repeat, args.data_dir)
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    print("results written to", args.output)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            slower = compare(results, json.load(f), args.tolerance)
+        for stage, n_events, ratio in slower:
+            print("REGRESSION: {} at {} events is {:.2f}x slower than the baseline".format(stage, n_events, ratio))
+        if slower: sys.exit(1)
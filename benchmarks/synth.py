@@ -0,0 +1,92 @@
+"""
+Synthetic NanoAOD-like files for benchmarking, named like TrigUtils.genFileName.
+
+Trigger bits are independent Bernoulli branches with per-branch rates. AD scores
+have a body below the loosest built-in threshold and an exponential tail fixed by
+two working points of ADThresholds.thresholds, so that zero-bias-like files
+(signal_tail=None) reproduce the nominal rates of those cuts, while signal files put
+a larger fraction signal_tail of events in the tail.
+"""
+
+import os
+import itertools
+import numpy as np
+import uproot
+
+from llptrig.utils.TrigUtils import genFileName
+from llptrig.utils.ADThresholds import bunch_crossing_rate, thresholds, ranges
+
+def tail_model(ad_key, bx_rate_khz=None):
+    """(start, fraction, slope) of the exponential tail of an AD score, from its loosest and tightest working points."""
+    bx_rate_khz = bunch_crossing_rate() if bx_rate_khz is None else bx_rate_khz
+    if ad_key in thresholds and len(thresholds[ad_key]) > 1:
+        points = sorted((cut, rate / bx_rate_khz) for rate, cut in thresholds[ad_key].items())
+        (c_lo, f_lo), (c_hi, f_hi) = points[0], points[-1]
+    else:
+        # no working points, put the 10 kHz and 1 kHz cuts at 50% and 80% of the plotted range
+        lo, hi = ranges[ad_key]
+        (c_lo, f_lo), (c_hi, f_hi) = (lo + 0.5 * (hi - lo), 10 / bx_rate_khz), (lo + 0.8 * (hi - lo), 1 / bx_rate_khz)
+    return c_lo, f_lo, (c_hi - c_lo) / np.log(f_lo / f_hi)
+
+def ad_scores(rng, ad_key, n, signal_tail=None):
+    start, fraction, slope = tail_model(ad_key)
+    fraction = fraction if signal_tail is None else signal_tail
+    tail = rng.random(n) < fraction
+    scores = start * rng.beta(2, 5, n)
+    scores[tail] = start + rng.exponential(slope, np.count_nonzero(tail))
+    return scores.astype(np.float32)
+
+def trigger_names(n_l1, n_hlt):
+    return ["L1_Bench{}".format(i) for i in range(n_l1)] + ["HLT_Bench{}".format(i) for i in range(n_hlt)]
+
+def write_sample(path, n_events, n_l1=300, n_hlt=600, ad_keys=None, signal_tail=0.05, jets=False, seed=0, chunk=1_000_000):
+    """Writes one synthetic file of n_events in chunks, so memory stays flat up to 10M events."""
+    ad_keys = list(ranges) if ad_keys is None else ad_keys
+    rng = np.random.default_rng(seed)
+    names = trigger_names(n_l1, n_hlt)
+    # a handful of busy paths and a long tail of rare ones, like a real menu
+    rates = np.clip(rng.lognormal(np.log(0.02), 1.5, len(names)), 1e-4, 0.9)
+    branches = {name: np.bool_ for name in names}
+    branches.update({ad_key: np.float32 for ad_key in ad_keys})
+    if jets: branches["Jet_pt"] = "var * float32"
+    with uproot.recreate(path) as f:
+        for start in range(0, n_events, chunk):
+            n = min(chunk, n_events - start)
+            data = {name: rng.random(n) < rate for name, rate in zip(names, rates)}
+            for ad_key in ad_keys:
+                data[ad_key] = ad_scores(rng, ad_key, n, signal_tail)
+            if jets:
+                import awkward as ak
+                counts = rng.poisson(3, n)
+                data["Jet_pt"] = ak.unflatten(rng.exponential(50, counts.sum()).astype(np.float32), counts)
+            if start == 0: f.mktree("Events", branches)
+            f["Events"].extend(data)
+    return names
+
+def write_grid(out_dir, n_events, mMed_lst=(100, 500, 1000), mDark_lst=(10,), ctau_lst=(1,), channel="s", **kwargs):
+    """Writes one file per grid point, returns their paths keyed by (ctau, mDark, mMed)."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for i, (ctau, mDark, mMed) in enumerate(itertools.product(ctau_lst, mDark_lst, mMed_lst)):
+        paths[(ctau, mDark, mMed)] = os.path.join(out_dir, genFileName(mMed, mDark, ctau, channel=channel))
+        write_sample(paths[(ctau, mDark, mMed)], n_events, seed=i, **kwargs)
+    return paths
+
+if __name__=="__main__":
+    from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+
+    parser = ArgumentParser(formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("-o", "--outdir", type=str, required=True, help="directory of the synthetic files")
+    parser.add_argument("-n", "--events", type=int, default=10000, help="events per file")
+    parser.add_argument("--l1", type=int, default=300, help="number of L1_* branches")
+    parser.add_argument("--hlt", type=int, default=600, help="number of HLT_* branches")
+    parser.add_argument("--masses", type=int, nargs="+", default=[100, 500, 1000], help="mMed values of the grid")
+    parser.add_argument("--mdark", type=int, nargs="+", default=[10], help="mDark values of the grid")
+    parser.add_argument("--ctau", type=int, nargs="+", default=[1], help="ctau values of the grid")
+    parser.add_argument("--channel", type=str, default="s", help="channel in the file names")
+    parser.add_argument("--signal-tail", type=float, default=0.05, help="fraction of events in the AD score tail (negative for zero-bias rates)")
+    parser.add_argument("--jets", default=False, action="store_true", help="also write a jagged Jet_pt branch")
+    args = parser.parse_args()
+
+    write_grid(args.outdir, args.events, args.masses, args.mdark, args.ctau, args.channel,
+               n_l1=args.l1, n_hlt=args.hlt, signal_tail=None if args.signal_tail < 0 else args.signal_tail, jets=args.jets)
@@ -0,0 +1,7 @@
+"""Same as `llptrig thresholds`, kept for existing commands (needs the package installed, pip install -e .)."""
+import sys
+
+from llptrig.cli import main
+
+if __name__=="__main__":
+    main(["thresholds"] + sys.argv[1:])
@@ -12,6 +12,9 @@ signals = []
 for chan, mDark, ctau in itertools.product(channel, mDark_lst, ctau_lst):
     signal = {
         "name": chan + "chan", 
+        "channel": chan,
+        "ctau": ctau,
+        "mDark": mDark,
         "legname": r"${}$-channel".format(chan),
         "masses": mMed_lst,
         "template": template.format(chan, "{}", mDark, ctau),
@@ -0,0 +1,4 @@
+"""
+Command-line layer of the LLP trigger studies, run as `llptrig <command>` (see cli.py).
+The analysis code itself lives in llptrig.utils.
+"""
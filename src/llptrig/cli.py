@@ -0,0 +1,51 @@
+"""
+The llptrig command: llptrig <command> [options].
+
+Only the module of the command that is run gets imported, so e.g. the prescale table
+extraction never loads uproot or matplotlib. Each command module provides
+add_arguments(parser) and run(args).
+"""
+
+import sys
+import importlib
+import importlib.util
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter, REMAINDER
+
+COMMANDS = {
+    "effs": ("llptrig.effs", "efficiencies of the signal grid for the unprescaled L1 seeds and AD working points"),
+    "plots": ("llptrig.plots", "efficiency and score distribution plots from the results of effs"),
+    "prescales": ("llptrig.prescales", "HLT prescale table from one or more menu configs"),
+    "thresholds": ("llptrig.thresholds", "AD score thresholds for target rates from zero-bias samples"),
+    "grid": ("llptrig.grid", "efficiencies of the signal grid as checkpointed (signal, mass) tasks on a batch backend"),
+}
+
+def command_parser(name):
+    """Parser of one command, with the options its module adds."""
+    module = importlib.import_module(COMMANDS[name][0])
+    parser = ArgumentParser(prog="llptrig " + name, description=COMMANDS[name][1], formatter_class=ArgumentDefaultsHelpFormatter)
+    module.add_arguments(parser)
+    return module, parser
+
+def run_command(name, argv=None):
+    module, parser = command_parser(name)
+    args = parser.parse_args(argv)
+    return module.run(args)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = ArgumentParser(prog="llptrig", description="LLP trigger efficiency studies")
+    parser.add_argument("command", choices=list(COMMANDS), help="; ".join("{}: {}".format(name, doc) for name, (_, doc) in COMMANDS.items()))
+    parser.add_argument("args", nargs=REMAINDER, help="options of the command (see llptrig <command> -h)")
+    args = parser.parse_args(argv)
+    return run_command(args.command, args.args)
+
+def load_from_file(path, name):
+    """Attribute name of the Python file at path, e.g. the signals list of a signals file."""
+    spec = importlib.util.spec_from_file_location("_llptrig_" + name, path)
+    if spec is None: raise ValueError("Cannot load {} from {}".format(name, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, name)
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,321 @@
+# Credit: Kevin Pedro (FNAL)
+
+import uproot as up
+import numpy as np
+import os
+from collections import defaultdict
+from contextlib import ExitStack
+
+from .utils.ADThresholds import thresholds, ranges
+from .utils.TrigBits import PackedMenu
+from .utils.ADScan import scan_efficiencies
+from .utils.ResultsStore import ResultsStore, signal_key
+from .utils.Incremental import file_fingerprint, fingerprint
+from .utils.Prescales import PrescaleTable, pass_probability
+from .utils.TrigExpr import ExprEvaluator, expr_branches
+from .utils.Hists import Hist1D, Hist2D
+from .utils import Kinematics
+from .utils import Instrument
+from .utils.Instrument import stage, timed
+from .cli import load_from_file
+
+class EffCounts:
+    """
+    Pass counts and histograms of one sample, accumulated over one or more chunks of events.
+    With a prescale table, the expected (prescale-weighted) numbers of events kept by the full
+    menu, alone and ORed with each AD working point, are also accumulated for each lumi column.
+    Extra trigger expressions (see TrigExpr) are counted under their own text, and each (AD key,
+    kinematic variable) pair of hists2d gets a score vs variable Hist2D under "{ad_key}:{variable}".
+    """
+    def __init__(self, keys, ad_keys, prescales=None, columns=None, ps_keys=None, exprs=None, hists2d=None):
+        self.keys = keys
+        self.ad_keys = ad_keys
+        self.exprs = [] if exprs is None else list(exprs)
+        self.pass_exprs = np.zeros(len(self.exprs), dtype=np.int64)
+        self.columns = [] if prescales is None else list(columns)
+        self.ps_keys = [] if prescales is None else list(ps_keys)
+        self.ps_weights = None if prescales is None else prescales.weights(self.ps_keys, self.columns)
+        self.pass_ps = np.zeros(len(self.columns))
+        self.pass_ps_ad = {ad_key: defaultdict(lambda: np.zeros(len(self.columns))) for ad_key in ad_keys}
+        self.denom = 0
+        self.pass_keys = np.zeros(len(keys), dtype=np.int64)
+        self.pass_all = 0
+        # per AD working point: AD alone, AD or any L1, and AD and each L1 seed (gives best+AD once best is known)
+        self.pass_ad = {ad_key: defaultdict(int) for ad_key in ad_keys}
+        self.pass_ad_all = {ad_key: defaultdict(int) for ad_key in ad_keys}
+        self.pass_ad_keys = {ad_key: defaultdict(lambda: np.zeros(len(keys), dtype=np.int64)) for ad_key in ad_keys}
+        self.hists = {ad_key: Hist1D.regular(50, *ranges[ad_key]) for ad_key in ad_keys}
+        self.hists2d = [(ad_key, var) for ad_key, var in (hists2d or []) if ad_key in ad_keys]
+        for ad_key, var in self.hists2d:
+            self.hists["{}:{}".format(ad_key, var)] = Hist2D.regular(50, ranges[ad_key], 50, Kinematics.VARIABLES[var]["range"])
+
+    @timed
+    def fill(self, arrays):
+        # trigger decisions are kept bit-packed, combinations are popcounts of word-wise ORs
+        menu = PackedMenu.from_arrays(arrays, self.keys)
+        self.denom += len(arrays)
+        pass_all = menu.any(self.keys)
+        self.pass_all += menu.count(pass_all)
+        self.pass_keys += menu.counts()
+        if self.columns:
+            # with no enabled path in the file the menu keeps no event, so only the AD seeds have weight
+            if self.ps_keys: prob = pass_probability(PackedMenu.from_arrays(arrays, self.ps_keys), self.ps_weights)
+            else: prob = np.zeros((len(arrays), len(self.columns)))
+            self.pass_ps += prob.sum(axis=0)
+        if self.exprs:
+            # one evaluator per chunk, so sub-expressions shared by the expressions are computed once
+            self.pass_exprs += ExprEvaluator(arrays, menu).counts(self.exprs)
+
+        for ad_key in self.ad_keys:
+            scores = np.asarray(arrays[ad_key])
+            if ad_key in thresholds:
+                for rate,cut in thresholds[ad_key].items():
+                    pass_ad = menu.pack(scores>=cut)
+                    self.pass_ad[ad_key][rate] += menu.count(pass_ad)
+                    self.pass_ad_all[ad_key][rate] += menu.count(pass_ad | pass_all)
+                    self.pass_ad_keys[ad_key][rate] += menu.counts(mask=pass_ad)
+                    if self.columns:
+                        self.pass_ps_ad[ad_key][rate] += np.where((scores>=cut)[:,None], 1.0, prob).sum(axis=0)
+            self.hists[ad_key].fill(scores)
+        variables = {var: Kinematics.compute(arrays, var) for var in dict.fromkeys(var for _, var in self.hists2d)}
+        for ad_key, var in self.hists2d:
+            self.hists["{}:{}".format(ad_key, var)].fill(np.asarray(arrays[ad_key]), variables[var])
+
+    def numerators(self):
+        """Name of the best L1 seed and the numerator of every efficiency."""
+        arg_best = int(np.argmax(self.pass_keys))
+        numers = {"L1": self.pass_all, "best": self.pass_keys[arg_best]}
+
+        for ad_key in self.ad_keys:
+            if ad_key not in thresholds: continue
+            for rate in thresholds[ad_key]:
+                pass_ad = self.pass_ad[ad_key][rate]
+                numers["{}_AD@{}kHz".format(ad_key,rate)] = pass_ad
+                numers["{}_best+AD@{}kHz".format(ad_key,rate)] = pass_ad + self.pass_keys[arg_best] - self.pass_ad_keys[ad_key][rate][arg_best]
+                numers["{}_L1+AD@{}kHz".format(ad_key,rate)] = self.pass_ad_all[ad_key][rate]
+        for expr, numer in zip(self.exprs, self.pass_exprs):
+            numers[expr] = numer
+        numers = {name: int(numer) for name, numer in numers.items()}
+
+        # expected numbers of events under the prescales of each column, not integers
+        for j, column in enumerate(self.columns):
+            numers["L1@{}".format(column)] = float(self.pass_ps[j])
+            for ad_key in self.ad_keys:
+                if ad_key not in thresholds: continue
+                for rate in thresholds[ad_key]:
+                    numers["{}_L1+AD@{}kHz@{}".format(ad_key,rate,column)] = float(self.pass_ps_ad[ad_key][rate][j])
+
+        return self.keys[arg_best], numers
+
+    def result(self, mass):
+        l1_best_name, numers = self.numerators()
+        return l1_best_name, make_effs_array(mass, self.denom, numers), self.hists
+
+def make_effs_array(mass, denom, numers):
+    def get_eff(numer):
+        return float(numer)/float(denom)
+    effs = {"mass": mass}
+    for name, numer in numers.items():
+        effs[name] = get_eff(numer)
+
+    effs_dtype = {"names": list(effs.keys()), "formats": ['f8']*len(effs.keys())}
+    return np.array([tuple(effs.values())],effs_dtype)
+
+@timed
+def get_effs(template, mass, unprescaled, cache=None, step_size=None, prescales=None, columns=None, stager=None, exprs=None, hists2d=None):
+    return count_effs(template, mass, unprescaled, cache=cache, step_size=step_size, prescales=prescales, columns=columns, stager=stager, exprs=exprs, hists2d=hists2d).result(mass)
+
+@timed
+def count_effs(template, mass, unprescaled, cache=None, step_size=None, prescales=None, columns=None, stager=None, exprs=None, hists2d=None):
+    ax_key = "axol1tl_score"
+    ci_keys = ["CICADA_score_v1p1p1","CICADA_score_v1p1p2","CICADA_score_v2p1p1","CICADA_score_v2p1p2"]
+    ad_keys = [ax_key]+ci_keys
+    variables = list(dict.fromkeys(var for _, var in (hists2d or [])))
+    if variables and cache is not None: raise ValueError("Kinematic histograms need the jet branches, which the trigger cache does not hold")
+    with ExitStack() as stack:
+        if cache is None:
+            t = stack.enter_context(up.open(template.format(mass)) if stager is None else stager.open(template.format(mass)))["Events"]
+            available = t.keys()
+        else:
+            # cache all L1 bits so that other trigger lists are served from the same entry
+            cache_filter = ["L1_*"]+ad_keys+[b for b in expr_branches(exprs or []) if not b.startswith("L1_")]
+            with stage("cache"):
+                available = cache.fields(template.format(mass), cache_filter)
+        keys = [b for b in list(unprescaled) if b in available]
+        # account for potentially missing keys
+        ad_keys = [k for k in ad_keys if k in available]
+        # the weighted menu needs every path that is enabled in one of the columns
+        ps_keys = []
+        if prescales is not None:
+            enabled = prescales.weights(columns=columns).any(axis=1)
+            ps_keys = [name for name, on in zip(prescales.names, enabled) if on and name in available]
+        expr_keys = expr_branches(exprs or [])
+        missing = [b for b in expr_keys if b not in available]
+        if missing: raise ValueError("Branches {} used in trigger expressions are not in {}".format(missing, template.format(mass)))
+        kin_keys = Kinematics.branches(variables, available) if variables else []
+        branches = ad_keys + [b for b in dict.fromkeys(keys + ps_keys + expr_keys + kin_keys) if b not in ad_keys]
+
+        counts = EffCounts(keys, ad_keys, prescales, columns, ps_keys, exprs, hists2d)
+        if cache is not None:
+            # chunks are unpacked from the cache one at a time, like the streamed read below
+            for arrays in cache.iterate(template.format(mass), cache_filter, columns=branches, step_size=step_size):
+                counts.fill(arrays)
+        elif step_size is None:
+            counts.fill(Instrument.read_arrays(t, branches))
+        else:
+            # stream the tree so that peak memory does not grow with the file size
+            for arrays in Instrument.iterate_arrays(t, branches, step_size=step_size):
+                counts.fill(arrays)
+
+    return counts
+
+@timed
+def get_effs_scan(template, mass, unprescaled, ad_key, cuts, cache=None):
+    """AD-only, best+AD and L1+AD efficiencies of one sample for an arbitrary array of cuts on ad_key."""
+    if cache is None:
+        t = up.open(template.format(mass))["Events"]
+        keys = [b for b in list(unprescaled) if b in t.keys()]
+        arrays = Instrument.read_arrays(t, [ad_key]+keys)
+    else:
+        available = cache.fields(template.format(mass), ["L1_*", ad_key])
+        keys = [b for b in list(unprescaled) if b in available]
+        arrays = cache.arrays(template.format(mass), ["L1_*", ad_key], columns=[ad_key]+keys)
+
+    menu = PackedMenu.from_arrays(arrays, keys)
+    l1_best_name = keys[int(np.argmax(menu.counts()))]
+    effs = scan_efficiencies(arrays[ad_key], cuts, menu.unpack(menu.row(l1_best_name)), menu.unpack(menu.any(keys)))
+    return l1_best_name, effs
+
+def sample_fingerprint(template, mass, unprescaled, prescales=None, columns=None, exprs=None, hists2d=None):
+    weighted = None if prescales is None else (prescales.names, prescales.weights(columns=columns).tolist())
+    return fingerprint(file_fingerprint(template.format(mass)), sorted(unprescaled), thresholds, ranges, weighted, exprs, hists2d)
+
+@timed
+def get_effs_sig(signal, unprescaled, cache=None, step_size=None, store=None, tag=None, incremental=False, prescales=None, columns=None, stager=None, exprs=None, hists2d=None):
+    """
+    Fills signal["results"], ["hists"] and ["counts"] for every mass. In incremental mode, masses whose
+    file, unprescaled list, thresholds and ranges match the fingerprint in the store are not recomputed.
+    """
+    if incremental and store is None: raise ValueError("Incremental mode needs a results store")
+    print(signal["name"])
+    results = None
+    all_hists = {}
+    all_counts = {}
+    channel, ctau, mDark = signal_key(signal)
+    if incremental:
+        stored_counts = {key[2]: counts for key, counts in store.sample_counts(tag, channel, ctau, mDark).items()}
+        stored_hists = store.hists(tag, channel, ctau, mDark)
+    for mass in signal["masses"]:
+        print(mass)
+        fp = sample_fingerprint(signal["template"], mass, unprescaled, prescales, columns, exprs, hists2d)
+        if incremental and store.fingerprints(tag, channel, ctau, mDark, mass).get("sample") == fp:
+            print("up to date")
+            all_counts[mass] = stored_counts[mass]
+            numers = {name: numer for name, numer in stored_counts[mass].items() if name not in ["denom", "best_name"]}
+            best, effs = stored_counts[mass]["best_name"], make_effs_array(mass, stored_counts[mass]["denom"], numers)
+            hists = {key: val[mass] for key, val in stored_hists.items() if mass in val}
+        else:
+            counts = count_effs(signal["template"], mass, unprescaled, cache=cache, step_size=step_size, prescales=prescales, columns=columns, stager=stager, exprs=exprs, hists2d=hists2d)
+            best, effs, hists = counts.result(mass)
+            all_counts[mass] = dict(denom=counts.denom, best_name=best, **counts.numerators()[1])
+            if store is not None:
+                store.put_sample(tag, channel, ctau, mDark, mass, all_counts[mass])
+                store.put_hists(tag, channel, ctau, mDark, mass, hists)
+                store.put_fingerprints(tag, channel, ctau, mDark, mass, {"sample": fp})
+        print(best)
+        if results is None:
+            results = effs
+        else:
+            results = np.append(results,effs)
+        for key,hist in hists.items():
+            if key not in all_hists: all_hists[key] = {}
+            all_hists[key][mass] = hist
+
+    signal["hists"] = all_hists
+    signal["results"] = results
+    signal["counts"] = all_counts
+
+def write_signal_overlaps(signals, unprescaled, trigs, out_path, cache=None, stager=None):
+    """
+    Writes the TrigOverlap.SampleOverlap of every (signal, mass), keyed by (channel, ctau, mDark, mass): of the
+    unprescaled seeds, or of trigs with the best other unprescaled seed of the sample as reference.
+    """
+    from .utils.BranchPlan import BranchReader
+    from .utils.TrigOverlap import sample_overlap, write_overlaps
+    overlaps = {}
+    with BranchReader(cache, stager=stager) as reader:
+        for signal in signals:
+            for mass in signal["masses"]:
+                data_file = signal["template"].format(mass)
+                if trigs is None:
+                    overlap = sample_overlap(data_file, "L1", unprescaled, entry_stop=None, reader=reader)
+                else:
+                    overlap = sample_overlap(data_file, "L1", trigs, "best", unprescaled, entry_stop=None, reader=reader)
+                overlaps[signal_key(signal) + (mass,)] = overlap
+    write_overlaps(overlaps, out_path)
+    return overlaps
+
+def add_arguments(parser):
+    parser.add_argument("-s", "--signals", type=str, required=True, help="Python file containing list named signals")
+    parser.add_argument("-o", "--output", type=str, required=True, help="suffix for output file")
+    parser.add_argument("-m", "--prescales", type=str, required=True, help="prescale csv path")
+    parser.add_argument("--menu", type=str, default=None, help="menu version to read from a combined prescale table of several menus")
+    parser.add_argument("-c", "--column", type=str, default="2E34", help="lumi column of the prescale table whose unprescaled seeds are used")
+    parser.add_argument("-w", "--weighted", type=str, nargs="+", default=None, help="also compute prescale-weighted L1 and L1+AD efficiencies of the full menu in these lumi columns ('all' for every column)")
+    parser.add_argument("-p", "--path", type=str, required=False, help="directory where the output file will be saved", default=".")
+    parser.add_argument("--cache", type=str, default=None, help="directory of the local trigger bit/AD score cache (disabled if not given)")
+    parser.add_argument("--cache-size", type=float, default=20, help="maximum size of the cache in GB")
+    parser.add_argument("-t", "--thresholds", type=str, default=None, help="thresholds table (JSON) from llptrig thresholds, replacing the built-in cuts of the AD keys it contains")
+    parser.add_argument("-i", "--incremental", default=False, action="store_true", help="only recompute samples whose inputs changed since the last run with the same output")
+    parser.add_argument("--step-size", type=str, default=None, help="stream each file in chunks of this many entries (or size, e.g. '100 MB') instead of reading it at once")
+    parser.add_argument("-x", "--exprs", type=str, nargs="+", default=None, help="extra trigger expressions to count, e.g. 'L1_SingleLLPJet | (axol1tl_score >= 734.8)'")
+    parser.add_argument("--exprs-file", type=str, default=None, help="file with one extra trigger expression per line")
+    parser.add_argument("--hists2d", type=str, nargs="+", default=None, help="2D histograms of an AD score against a kinematic variable ({}), as ad_key:variable".format(", ".join(Kinematics.VARIABLES)))
+    parser.add_argument("--overlaps", type=str, default=None, help="write the pairwise overlaps of the unprescaled L1 seeds of every sample to this file (csv, or npz for the raw matrices)")
+    parser.add_argument("--overlap-trigs", type=str, nargs="+", default=None, help="L1 seeds whose overlaps are written instead, with the best other unprescaled seed of each sample as reference")
+    parser.add_argument("--stage-dir", type=str, default=None, help="local scratch directory that input files are copied to ahead of processing (disabled if not given)")
+    parser.add_argument("--stage-size", type=float, default=50, help="maximum size of the scratch directory in GB")
+    parser.add_argument("--prefetch", type=int, default=2, help="number of files staged ahead of the one being processed")
+    Instrument.add_arguments(parser)
+
+def run(args):
+    with Instrument.session(args):
+        if args.thresholds is not None:
+            from .utils.ADThresholds import load_thresholds
+            thresholds.update(load_thresholds(args.thresholds))
+
+        cache = None
+        if args.cache is not None:
+            from .utils.TrigCache import TrigCache
+            cache = TrigCache(args.cache, max_bytes=int(args.cache_size * 1024**3))
+
+        # get unprescaled triggers
+        prescales = PrescaleTable.from_csv(args.prescales, menu=args.menu)
+        unprescaled = prescales.unprescaled(args.column)
+        columns = None
+        if args.weighted is not None:
+            columns = prescales.columns if args.weighted==["all"] else args.weighted
+   
+        signals = load_from_file(args.signals, "signals")
+        # results are upserted signal by signal, so a partial run keeps what it finished
+        store = ResultsStore(os.path.join(args.path, "trigger_eff_results_{}.sqlite".format(args.output)))
+        step_size = int(args.step_size) if args.step_size is not None and args.step_size.isdigit() else args.step_size
+        exprs = list(args.exprs or [])
+        if args.exprs_file is not None:
+            with open(args.exprs_file) as f:
+                exprs += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        hists2d = [tuple(spec.split(":")) for spec in args.hists2d or []]
+        for ad_key, var in hists2d:
+            if ad_key not in ranges or var not in Kinematics.VARIABLES: raise ValueError("Unknown 2D histogram {}:{}".format(ad_key, var))
+        stager = None
+        if args.stage_dir is not None and cache is None:
+            from .utils.Staging import Stager
+            stager = Stager(args.stage_dir, max_bytes=int(args.stage_size * 1024**3), prefetch=args.prefetch)
+            stager.plan([signal["template"].format(mass) for signal in signals for mass in signal["masses"]])
+        for signal in signals:
+            get_effs_sig(signal, unprescaled, cache=cache, step_size=step_size, store=store, tag=args.output, incremental=args.incremental, prescales=prescales if columns is not None else None, columns=columns, stager=stager, exprs=exprs or None, hists2d=hists2d or None)
+            store.put_signal(args.output, signal)
+        store.close()
+        if args.overlaps is not None:
+            write_signal_overlaps(signals, unprescaled, args.overlap_trigs, args.overlaps, cache, stager)
+        if stager is not None: stager.close()
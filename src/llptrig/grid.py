@@ -0,0 +1,148 @@
+import os
+import numpy as np
+from argparse import ArgumentDefaultsHelpFormatter
+
+from .effs import count_effs, make_effs_array
+from .cli import load_from_file
+from .utils.ADThresholds import thresholds
+from .utils.Prescales import PrescaleTable
+from .utils.ResultsStore import ResultsStore
+from .utils.Hists import as_hist
+from .utils.Scheduler import WorkDir, LocalBackend, CondorBackend, FakeBackend, task_command
+
+def make_tasks(signals):
+    """One task per (signal, mass)."""
+    tasks = []
+    for i, signal in enumerate(signals):
+        for mass in signal["masses"]:
+            task_id = "{:03d}_{}_ctau{}_mDark{}_mMed{}".format(i, signal.get("channel", signal["name"]), signal.get("ctau", 0), signal.get("mDark", 0), mass)
+            tasks.append({"id": task_id, "signal": i, "template": signal["template"], "mass": mass})
+    return tasks
+
+def run_grid_task(config, task):
+    """Counts and histograms of one (signal, mass), as stored in its checkpoint."""
+    if config["thresholds"] is not None:
+        from .utils.ADThresholds import load_thresholds
+        thresholds.update(load_thresholds(config["thresholds"]))
+    cache = None
+    if config["cache"] is not None:
+        from .utils.TrigCache import TrigCache
+        cache = TrigCache(config["cache"], max_bytes=int(config["cache_size"] * 1024**3))
+    prescales = PrescaleTable.from_csv(config["prescales"], menu=config["menu"])
+    columns = config["weighted"]
+    if columns == ["all"]: columns = prescales.columns
+
+    counts = count_effs(task["template"], task["mass"], prescales.unprescaled(config["column"]), cache=cache, step_size=config["step_size"],
+                        prescales=prescales if columns is not None else None, columns=columns)
+    best, numers = counts.numerators()
+    hists = {key: hist.to_dict() for key, hist in counts.hists.items()}
+    return {"counts": dict(denom=counts.denom, best_name=best, **numers), "hists": hists}
+
+def reduce_grid(workdir, output, path="."):
+    """Merges the checkpoints of all tasks into the results store of llptrig effs."""
+    manifest = workdir.manifest()
+    missing = workdir.todo()
+    if missing: raise RuntimeError("{} tasks are not done yet, e.g. {}".format(len(missing), missing[:5]))
+    signals = manifest["config"]["signals"]
+    by_signal = {}
+    for task in manifest["tasks"]:
+        by_signal.setdefault(task["signal"], []).append(task)
+
+    store = ResultsStore(os.path.join(path, "trigger_eff_results_{}.sqlite".format(output)))
+    for i, signal in enumerate(signals):
+        results, all_hists, all_counts = None, {}, {}
+        for task in by_signal.get(i, []):
+            mass, result = task["mass"], workdir.result(task["id"])
+            counts = result["counts"]
+            numers = {name: numer for name, numer in counts.items() if name not in ["denom", "best_name"]}
+            effs = make_effs_array(mass, counts["denom"], numers)
+            results = effs if results is None else np.append(results, effs)
+            for key, hist in result["hists"].items():
+                all_hists.setdefault(key, {})[mass] = as_hist(hist)
+            all_counts[mass] = counts
+        signal["results"], signal["hists"], signal["counts"] = results, all_hists, all_counts
+        store.put_signal(output, signal)
+    store.close()
+    return signals
+
+def print_status(workdir):
+    status = workdir.status()
+    for state in ["done", "failed", "pending"]:
+        print("{}: {}".format(state, sum(s == state for s in status.values())))
+    for task_id, state in status.items():
+        if state == "failed": print("  failed:", task_id)
+
+def add_arguments(parser):
+    subparsers = parser.add_subparsers(dest="grid_command", required=True)
+
+    submit = subparsers.add_parser("submit", formatter_class=ArgumentDefaultsHelpFormatter, help="split the grid into (signal, mass) tasks and submit those not done yet (resumes an existing work directory)")
+    submit.add_argument("-w", "--workdir", type=str, required=True, help="work directory holding the manifest and checkpoints")
+    submit.add_argument("-s", "--signals", type=str, default=None, help="name of Python file containing list named signals (new work directories only)")
+    submit.add_argument("-m", "--prescales", type=str, default=None, help="prescale csv path (new work directories only)")
+    submit.add_argument("--menu", type=str, default=None, help="menu version to read from a combined prescale table")
+    submit.add_argument("-c", "--column", type=str, default="2E34", help="lumi column whose unprescaled seeds are used")
+    submit.add_argument("--weighted", type=str, nargs="+", default=None, help="lumi columns of the prescale-weighted efficiencies ('all' for every column)")
+    submit.add_argument("-t", "--thresholds", type=str, default=None, help="thresholds table (JSON) from llptrig thresholds")
+    submit.add_argument("--cache", type=str, default=None, help="directory of the local trigger bit/AD score cache")
+    submit.add_argument("--cache-size", type=float, default=20, help="maximum size of the cache in GB")
+    submit.add_argument("--step-size", type=str, default=None, help="stream each file in chunks of this many entries (or size, e.g. '100 MB')")
+    submit.add_argument("-b", "--backend", type=str, default="local", choices=["local", "condor", "fake"], help="where the tasks run")
+    submit.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes of the local backend")
+    submit.add_argument("--requirements", type=str, default=None, help="HTCondor requirements expression")
+    submit.add_argument("--dry-run", default=False, action="store_true", help="only write the HTCondor submit file")
+    submit.add_argument("--fail", type=str, nargs="+", default=[], help="task ids the fake backend fails on purpose")
+
+    run_task = subparsers.add_parser("run-task", help="run one task and checkpoint it (used by the batch backends)")
+    run_task.add_argument("workdir", type=str)
+    run_task.add_argument("task_id", type=str)
+
+    status = subparsers.add_parser("status", help="count done, failed and pending tasks")
+    status.add_argument("workdir", type=str)
+
+    reduce = subparsers.add_parser("reduce", formatter_class=ArgumentDefaultsHelpFormatter, help="merge all checkpoints into the results of llptrig effs")
+    reduce.add_argument("workdir", type=str)
+    reduce.add_argument("-o", "--output", type=str, required=True, help="suffix for output file")
+    reduce.add_argument("-p", "--path", type=str, default=".", help="directory where the output file will be saved")
+
+def run(args):
+    if args.grid_command == "run-task":
+        from .utils.Scheduler import run_checkpointed
+        run_checkpointed(run_grid_task, args.workdir, args.task_id)
+
+    elif args.grid_command == "status":
+        print_status(WorkDir(args.workdir))
+
+    elif args.grid_command == "reduce":
+        reduce_grid(WorkDir(args.workdir), args.output, args.path)
+
+    elif args.grid_command == "submit":
+        workdir = WorkDir(args.workdir)
+        if not workdir.exists():
+            if args.signals is None or args.prescales is None: raise SystemExit("a new work directory needs --signals and --prescales")
+            signals = load_from_file(args.signals, "signals")
+            step_size = int(args.step_size) if args.step_size is not None and args.step_size.isdigit() else args.step_size
+            config = {
+                "signals": signals,
+                "prescales": os.path.abspath(args.prescales),
+                "menu": args.menu,
+                "column": args.column,
+                "weighted": args.weighted,
+                "thresholds": None if args.thresholds is None else os.path.abspath(args.thresholds),
+                "cache": None if args.cache is None else os.path.abspath(args.cache),
+                "cache_size": args.cache_size,
+                "step_size": step_size,
+            }
+            workdir.create(config, make_tasks(signals))
+        else:
+            print("resuming", workdir.path)
+
+        todo = workdir.todo()
+        print("submitting {} of {} tasks".format(len(todo), len(workdir.manifest()["tasks"])))
+        if args.backend == "local":
+            backend = LocalBackend(run_grid_task, args.workers)
+        elif args.backend == "condor":
+            backend = CondorBackend(task_command("llptrig", "grid"), args.requirements, args.dry_run)
+        else:
+            backend = FakeBackend(task_command("llptrig", "grid"), args.fail)
+        if todo: backend.submit(workdir, todo)
+        print_status(workdir)
@@ -0,0 +1,313 @@
+# Credit: Kevin Pedro (FNAL)
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib as mpl
+mpl.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.patches import Rectangle
+from .utils.ADThresholds import thresholds
+from .utils.EffUncertainty import eff_intervals, nested_ratio_intervals, BOOTSTRAP_SEED
+from .utils.Hists import Hist2D, as_hist, score_vs_mass
+from .utils.Kinematics import VARIABLES
+from .utils import Instrument
+from .utils.Instrument import stage, timed
+from .cli import load_from_file
+import mplhep as hep
+hep.style.use("CMS")
+
+mpl.rcParams.update({
+    "axes.labelsize" : 18,
+    "legend.fontsize" : 16,
+    "xtick.labelsize" : 14,
+    "ytick.labelsize" : 14,
+    "font.size" : 18,
+    "legend.frameon": True,
+})
+
+markers = ['v','o','^','s','d'] * 2
+
+colors = ["#9c9ca1", "#e42536", "#5790fc", "#964a8b", "#f89c20", "#7a21dd", "#86c8dd", "#228B22", "#FFD700"]
+info = {
+    "axol1tl_score": {"xlabel": "AXOL1TL score", "title": "NN_v3"},
+    "CICADA_score_v1p1p1": {"xlabel": "CICADA score", "title": "v1p1p1"},
+    "CICADA_score_v1p1p2": {"xlabel": "CICADA score", "title": "v1p1p2"},
+    "CICADA_score_v2p1p1": {"xlabel": "CICADA score", "title": "v2p1p1"},
+    "CICADA_score_v2p1p2": {"xlabel": "CICADA score", "title": "v2p1p2"},
+}
+
+def set_rates():
+    for key in info.keys():
+        info[key]["rates"] = list(thresholds[key].keys()) if key in thresholds.keys() else [1, 5, 10]
+
+set_rates()
+
+def make_leg_extra(text):
+    return Rectangle((0, 0), 1, 1, fc="w", fill=False, edgecolor='none', linewidth=0, label=text)
+
+def make_leg(fig, ax,leg_loc,version,signame):
+    leg_extra = [
+        make_leg_extra("{} (124X, L1Nano)".format(version)),
+        make_leg_extra(signame),
+    ]
+    handles, labels = ax.get_legend_handles_labels()
+    handles = leg_extra + handles
+    leg = ax.legend(handles=handles,framealpha=0.5,**leg_loc)
+    if "bbox_to_anchor" in leg_loc: leg.get_frame().set_linewidth(0.0)
+    lctr = 0
+    for handle, label in zip(leg.legend_handles, leg.texts):
+        if lctr>=len(leg_extra): break
+        label.set_ha('left')
+        label.set_position((-1.5*handle.get_window_extent(fig.canvas.get_renderer()).width, 0))
+        lctr += 1
+
+def plot_effs(signal,leg_loc,panels,errors=None,n_boot=1000,seed=BOOTSTRAP_SEED):
+    run_tasks(eff_tasks(signal,leg_loc,panels,errors,n_boot,seed))
+
+def eff_tasks(signal,leg_loc,panels,errors=None,n_boot=1000,seed=BOOTSTRAP_SEED):
+    tasks = []
+    for key in info:
+        tasks.append((plot_eff, (signal,key,"AD","ADonly",leg_loc,panels,errors,n_boot,seed)))
+        tasks.append((plot_eff, (signal,key,"best+AD","BESTandAD",leg_loc,panels,errors,n_boot,seed)))
+        tasks.append((plot_eff, (signal,key,"L1+AD","L1andAD",leg_loc,panels,errors,n_boot,seed)))
+    return tasks
+
+def get_counts(signal,col):
+    numer = np.array([signal["counts"][mass][col] for mass in signal["results"]["mass"]])
+    denom = np.array([signal["counts"][mass]["denom"] for mass in signal["results"]["mass"]])
+    return numer, denom
+
+@timed
+def plot_eff(signal,key,plttype,out,leg_loc,panels,errors=None,n_boot=1000,seed=BOOTSTRAP_SEED):
+    results = signal["results"]
+    # error bars need the raw counts, which results written by older versions do not have
+    errors = errors if "counts" in signal else None
+    columns = ["{}".format("best" if plttype in ["AD", "best+AD"] else "L1")]
+    columns +=  ["{}" + "{}@{}kHz".format(plttype,rate) for rate in info[key]["rates"]]
+
+    if not any(key in col for col in results.dtype.names):
+        return
+
+    heights = [6,3]
+    if panels=="both":
+        fig, axs = plt.subplots(nrows=2, sharex=True, figsize=(10,sum(heights)), gridspec_kw={"height_ratios":heights})
+    else:
+        fig, axs = plt.subplots(nrows=1, figsize=(10,heights[0]))
+        axs = [axs]
+
+    ctr = 0
+    if panels=="both" or panels=="eff":
+        axs[ctr].set_ylabel("Efficiency")
+        axs[ctr].set_ylim(0,1)
+        axs[ctr].grid(True)
+        axs[ctr].grid(which='minor', alpha=0.4, axis='y')
+        axs[ctr].grid(which='major', alpha=0.6, linestyle='-', zorder=-100)
+        if panels=="both": ctr += 1
+
+    if panels=="both" or panels=="ratio":
+        axs[ctr].set_xlabel(signal["xlabel"])
+        if panels=="both":
+            axs[ctr].set_ylabel("{} / {}".format(columns[1].format("").split('@')[0],columns[0]))
+        else:
+            axs[ctr].set_ylabel("Efficiency gain from {}".format(key.split('_')[0].upper()))
+        axs[ctr].grid(True)
+        axs[ctr].grid(which='minor', alpha=0.4, axis='y')
+        axs[ctr].grid(which='major', alpha=0.6, linestyle='-', zorder=-100)
+
+    ratio_min = 1
+    ratio_max = 0
+    for i,col in enumerate(columns):
+        col_leg = col.format("")
+        if '+' in col_leg:
+            col_leg = col_leg.split('+')[1]
+            if panels!="ratio": col_leg = '+'+col_leg
+        col_actual = col.format(key+"_")
+
+        ctr = 0
+        if panels=="both" or panels=="eff":
+            axs[ctr].scatter(
+                results["mass"], results[col_actual],
+                s=200, marker=markers[i], facecolors='none', edgecolors=colors[i], linewidth=3, label=col_leg
+            )
+            if errors is not None:
+                eff, lower, upper = eff_intervals(*get_counts(signal,col_actual), method=errors)
+                axs[ctr].errorbar(results["mass"], eff, yerr=[eff-lower, upper-eff], fmt='none', ecolor=colors[i], linewidth=2)
+            if panels=="both": ctr += 1
+
+        if (panels=="both" or panels=="ratio") and i>0:
+            ratios = results[col_actual]/results[columns[0]]
+            ratio_min = min(ratio_min, min(ratios))
+            ratio_max = max(ratio_max, max(ratios))
+            axs[ctr].scatter(
+                results["mass"], ratios,
+                s=200, marker=markers[i], facecolors='none' if panels=="both" else colors[i], edgecolors=colors[i], linewidth=3, label=col_leg
+            )
+            # best+AD and L1+AD contain their reference, so the ratio uncertainty comes from a correlated bootstrap
+            if errors is not None and plttype!="AD":
+                n_or, denom = get_counts(signal,col_actual)
+                ratios, lower, upper = nested_ratio_intervals(n_or, get_counts(signal,columns[0])[0], denom, n_boot=n_boot, seed=seed)
+                axs[ctr].errorbar(results["mass"], ratios, yerr=[ratios-lower, upper-ratios], fmt='none', ecolor=colors[i], linewidth=2)
+    axs[ctr].set_ylim(ratio_min,ratio_max+(ratio_max-1)*.2)
+
+    make_leg(fig, axs[0], leg_loc, info[key]["title"], signal["legname"])
+
+    plotname = ""
+    if panels=="both":
+        plotname = "_and_ratio"
+    elif panels=="ratio":
+        plotname = "_ratio"
+    hep.cms.label(label="Preliminary", rlabel="", ax=axs[0])
+    with stage("save"):
+        plt.savefig('efficiency{}_{}_{}_{}.pdf'.format(plotname,out,signal["name"],key),bbox_inches='tight')
+    plt.close(fig)
+
+def plot_dists(signal,bkg,leg_loc):
+    run_tasks(dist_tasks(signal,bkg,leg_loc))
+
+def dist_tasks(signal,bkg,leg_loc):
+    tasks = []
+    for key,val in signal["hists"].items():
+        if isinstance(as_hist(next(iter(val.values()))), Hist2D):
+            tasks.append((plot_dist2d, (key,val,signal)))
+            continue
+        bkg_hist = None
+        if bkg is not None and key in bkg["hists"]:
+            bkg_hist = bkg["hists"][key][0]
+        tasks.append((plot_dist, (key,val,signal,leg_loc,bkg_hist)))
+        if len(val) > 1: tasks.append((plot_dist_mass, (key,val,signal)))
+    return tasks
+
+@timed
+def plot_dist(key,hists,signal,leg_loc,bkg=None):
+    fig, ax = plt.subplots(figsize=(10,6))
+    ax.set_xlabel(info[key]["xlabel"])
+    ax.set_ylabel("Arbitrary units")
+    ax.set_yscale("log")
+
+    if bkg is not None:
+        bkg = as_hist(bkg)
+        ax.hist(
+            bkg.edges[:-1], bkg.edges, weights=bkg.counts, histtype="step", density=True,
+            color=colors[0], label="MinBias"
+        )
+    for im,mass in enumerate(signal["masses"]):
+        hist = as_hist(hists[mass])
+        ax.hist(
+            hist.edges[:-1], hist.edges, weights=hist.counts, histtype="step", density=True,
+            color=colors[im+1], label=signal["xlabel"].replace(" [GeV]"," = ")+str(mass)
+        )
+
+    if key in thresholds:
+        for rate,cut in thresholds[key].items():
+            ax.axvline(x=cut, color='k', linestyle='--')
+
+    make_leg(fig, ax, leg_loc, info[key]["title"], signal["legname"])
+
+    hep.cms.label(label="Preliminary", rlabel="", ax=ax)
+
+    with stage("save"):
+        plt.savefig('{}_{}.pdf'.format(key,signal["name"]),bbox_inches='tight')
+    plt.close(fig)
+
+@timed
+def plot_dist2d(key,hists,signal):
+    # key is "{ad_key}:{variable}", one panel per mass
+    ad_key, var = key.split(":")
+    masses = [mass for mass in signal["masses"] if mass in hists]
+    fig, axes = plt.subplots(1, len(masses), figsize=(8*len(masses),6), squeeze=False)
+    for ax,mass in zip(axes[0],masses):
+        hist = as_hist(hists[mass])
+        mesh = ax.pcolormesh(hist.xedges, hist.yedges, np.ma.masked_equal(hist.counts.T, 0), norm=mpl.colors.LogNorm())
+        fig.colorbar(mesh, ax=ax, label="Events")
+        ax.set_xlabel(info[ad_key]["xlabel"])
+        ax.set_ylabel(VARIABLES[var]["xlabel"])
+        ax.set_title(signal["xlabel"].replace(" [GeV]"," = ")+str(mass), fontsize=16)
+        if ad_key in thresholds:
+            for rate,cut in thresholds[ad_key].items():
+                ax.axvline(x=cut, color='k', linestyle='--')
+    with stage("save"):
+        plt.savefig('{}_{}_{}.pdf'.format(ad_key,var,signal["name"]),bbox_inches='tight')
+    plt.close(fig)
+
+@timed
+def plot_dist_mass(key,hists,signal):
+    hist = score_vs_mass(hists, [mass for mass in signal["masses"] if mass in hists])
+    # each mass normalised on its own, as in plot_dist
+    totals = hist.counts.sum(axis=0, keepdims=True)
+    fig, ax = plt.subplots(figsize=(10,6))
+    mesh = ax.pcolormesh(hist.xedges, hist.yedges, np.ma.masked_equal(hist.counts / np.maximum(totals, 1), 0).T, norm=mpl.colors.LogNorm())
+    fig.colorbar(mesh, ax=ax, label="Fraction of events")
+    ax.set_xlabel(info[key]["xlabel"])
+    ax.set_ylabel(signal["xlabel"])
+    if key in thresholds:
+        for rate,cut in thresholds[key].items():
+            ax.axvline(x=cut, color='k', linestyle='--')
+    hep.cms.label(label="Preliminary", rlabel="", ax=ax)
+    with stage("save"):
+        plt.savefig('{}_vs_mass_{}.pdf'.format(key,signal["name"]),bbox_inches='tight')
+    plt.close(fig)
+
+def run_task(func, args):
+    func(*args)
+
+def init_worker(table):
+    # workers started with spawn do not see thresholds loaded in the parent
+    thresholds.clear()
+    thresholds.update(table)
+    set_rates()
+
+def run_tasks(tasks, workers=None):
+    if workers is None:
+        for func, args in tasks:
+            func(*args)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(dict(thresholds),)) as pool:
+        for future in [pool.submit(run_task, func, args) for func, args in tasks]:
+            future.result()
+
+def load_signals(output, path="."):
+    """Signal dicts written by llptrig effs -o output, from its results store or the Python module of older versions."""
+    results_file = os.path.join(path, "trigger_eff_results_{}.sqlite".format(output))
+    if not os.path.exists(results_file):
+        return load_from_file(os.path.join(path, "trigger_eff_results_{}.py".format(output)), "signals")
+    from .utils.ResultsStore import ResultsStore
+    store = ResultsStore(results_file)
+    try:
+        return store.signals(output)
+    finally:
+        store.close()
+
+def add_arguments(parser):
+    parser.add_argument("-o", "--output", type=str, required=True, help="suffix for output file")
+    parser.add_argument("--plots", type=str, default="both", choices=["both","eff","dist"], help="plots to make")
+    parser.add_argument("--panels", type=str, default="both", choices=["both","eff","ratio"], help="panels to show for efficiency plots")
+    parser.add_argument("--leg", type=str, default="side", help="legend location")
+    parser.add_argument("-e", "--errors", type=str, default=None, choices=["wilson","clopper-pearson"], help="draw efficiency uncertainties of this kind")
+    parser.add_argument("--n-boot", type=int, default=1000, help="bootstrap replicates of the ratio uncertainties")
+    parser.add_argument("--seed", type=int, default=BOOTSTRAP_SEED, help="seed of the ratio uncertainty bootstrap")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of processes rendering plots in parallel (serial if not given)")
+    parser.add_argument("-t", "--thresholds", type=str, default=None, help="thresholds table (JSON) from llptrig thresholds, as used for llptrig effs")
+    Instrument.add_arguments(parser)
+
+def run(args):
+    with Instrument.session(args):
+        if args.thresholds is not None:
+            from .utils.ADThresholds import load_thresholds
+            thresholds.update(load_thresholds(args.thresholds))
+            set_rates()
+
+        if args.leg=="side":
+            args.leg = {"loc": "center left", "bbox_to_anchor": (1, 0.5)}
+        else:
+            args.leg = {"loc": args.leg}
+
+        signals = load_signals(args.output)
+        bkg = next((signal for signal in signals if signal["name"]=="bkg"),None)
+        tasks = []
+        for signal in signals:
+            if signal["name"]=="bkg":
+                continue
+            if args.plots=="both" or args.plots=="eff": tasks += eff_tasks(signal,args.leg,args.panels,args.errors,args.n_boot,args.seed)
+            if args.plots=="both" or args.plots=="dist": tasks += dist_tasks(signal,bkg,args.leg)
+        run_tasks(tasks, workers=args.workers)
@@ -0,0 +1,79 @@
+import csv
+import importlib.util
+import os
+import shutil
+import tempfile
+
+from .utils.HLTConfig import read_menus, write_prescales
+
+def extract_relevant_lines(input_file, output_file):
+    with open(input_file, 'r') as infile, open(output_file, 'w') as outfile:
+        for line in infile:
+            if 'process.schedule = cms.Schedule(' in line:
+                break
+            outfile.write(line)
+
+def import_module_from_file(file_path):
+    module_name = os.path.splitext(os.path.basename(file_path))[0]
+    spec = importlib.util.spec_from_file_location(module_name, file_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def main_exec(config_file_path, csv_filename="hlt_prescales.csv"):
+    """Legacy mode: executes the config up to the schedule, which needs CMSSW."""
+    # private directory, so that concurrent runs do not overwrite each other's copy
+    temp_dir = tempfile.mkdtemp()
+    temp_file_path = os.path.join(temp_dir, "temp_config.py")
+
+    try:
+        extract_relevant_lines(config_file_path, temp_file_path)
+
+        # Get process object
+        config_module = import_module_from_file(temp_file_path)
+        process = config_module.process
+
+        if process and hasattr(process, "PrescaleService"):
+            labels = process.PrescaleService.lvl1Labels
+            prescale_entries = process.PrescaleService.prescaleTable
+
+            rows = []
+            header = ["Name"] + [str(label) for label in labels]
+            rows.append(header)
+
+            for entry in prescale_entries:
+                row = [entry.pathName.value()] + list(entry.prescales)
+                rows.append(row)
+
+            # Write to CSV
+            with open(csv_filename, mode='w', newline='') as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerows(rows)
+
+            print(f"CSV file '{csv_filename}' has been created.")
+        else:
+            print("PrescaleService not found in the provided configuration file.")
+
+    finally:
+        # Clean up
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def main(config_paths, output="hlt_prescales.csv", cache_dir=None):
+    tables = read_menus(config_paths, cache_dir)
+    for menu, table in tables.items():
+        print(f"{menu}: {len(table.names)} paths, {len(table.columns)} columns")
+    write_prescales(tables, output)
+    print(f"Prescale table '{output}' has been created.")
+
+def add_arguments(parser):
+    parser.add_argument("config_path", type=str, nargs="+", help="Path to config file(s); several menus are combined into one table with a Menu column")
+    parser.add_argument("-o", "--output", type=str, default="hlt_prescales.csv", help="Output table (.csv, or .parquet which needs pandas)")
+    parser.add_argument("--cache", type=str, default=None, help="Directory caching the tables per config checksum")
+    parser.add_argument("--exec", default=False, action="store_true", help="Execute the config with CMSSW instead of parsing the PrescaleService block (single config only)")
+
+def run(args):
+    if args.exec:
+        if len(args.config_path) > 1: raise SystemExit("--exec takes a single config")
+        main_exec(args.config_path[0], args.output)
+    else:
+        main(args.config_path, args.output, args.cache)
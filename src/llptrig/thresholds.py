@@ -0,0 +1,20 @@
+from .utils.ADThresholds import derive_thresholds, save_thresholds, bunch_crossing_rate
+
+def add_arguments(parser):
+    parser.add_argument("-i", "--input", type=str, nargs="+", required=True, help="zero-bias/MinBias NanoAOD file(s)")
+    parser.add_argument("-o", "--output", type=str, default="thresholds.json", help="output thresholds table (JSON)")
+    parser.add_argument("-r", "--rates", type=float, nargs="+", default=[1, 5, 10], help="target rates in kHz")
+    parser.add_argument("-k", "--keys", type=str, nargs="+", default=["axol1tl_score","CICADA_score_v1p1p1","CICADA_score_v1p1p2","CICADA_score_v2p1p1","CICADA_score_v2p1p2"], help="AD score branches")
+    parser.add_argument("--nbunches", type=int, default=2544, help="number of colliding bunches used for the rate normalisation")
+    parser.add_argument("--bx-rate", type=float, default=None, help="bunch crossing rate in kHz (overrides --nbunches)")
+    parser.add_argument("--step-size", type=str, default="100 MB", help="chunk size used to stream the input")
+
+def run(args):
+    rates = [int(r) if r.is_integer() else r for r in args.rates]
+    bx_rate = args.bx_rate if args.bx_rate is not None else bunch_crossing_rate(args.nbunches)
+    step_size = int(args.step_size) if args.step_size.isdigit() else args.step_size
+
+    table = derive_thresholds(args.input, args.keys, rates, bx_rate_khz=bx_rate, step_size=step_size)
+    for ad_key, cuts in table.items():
+        print(ad_key, cuts)
+    save_thresholds(table, args.output)
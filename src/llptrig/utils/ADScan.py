@@ -0,0 +1,51 @@
+import numpy as np
+
+def scan_thresholds(scores, cuts, flags=None):
+    """
+    Number of events with score >= cut for every cut, from a single sort of the scores.
+    NaN scores never pass a cut, as with a direct comparison. If flags (events, or events x columns, boolean) are given, also returns the number of
+    those events that have each flag set, as a (cuts,) or (cuts x columns) array.
+    """
+    scores = np.asarray(scores)
+    # argsort puts NaN last, so only the first n_valid sorted scores can pass
+    order = np.argsort(scores, kind="stable")
+    n_valid = len(scores) - np.count_nonzero(np.isnan(scores))
+    order = order[:n_valid]
+    idx = np.searchsorted(scores[order], np.asarray(cuts), side="left")
+    n_pass = n_valid - idx
+    if flags is None: return n_pass
+
+    flags = np.asarray(flags, dtype=bool)
+    flags_sorted = flags[order]
+    total = np.count_nonzero(flags_sorted, axis=0)
+    return n_pass, total - _prefix_counts(flags_sorted, idx)
+
+def _prefix_counts(flags_sorted, idx):
+    """Number of set flags among the first idx events, for each idx."""
+    n = len(flags_sorted)
+    inner = np.unique(idx[(idx > 0) & (idx < n)])
+    prefix = np.zeros((len(idx),) + flags_sorted.shape[1:], dtype=np.int64)
+    if len(inner):
+        segments = np.add.reduceat(flags_sorted, np.concatenate([[0], inner]), axis=0, dtype=np.int64)
+        at_inner = np.cumsum(segments, axis=0)[:-1]
+        inner_pos = np.searchsorted(inner, idx)
+        is_inner = (idx > 0) & (idx < n)
+        prefix[is_inner] = at_inner[inner_pos[is_inner]]
+    prefix[idx >= n] = np.count_nonzero(flags_sorted, axis=0)
+    return prefix
+
+def scan_efficiencies(scores, cuts, pass_best, pass_l1):
+    """AD-only, best+AD and L1+AD efficiencies for an array of AD score cuts."""
+    denom = len(scores)
+    n_ad, n_and = scan_thresholds(scores, cuts, np.column_stack([pass_best, pass_l1]))
+    n_best = np.count_nonzero(pass_best)
+    n_l1 = np.count_nonzero(pass_l1)
+    return {
+        "AD": n_ad / denom,
+        "best+AD": (n_ad + n_best - n_and[:, 0]) / denom,
+        "L1+AD": (n_ad + n_l1 - n_and[:, 1]) / denom,
+    }
+
+def scan_rates(scores, cuts, bx_rate_khz):
+    """Rate in kHz of each cut on a zero-bias/MinBias score sample."""
+    return scan_thresholds(scores, cuts) / len(scores) * bx_rate_khz
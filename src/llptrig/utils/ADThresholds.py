@@ -0,0 +1,139 @@
+"""
+Derivation of AD score thresholds for target L1 rates from a zero-bias/MinBias sample.
+
+The rate of a cut is the fraction of zero-bias events passing it times the rate of
+filled bunch crossings. Only the upper tail of the score distribution matters for
+kHz-level rates out of ~28 MHz, so scores are streamed once and only the largest
+values needed for the loosest requested rate are kept. This is exact, unlike a
+generic quantile sketch whose rank error is far larger than these tail fractions.
+"""
+
+import json
+import warnings
+import numpy as np
+from contextlib import ExitStack
+
+from .TrigUtils import uproot_entry_stop
+
+LHC_REVOLUTION_KHZ = 11.2456
+
+# built-in cuts per AD key and rate in kHz, updated in place with load_thresholds() by the commands
+thresholds = {
+    "axol1tl_score": {
+        1: 982.3125,
+        5: 734.8125,
+        10: 610.8125,
+    },
+    "CICADA_score_v1p1p1": {
+        1: 16.575,
+        5: 12.082,
+        10: 10.910,
+    },
+    "CICADA_score_v2p1p1": {
+        1: 11.871,
+        5: 9.296,
+        10: 8.549,
+    },
+    "CICADA_score_v2p1p2": {
+        # 50: 127.0, 
+        # 150: 121.0,
+        # 300: 116.0,
+        20: 131.0,
+        50: 127.0,
+        150: 121.0,
+        300: 116.0,
+        600: 113.0,
+    },
+}
+
+ranges = {
+    "axol1tl_score": (0,3000),
+    "CICADA_score_v1p1p1": (0,25),
+    "CICADA_score_v1p1p2": (0,200),
+    "CICADA_score_v2p1p1": (0,25),
+    "CICADA_score_v2p1p2": (0,200),
+}
+
+def bunch_crossing_rate(n_bunches=2544):
+    """Rate of filled bunch crossings in kHz."""
+    return LHC_REVOLUTION_KHZ * n_bunches
+
+class TailSketch:
+    """Keeps the `capacity` largest values seen so far."""
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.values = np.zeros(0)
+        self.count = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.count += len(values)
+        # NaN would sort above every score; events without a finite score still count in the denominator
+        values = np.concatenate([self.values, values[np.isfinite(values)]])
+        if len(values) > self.capacity:
+            values = np.partition(values, len(values) - self.capacity)[len(values) - self.capacity:]
+        self.values = values
+
+    def merge(self, other):
+        merged = TailSketch(max(self.capacity, other.capacity))
+        merged.update(self.values)
+        merged.update(other.values)
+        merged.count = self.count + other.count
+        return merged
+
+    def cut(self, fraction):
+        """
+        Smallest cut such that a score >= cut keeps at most `fraction` of the events (but at least one
+        event's worth, k = max(floor(fraction * count), 1)). If the k-th largest score is tied with the
+        next one, the cut moves up to the next larger score, so that the realised rate never exceeds the
+        target. It keeps no event at all if the largest scores are all tied.
+        """
+        k = max(int(np.floor(fraction * self.count)), 1)
+        values = np.sort(self.values)[::-1]
+        if k >= len(values):
+            # only a sketch that dropped values can miss the (k+1)-th largest score
+            if len(values) == self.capacity or not len(values): raise ValueError("Sketch capacity {} is too small for a fraction of {}".format(self.capacity, fraction))
+            return float(values[-1])
+        above = values[:k][values[:k] > values[k]]
+        return float(above[-1]) if len(above) else float(np.nextafter(values[k], np.inf))
+
+def derive_thresholds(files, ad_keys, rates, bx_rate_khz=None, step_size="100 MB", entry_stop=None):
+    """
+    Score cuts for each AD key and target rate (in kHz), as a {ad_key: {rate: cut}} table
+    in the same format as the thresholds dict of trigger_effs.
+    """
+    if bx_rate_khz is None: bx_rate_khz = bunch_crossing_rate()
+    if isinstance(files, str): files = [files]
+    entry_stop = uproot_entry_stop(entry_stop)
+    import uproot
+    with ExitStack() as stack:
+        trees = [stack.enter_context(uproot.open(f))["Events"] for f in files]
+        for ad_key in ad_keys:
+            missing = [f for f, t in zip(files, trees) if ad_key not in t.keys()]
+            if missing: warnings.warn("{} is missing from {} of the input files (e.g. {}), no thresholds are derived for it".format(ad_key, len(missing), missing[0]))
+        ad_keys = [k for k in ad_keys if all(k in t.keys() for t in trees)]
+        num_entries = sum(t.num_entries if entry_stop is None else min(entry_stop, t.num_entries) for t in trees)
+
+        capacity = int(np.ceil(max(rates) / bx_rate_khz * num_entries)) + 1
+        sketches = {ad_key: TailSketch(capacity) for ad_key in ad_keys}
+        for t in trees:
+            for arrays in t.iterate(ad_keys, step_size=step_size, entry_stop=entry_stop, library="np"):
+                for ad_key in ad_keys:
+                    sketches[ad_key].update(arrays[ad_key])
+
+    table = {}
+    for ad_key, sketch in sketches.items():
+        table[ad_key] = {rate: sketch.cut(rate / bx_rate_khz) for rate in sorted(rates)}
+    return table
+
+def save_thresholds(table, path):
+    with open(path, "w") as f:
+        json.dump({ad_key: {str(rate): cut for rate, cut in cuts.items()} for ad_key, cuts in table.items()}, f, indent=4)
+
+def load_thresholds(path):
+    """Reads a thresholds table written by save_thresholds, with numeric rates as keys."""
+    with open(path) as f:
+        table = json.load(f)
+    def rate(key):
+        return int(key) if float(key).is_integer() else float(key)
+    return {ad_key: {rate(r): cut for r, cut in cuts.items()} for ad_key, cuts in table.items()}
@@ -0,0 +1,80 @@
+"""
+Minimal branch sets for the efficiency computations.
+
+The best-trigger search only looks at the unprescaled candidates that are not excluded,
+and the efficiencies only at the interest triggers, so everything else in the L1/HLT
+menu never needs to be read. A BranchPlan works out that set from the trigger lists
+before any file is opened, and a BranchReader reads it for every
+sample with one decompression/interpretation thread pool shared across samples.
+"""
+
+import fnmatch
+import uproot
+
+from . import Instrument
+from .TrigUtils import uproot_entry_stop
+
+class BranchPlan:
+    def __init__(self, interestTrigs, unprescaled=(), exclude=(), extra=(), mode=None):
+        self.interest = list(interestTrigs)
+        excluded = set(exclude)
+        self.candidates = [trig for trig in unprescaled if trig not in excluded]
+        self.extra = list(extra)
+        self.mode = mode
+
+    def branches(self, available=None):
+        """Branches to read, in a stable order, restricted to the mode's prefix and to the available branches if given."""
+        names = list(dict.fromkeys(self.interest + self.candidates))
+        if self.mode is not None: names = [name for name in names if name.startswith(self.mode + "_")]
+        names += [name for name in self.extra if name not in names]
+        if available is not None:
+            available = set(available)
+            names = [name for name in names if name in available]
+        return names
+
+    def fraction(self, available):
+        """Fraction of the available branches that the plan reads."""
+        available = list(available)
+        return len(self.branches(available)) / max(len(available), 1)
+
+def _cache_filter(branch):
+    level = branch.split("_", 1)[0]
+    return level + "_*" if level in ["L1", "HLT"] else branch
+
+class BranchReader:
+    """
+    Reads planned branches of many files, through a TrigCache if given. Without a cache, all
+    reads share one thread pool for basket decompression and interpretation (if workers is set),
+    and files are read from their staged copies if a Staging.Stager is given. A cache already keeps
+    a local copy of the columns it reads, so it cannot be combined with a stager.
+    """
+    def __init__(self, cache=None, workers=None, stager=None):
+        if cache is not None and stager is not None: raise ValueError("Files are read either through a cache or from staged copies, not both")
+        self.cache = cache
+        self.stager = stager
+        self.executor = uproot.ThreadPoolExecutor(workers) if workers else None
+
+    def read(self, data_file, branches, entry_stop=None, library="np"):
+        entry_stop = uproot_entry_stop(entry_stop)
+        if self.cache is not None:
+            # all trigger bits of a level are cached together, so that any other trigger list of the
+            # same file is served from the same entry; the planned columns are selected after loading
+            branches = [branches] if isinstance(branches, str) else list(branches)
+            filter_name = list(dict.fromkeys(_cache_filter(branch) for branch in branches))
+            names, patterns = set(branches), [branch for branch in branches if "*" in branch]
+            columns = [name for name in self.cache.fields(data_file, filter_name, entry_stop) if name in names or any(fnmatch.fnmatchcase(name, p) for p in patterns)]
+            return self.cache.arrays(data_file, filter_name, entry_stop=entry_stop, library=library, columns=columns)
+        with (uproot.open(data_file) if self.stager is None else self.stager.open(data_file)) as f:
+            return Instrument.read_arrays(
+                f["Events"], filter_name=branches, entry_stop=entry_stop, library=library,
+                decompression_executor=self.executor, interpretation_executor=self.executor,
+            )
+
+    def close(self):
+        if self.executor is not None: self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
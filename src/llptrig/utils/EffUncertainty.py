@@ -0,0 +1,80 @@
+"""
+Statistical uncertainties of efficiencies and efficiency ratios, vectorised over
+all cells (samples x triggers) at once.
+"""
+
+import warnings
+import numpy as np
+from statistics import NormalDist
+
+ONE_SIGMA = 0.682689492137086
+# fixed default seed of the bootstrap, so that the same counts always give the same bands
+BOOTSTRAP_SEED = 20240601
+
+def _z(cl):
+    return NormalDist().inv_cdf(0.5 + cl / 2)
+
+def wilson(numer, denom, cl=ONE_SIGMA):
+    """Wilson score interval (lower, upper) of numer/denom."""
+    numer, denom = np.asarray(numer, dtype=np.float64), np.asarray(denom, dtype=np.float64)
+    z = _z(cl)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        eff = numer / denom
+        center = (eff + z**2 / (2 * denom)) / (1 + z**2 / denom)
+        half = z / (1 + z**2 / denom) * np.sqrt(eff * (1 - eff) / denom + z**2 / (4 * denom**2))
+    return np.clip(center - half, 0, 1), np.clip(center + half, 0, 1)
+
+def clopper_pearson(numer, denom, cl=ONE_SIGMA):
+    """Clopper-Pearson (exact) interval (lower, upper) of numer/denom. Needs scipy."""
+    try:
+        from scipy.special import betaincinv
+    except ImportError:
+        raise ImportError("Clopper-Pearson intervals need scipy, use wilson instead")
+    numer, denom = np.asarray(numer, dtype=np.float64), np.asarray(denom, dtype=np.float64)
+    alpha = 1 - cl
+    with np.errstate(invalid="ignore"):
+        lower = np.where(numer > 0, betaincinv(numer, denom - numer + 1, alpha / 2), 0.0)
+        upper = np.where(numer < denom, betaincinv(numer + 1, denom - numer, 1 - alpha / 2), 1.0)
+    return lower, upper
+
+INTERVALS = {"wilson": wilson, "clopper-pearson": clopper_pearson}
+
+def eff_intervals(numer, denom, method="wilson", cl=ONE_SIGMA):
+    """Efficiency with its (lower, upper) interval for arrays of pass and total counts."""
+    if method not in INTERVALS: raise ValueError("method must be one of {}".format(list(INTERVALS)))
+    numer, denom = np.asarray(numer), np.asarray(denom)
+    lower, upper = INTERVALS[method](numer, denom, cl)
+    return numer / denom, lower, upper
+
+def ratio_bootstrap(n_both, n_numer_only, n_denom_only, denom, n_boot=1000, cl=ONE_SIGMA, method="multinomial", seed=BOOTSTRAP_SEED):
+    """
+    Interval (lower, upper) of the ratio of two correlated efficiencies, (both + numer_only) / (both + denom_only),
+    for arrays of cells. Events are split into the four categories passing both, only the numerator, only the
+    denominator or neither, and all replicates of all cells are drawn in one batch. For a nested ratio such as
+    best+X / best, n_denom_only is 0.
+    """
+    rng = np.random.default_rng(seed)
+    categories = np.stack(np.broadcast_arrays(n_both, n_numer_only, n_denom_only), axis=-1).astype(np.int64)
+    denom = np.broadcast_to(denom, categories.shape[:-1]).astype(np.int64)
+    if method == "multinomial":
+        pvals = np.concatenate([categories, (denom - categories.sum(axis=-1))[..., None]], axis=-1) / np.maximum(denom, 1)[..., None]
+        draws = rng.multinomial(denom, pvals, size=(n_boot,) + denom.shape)[..., :3]
+    elif method == "poisson":
+        draws = rng.poisson(categories, size=(n_boot,) + categories.shape)
+    else:
+        raise ValueError("method must be either multinomial or poisson")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratios = (draws[..., 0] + draws[..., 1]) / (draws[..., 0] + draws[..., 2])
+    ratios[~np.isfinite(ratios)] = np.nan
+    alpha = 1 - cl
+    with warnings.catch_warnings():
+        # cells with no denominator events have no interval
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return tuple(np.nanquantile(ratios, [alpha / 2, 1 - alpha / 2], axis=0))
+
+def nested_ratio_intervals(n_or, n_base, denom, **kwargs):
+    """Ratio n_or / n_base of a nested OR (e.g. best+X over best) with its bootstrap interval."""
+    n_or, n_base = np.asarray(n_or), np.asarray(n_base)
+    lower, upper = ratio_bootstrap(n_base, n_or - n_base, 0, denom, **kwargs)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return n_or / n_base, lower, upper
@@ -0,0 +1,140 @@
+"""
+Prescale tables straight from dumped HLT configs, without CMSSW.
+
+Only two statements of the config matter, process.PrescaleService and
+process.HLTConfigVersion. The file is streamed line by line, each of these statements
+is cut out with the tokenizer and parsed with ast, and the cms.* calls in it are
+evaluated by a small literal evaluator. The rest of the (~100k line) menu is never
+parsed or executed. Results are cached per config checksum.
+"""
+
+import os
+import ast
+import csv
+import json
+import tokenize
+
+from .Prescales import PrescaleTable
+from .Incremental import file_checksum
+
+STATEMENTS = ["process.PrescaleService", "process.HLTConfigVersion"]
+
+def _statements(lines, targets):
+    """Source of each top-level statement assigning one of targets, as {target: source}."""
+    found = {}
+    for line in lines:
+        target = next((t for t in targets if line.startswith(t) and line[len(t):].lstrip().startswith("=")), None)
+        if target is None: continue
+        source, pending = [line], [line]
+        def readline():
+            if pending: return pending.pop()
+            source.append(next(lines, ""))
+            return source[-1]
+        # the statement ends at the first NEWLINE token outside brackets, wherever the line breaks are
+        for token in tokenize.generate_tokens(readline):
+            if token.type in (tokenize.NEWLINE, tokenize.ENDMARKER): break
+        found[target] = "".join(source)
+        if len(found) == len(targets): break
+    return found
+
+def _evaluate(node):
+    """Value of a cms.* expression: lists for v* types and VPSet, dicts for PSet and Service, scalars otherwise."""
+    if isinstance(node, ast.Call):
+        func = node.func
+        kind = func.attr if isinstance(func, ast.Attribute) else None
+        if kind in ("PSet", "Service", "EDProducer", "EDFilter", "ESSource", "ESProducer"):
+            return {kw.arg: _evaluate(kw.value) for kw in node.keywords if kw.arg is not None}
+        values = []
+        for arg in node.args:
+            if isinstance(arg, ast.Starred):
+                values.extend(_evaluate(arg.value))
+            else:
+                values.append(_evaluate(arg))
+        if kind is not None and (kind.startswith("v") or kind == "VPSet"): return values
+        return values[0] if values else None
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [_evaluate(elt) for elt in node.elts]
+    return ast.literal_eval(node)
+
+def parse_statement(source):
+    return _evaluate(ast.parse(source).body[0].value)
+
+def read_prescales(config_path):
+    """Menu name (tableName of HLTConfigVersion, else the file name) and PrescaleTable of a dumped HLT config."""
+    with open(config_path) as f:
+        found = _statements(iter(f), STATEMENTS)
+    if "process.PrescaleService" not in found:
+        raise ValueError("PrescaleService not found in {}".format(config_path))
+    service = parse_statement(found["process.PrescaleService"])
+    menu = os.path.basename(config_path)
+    if "process.HLTConfigVersion" in found:
+        menu = parse_statement(found["process.HLTConfigVersion"]).get("tableName", menu)
+    entries = service.get("prescaleTable", [])
+    table = PrescaleTable(
+        [entry["pathName"] for entry in entries],
+        [str(label) for label in service.get("lvl1Labels", [])],
+        [entry["prescales"] for entry in entries],
+    )
+    return menu, table
+
+def cached_prescales(config_path, cache_dir=None):
+    """read_prescales, with the result kept in cache_dir under the checksum of the config."""
+    if cache_dir is None: return read_prescales(config_path)
+    cache_path = os.path.join(cache_dir, file_checksum(config_path) + ".json")
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cached = json.load(f)
+        return cached["menu"], PrescaleTable(cached["names"], cached["columns"], cached["prescales"])
+    menu, table = read_prescales(config_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = cache_path + ".{}.tmp".format(os.getpid())
+    with open(tmp_path, "w") as f:
+        json.dump({"menu": menu, "names": table.names, "columns": table.columns, "prescales": table.prescales.tolist()}, f)
+    os.replace(tmp_path, cache_path)
+    return menu, table
+
+def read_menus(config_paths, cache_dir=None):
+    """
+    {menu: PrescaleTable} of several configs, read with cached_prescales. Configs sharing a menu
+    name are an error, since their rows could not be told apart in the combined table.
+    """
+    tables, sources = {}, {}
+    for config_path in config_paths:
+        menu, table = cached_prescales(config_path, cache_dir)
+        if menu in tables:
+            raise ValueError("{} and {} are both menu {}".format(sources[menu], config_path, menu))
+        tables[menu], sources[menu] = table, config_path
+    return tables
+
+def table_rows(tables):
+    """
+    Header and rows of a combined table of {menu: PrescaleTable}, keyed by a leading Menu column.
+    Columns are the union of the lumi labels of all menus, left empty where a menu lacks one.
+    """
+    columns = list(dict.fromkeys(column for table in tables.values() for column in table.columns))
+    rows = []
+    for menu, table in tables.items():
+        for name, prescales in zip(table.names, table.prescales):
+            by_column = dict(zip(table.columns, prescales.tolist()))
+            rows.append([menu, name] + [by_column.get(column, "") for column in columns])
+    return ["Menu", "Name"] + columns, rows
+
+def write_prescales(tables, out_path):
+    """
+    Writes {menu: PrescaleTable} as csv or, for a .parquet path, as parquet (needs pandas).
+    A single menu is written without the Menu column, in the layout of the original script.
+    """
+    header, rows = table_rows(tables)
+    if len(tables) == 1 and not out_path.endswith(".parquet"):
+        header, rows = header[1:], [row[1:] for row in rows]
+    if out_path.endswith(".parquet"):
+        import pandas as pd
+        frame = pd.DataFrame(rows, columns=header)
+        for column in header[2:]:
+            frame[column] = pd.to_numeric(frame[column], errors="coerce").astype("Int64")
+        frame.to_parquet(out_path, index=False)
+        return
+    with open(out_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
@@ -0,0 +1,250 @@
+"""
+Mergeable histogram accumulators.
+
+Hist1D and Hist2D keep their bin edges and counts as numpy arrays and are filled chunk by
+chunk; histograms of the same binning from other chunks, files or workers are added with +.
+Binning follows np.histogram (the last bin includes its upper edge), so a Hist1D filled with
+the same values gives the same counts. Entries outside the edges of a Hist1D go to its
+under/overflow, NaN to its overflow; a Hist2D keeps only the entries inside both axes.
+Unweighted histograms count in int64, weighted ones in float64.
+"""
+
+import numpy as np
+
+def bin_index(edges, values):
+    """Bin of each value, -1 below the first edge and len(edges) - 1 above the last one (or for NaN)."""
+    idx = np.searchsorted(edges, values, side="right") - 1
+    idx[values == edges[-1]] = len(edges) - 2
+    return idx
+
+def _merged_edges(edges, rebin):
+    """Edges after merging every rebin bins, or rebin itself if it is a subset of the edges."""
+    if np.ndim(rebin) == 0:
+        if (len(edges) - 1) % rebin: raise ValueError("Cannot merge {} bins in groups of {}".format(len(edges) - 1, rebin))
+        return edges[::rebin]
+    new = np.asarray(rebin, dtype=np.float64)
+    if not np.isin(new, edges).all(): raise ValueError("New edges must be a subset of the old ones")
+    return new
+
+def _group(counts, edges, new_edges, axis):
+    # every new bin sums the old bins between its edges; old bins outside the new edges are dropped
+    starts = np.searchsorted(edges, new_edges)
+    counts = np.take(counts, np.arange(starts[0], starts[-1]), axis=axis)
+    return np.add.reduceat(counts, starts[:-1] - starts[0], axis=axis)
+
+class Hist1D:
+    def __init__(self, edges, counts=None, underflow=0, overflow=0, weighted=False):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        dtype = np.float64 if weighted else np.int64
+        self.counts = np.zeros(len(self.edges) - 1, dtype=dtype) if counts is None else np.asarray(counts, dtype=dtype)
+        self.underflow = dtype(underflow)
+        self.overflow = dtype(overflow)
+
+    @classmethod
+    def regular(cls, bins, low, high, weighted=False):
+        return cls(np.linspace(low, high, bins + 1), weighted=weighted)
+
+    @classmethod
+    def from_dict(cls, hist):
+        """From the {"counts": [...], "bins": [...]} layout of the signal dicts."""
+        counts = np.asarray(hist["counts"])
+        return cls(hist["bins"], counts, hist.get("underflow", 0), hist.get("overflow", 0), weighted=counts.dtype.kind == "f")
+
+    @property
+    def weighted(self):
+        return self.counts.dtype.kind == "f"
+
+    @property
+    def centers(self):
+        return (self.edges[1:] + self.edges[:-1]) / 2
+
+    def fill(self, values, weights=None):
+        values = np.asarray(values, dtype=np.float64)
+        if weights is not None and not self.weighted: raise ValueError("Weights need a weighted histogram")
+        idx = bin_index(self.edges, values)
+        inside = (idx >= 0) & (idx < len(self.counts))
+        if weights is None:
+            self.counts += np.bincount(idx[inside], minlength=len(self.counts))
+            self.underflow += np.count_nonzero(idx < 0)
+            self.overflow += np.count_nonzero(idx >= len(self.counts))
+        else:
+            weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), values.shape)
+            self.counts += np.bincount(idx[inside], weights=weights[inside], minlength=len(self.counts))
+            self.underflow += weights[idx < 0].sum()
+            self.overflow += weights[idx >= len(self.counts)].sum()
+        return self
+
+    def compatible(self, other):
+        return isinstance(other, Hist1D) and np.array_equal(self.edges, other.edges)
+
+    def __iadd__(self, other):
+        if not self.compatible(other): raise ValueError("Cannot add histograms with different binning")
+        if other.weighted and not self.weighted: self.counts = self.counts.astype(np.float64)
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    def __add__(self, other):
+        return self.copy().__iadd__(other)
+
+    def __radd__(self, other):
+        # so that sum() of histograms works
+        return self.copy() if other == 0 else self.__add__(other)
+
+    def __eq__(self, other):
+        return self.compatible(other) and np.array_equal(self.counts, other.counts) and self.underflow == other.underflow and self.overflow == other.overflow
+
+    # equal by content but filled in place, so not usable as dict keys or in sets
+    __hash__ = None
+
+    def copy(self):
+        return Hist1D(self.edges.copy(), self.counts.copy(), self.underflow, self.overflow, self.weighted)
+
+    def rebin(self, rebin):
+        """Merges every rebin bins, or regroups into new edges that are a subset of the current ones."""
+        edges = _merged_edges(self.edges, rebin)
+        counts = _group(self.counts, self.edges, edges, 0)
+        # bins cut away at either end move to the flow
+        lo, hi = np.searchsorted(self.edges, [edges[0], edges[-1]])
+        underflow = self.underflow + self.counts[:lo].sum()
+        overflow = self.overflow + self.counts[hi:].sum()
+        return Hist1D(edges, counts, underflow, overflow, self.weighted)
+
+    def total(self, flow=False):
+        return self.counts.sum() + (self.underflow + self.overflow if flow else 0)
+
+    def density(self):
+        """Counts normalised to unit area, as np.histogram(density=True), or all zeros if the bins are empty."""
+        total = self.counts.sum()
+        if total == 0: return np.zeros(len(self.counts))
+        return self.counts / total / np.diff(self.edges)
+
+    def to_dict(self):
+        counts = self.counts.tolist()
+        return {"counts": counts, "bins": self.edges.tolist(), "underflow": self.underflow.item(), "overflow": self.overflow.item()}
+
+    def __repr__(self):
+        return "Hist1D({} bins in [{}, {}], {} entries)".format(len(self.counts), self.edges[0], self.edges[-1], self.total(flow=True))
+
+class Hist2D:
+    def __init__(self, xedges, yedges, counts=None, weighted=False):
+        self.xedges = np.asarray(xedges, dtype=np.float64)
+        self.yedges = np.asarray(yedges, dtype=np.float64)
+        dtype = np.float64 if weighted else np.int64
+        shape = (len(self.xedges) - 1, len(self.yedges) - 1)
+        self.counts = np.zeros(shape, dtype=dtype) if counts is None else np.asarray(counts, dtype=dtype).reshape(shape)
+
+    @classmethod
+    def regular(cls, xbins, xrange, ybins, yrange, weighted=False):
+        return cls(np.linspace(*xrange, xbins + 1), np.linspace(*yrange, ybins + 1), weighted=weighted)
+
+    @classmethod
+    def from_dict(cls, hist):
+        counts = np.asarray(hist["counts"])
+        return cls(hist["xbins"], hist["ybins"], counts, weighted=counts.dtype.kind == "f")
+
+    @property
+    def weighted(self):
+        return self.counts.dtype.kind == "f"
+
+    def fill(self, x, y, weights=None):
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        if weights is not None and not self.weighted: raise ValueError("Weights need a weighted histogram")
+        nx, ny = self.counts.shape
+        ix, iy = bin_index(self.xedges, x), bin_index(self.yedges, y)
+        inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+        flat = ix[inside] * ny + iy[inside]
+        if weights is not None:
+            weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), x.shape)[inside]
+        self.counts += np.bincount(flat, weights=weights, minlength=nx * ny).reshape(nx, ny).astype(self.counts.dtype)
+        return self
+
+    def compatible(self, other):
+        return isinstance(other, Hist2D) and np.array_equal(self.xedges, other.xedges) and np.array_equal(self.yedges, other.yedges)
+
+    def __iadd__(self, other):
+        if not self.compatible(other): raise ValueError("Cannot add histograms with different binning")
+        if other.weighted and not self.weighted: self.counts = self.counts.astype(np.float64)
+        self.counts += other.counts
+        return self
+
+    def __add__(self, other):
+        return self.copy().__iadd__(other)
+
+    def __radd__(self, other):
+        return self.copy() if other == 0 else self.__add__(other)
+
+    def __eq__(self, other):
+        return self.compatible(other) and np.array_equal(self.counts, other.counts)
+
+    __hash__ = None
+
+    def copy(self):
+        return Hist2D(self.xedges.copy(), self.yedges.copy(), self.counts.copy(), self.weighted)
+
+    def rebin(self, xrebin=1, yrebin=1):
+        xedges, yedges = _merged_edges(self.xedges, xrebin), _merged_edges(self.yedges, yrebin)
+        counts = _group(_group(self.counts, self.xedges, xedges, 0), self.yedges, yedges, 1)
+        return Hist2D(xedges, yedges, counts, self.weighted)
+
+    def project(self, axis):
+        """Hist1D along "x" or "y", summed over the other axis."""
+        if axis == "x": return Hist1D(self.xedges, self.counts.sum(axis=1), weighted=self.weighted)
+        if axis == "y": return Hist1D(self.yedges, self.counts.sum(axis=0), weighted=self.weighted)
+        raise ValueError("axis must be either x or y")
+
+    def total(self):
+        return self.counts.sum()
+
+    def to_dict(self):
+        return {"counts": self.counts.tolist(), "xbins": self.xedges.tolist(), "ybins": self.yedges.tolist()}
+
+    def __repr__(self):
+        return "Hist2D({}x{} bins, {} entries)".format(*self.counts.shape, self.total())
+
+def as_hist(hist):
+    """Hist1D/Hist2D from a histogram, its dict layout or a (counts, edges) pair as returned by np.histogram."""
+    if isinstance(hist, (Hist1D, Hist2D)): return hist
+    if isinstance(hist, dict): return Hist2D.from_dict(hist) if "xbins" in hist else Hist1D.from_dict(hist)
+    counts, edges = hist
+    return Hist1D(edges, counts, weighted=np.asarray(counts).dtype.kind == "f")
+
+def score_vs_mass(hists, masses):
+    """
+    Hist2D of a score (x) against the mediator mass (y) from the score Hist1D of each mass,
+    with one y bin per mass whose edges lie halfway between neighbouring masses.
+    """
+    masses = sorted(masses)
+    hists = [as_hist(hists[mass]) for mass in masses]
+    points = np.asarray(masses, dtype=np.float64)
+    if len(points) > 1:
+        mid = (points[1:] + points[:-1]) / 2
+        yedges = np.concatenate([[2 * points[0] - mid[0]], mid, [2 * points[-1] - mid[-1]]])
+    else:
+        yedges = np.array([points[0] - 0.5, points[0] + 0.5])
+    return Hist2D(hists[0].edges, yedges, np.stack([hist.counts for hist in hists], axis=1), hists[0].weighted)
+
+def encode(hist):
+    """
+    (counts, edges) byte strings of a histogram for the results store. A Hist1D's counts are
+    framed by its under/overflow and a Hist2D's edges start with a NaN marker.
+    """
+    hist = as_hist(hist)
+    if hist.weighted: raise ValueError("Only unweighted histograms can be stored")
+    if isinstance(hist, Hist2D):
+        counts = hist.counts.ravel()
+        edges = np.concatenate([[np.nan, len(hist.xedges)], hist.xedges, hist.yedges])
+    else:
+        counts = np.concatenate([[hist.underflow], hist.counts, [hist.overflow]])
+        edges = hist.edges
+    return counts.astype(np.int64).tobytes(), edges.astype(np.float64).tobytes()
+
+def decode(counts, edges):
+    counts, edges = np.frombuffer(counts, dtype=np.int64), np.frombuffer(edges, dtype=np.float64)
+    if len(edges) and np.isnan(edges[0]):
+        nx = int(edges[1])
+        return Hist2D(edges[2:2 + nx], edges[2 + nx:], counts)
+    # histograms stored before the flow was kept have one count per bin
+    if len(counts) == len(edges) + 1: return Hist1D(edges, counts[1:-1], counts[0], counts[-1])
+    return Hist1D(edges, counts)
@@ -0,0 +1,23 @@
+"""
+Fingerprints of the inputs of a result cell, used to recompute only the cells whose
+inputs (sample file, trigger lists, prescales, thresholds, ...) changed.
+"""
+
+import os
+import json
+import hashlib
+
+def file_fingerprint(file_path):
+    stat = os.stat(file_path)
+    return [os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns]
+
+def fingerprint(*parts):
+    """Stable hash of JSON-serialisable parts; sets and numpy arrays should be passed as sorted lists."""
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+def file_checksum(file_path, blocksize=1 << 24):
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(blocksize), b""):
+            digest.update(block)
+    return digest.hexdigest()
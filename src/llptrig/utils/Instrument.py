@@ -0,0 +1,212 @@
+"""
+Opt-in instrumentation of the efficiency and plotting pipeline.
+
+Nothing is recorded until enable() is called; until then stage(), timed functions
+and count() return at once. Once enabled, each stage (a context manager or a timed
+function, nested stages are recorded as "outer/inner") gets its wall time, number of
+calls and the process memory high-water mark at exit. Counters are attached to the
+innermost open stage. Reads through read_arrays/iterate_arrays also count the bytes
+read, the read requests made to the file source and the events. A read request is a
+chunk fetched from the file, which may hold several baskets, so it is not a count of
+baskets decompressed.
+
+report() prints a summary table and write_trace() writes the stages as Chrome trace
+events (viewable in chrome://tracing or Perfetto) with the counters as arguments.
+profile() wraps a block in cProfile or pyinstrument. Stages run in worker processes
+of a pool are not recorded, only the stage around the pool.
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import functools
+from contextlib import contextmanager
+from collections import defaultdict
+
+_recorder = None
+
+class Recorder:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = defaultdict(lambda: {"calls": 0, "wall_s": 0.0, "max_rss_mb": 0.0})
+        self.counters = defaultdict(lambda: defaultdict(int))
+        self.trace = []
+        self.stack = []
+
+def enable():
+    """Starts recording (again from scratch) and returns the recorder."""
+    global _recorder
+    _recorder = Recorder()
+    return _recorder
+
+def disable():
+    global _recorder
+    _recorder = None
+
+def enabled():
+    return _recorder is not None
+
+def _max_rss_mb():
+    # ru_maxrss is in kB on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024**2 if sys.platform == "darwin" else rss / 1024
+
+@contextmanager
+def stage(name):
+    recorder = _recorder
+    if recorder is None:
+        yield
+        return
+    recorder.stack.append(name)
+    path = "/".join(recorder.stack)
+    start = time.perf_counter()
+    counts_before = dict(recorder.counters[path])
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - start
+        recorder.stack.pop()
+        entry = recorder.stages[path]
+        entry["calls"] += 1
+        entry["wall_s"] += wall
+        entry["max_rss_mb"] = max(entry["max_rss_mb"], _max_rss_mb())
+        args = {key: value - counts_before.get(key, 0) for key, value in recorder.counters[path].items()}
+        recorder.trace.append({
+            "name": name, "cat": path, "ph": "X", "pid": os.getpid(), "tid": 0,
+            "ts": (start - recorder.start) * 1e6, "dur": wall * 1e6, "args": args,
+        })
+
+def timed(func):
+    """Decorator recording every call of func as a stage named after it."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _recorder is None: return func(*args, **kwargs)
+        with stage(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+def count(name, value=1):
+    """Adds value to a counter of the innermost open stage."""
+    if _recorder is None: return
+    _recorder.counters["/".join(_recorder.stack)][name] += value
+
+def _source(tree):
+    return getattr(getattr(tree, "file", None), "source", None)
+
+def _num_events(arrays):
+    # a dict of arrays with library="np", an awkward array otherwise
+    return len(next(iter(arrays.values()))) if isinstance(arrays, dict) and arrays else len(arrays)
+
+def _count_read(source, before, arrays):
+    if source is not None:
+        count("bytes_read", source.num_requested_bytes - before[0])
+        count("read_requests", source.num_requested_chunks - before[1])
+    count("events", _num_events(arrays))
+
+def read_arrays(tree, *args, **kwargs):
+    """tree.arrays(*args, **kwargs), recording the bytes, read requests and events it took."""
+    if _recorder is None: return tree.arrays(*args, **kwargs)
+    source = _source(tree)
+    before = (source.num_requested_bytes, source.num_requested_chunks) if source is not None else None
+    with stage("read"):
+        arrays = tree.arrays(*args, **kwargs)
+        _count_read(source, before, arrays)
+    return arrays
+
+def iterate_arrays(tree, *args, **kwargs):
+    """tree.iterate(*args, **kwargs), recording each chunk read like read_arrays."""
+    iterator = tree.iterate(*args, **kwargs)
+    if _recorder is None:
+        yield from iterator
+        return
+    source = _source(tree)
+    while True:
+        before = (source.num_requested_bytes, source.num_requested_chunks) if source is not None else None
+        with stage("read"):
+            arrays = next(iterator, None)
+            if arrays is not None: _count_read(source, before, arrays)
+        if arrays is None: return
+        yield arrays
+
+def summary():
+    """Recorded stages as a list of dicts with their wall time, calls, memory high-water mark and counters."""
+    if _recorder is None: return []
+    return [
+        dict(stage=path, **entry, **_recorder.counters.get(path, {}))
+        for path, entry in sorted(_recorder.stages.items())
+    ]
+
+def report(file=None):
+    file = sys.stdout if file is None else file
+    rows = summary()
+    if not rows:
+        print("No stages recorded (is instrumentation enabled?)", file=file)
+        return
+    print("{:<50} {:>7} {:>10} {:>10} {:>12} {:>10} {:>12}".format("stage", "calls", "wall [s]", "RSS [MB]", "read [MB]", "requests", "events"), file=file)
+    for row in rows:
+        print("{:<50} {:>7} {:>10.3f} {:>10.1f} {:>12.2f} {:>10} {:>12}".format(
+            row["stage"], row["calls"], row["wall_s"], row["max_rss_mb"],
+            row.get("bytes_read", 0) / 1024**2, row.get("read_requests", 0), row.get("events", 0),
+        ), file=file)
+
+def write_trace(path):
+    """Writes the recorded stages as Chrome trace events, with the summary table under "summary"."""
+    if _recorder is None: raise RuntimeError("Instrumentation is not enabled")
+    with open(path, "w") as f:
+        json.dump({"traceEvents": _recorder.trace, "summary": summary()}, f)
+
+@contextmanager
+def profile(profiler="cprofile", output=None):
+    """
+    Profiles the block with cProfile or pyinstrument (needs pyinstrument). The result is printed,
+    or written to output (pstats file for cProfile, HTML for pyinstrument).
+    """
+    if profiler == "cprofile":
+        import cProfile, pstats
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield prof
+        finally:
+            prof.disable()
+            if output is None: pstats.Stats(prof).sort_stats("cumulative").print_stats(30)
+            else: prof.dump_stats(output)
+    elif profiler == "pyinstrument":
+        from pyinstrument import Profiler
+        prof = Profiler()
+        prof.start()
+        try:
+            yield prof
+        finally:
+            prof.stop()
+            if output is None: print(prof.output_text(unicode=True))
+            else:
+                with open(output, "w") as f:
+                    f.write(prof.output_html())
+    else:
+        raise ValueError("profiler must be either cprofile or pyinstrument")
+
+def add_arguments(parser):
+    """Adds the instrumentation options used by session() to an argparse parser."""
+    parser.add_argument("--report", default=False, action="store_true", help="print a per-stage timing, memory and I/O summary at the end")
+    parser.add_argument("--trace", type=str, default=None, help="write the per-stage timings as a Chrome trace (JSON) to this file")
+    parser.add_argument("--profile", type=str, default=None, choices=["cprofile", "pyinstrument"], help="profile the whole run")
+    parser.add_argument("--profile-output", type=str, default=None, help="file for the profile (printed if not given)")
+
+@contextmanager
+def session(args):
+    """Instrumentation of a command-line run as requested by the options of add_arguments."""
+    if args.report or args.trace is not None: enable()
+    try:
+        if args.profile is not None:
+            with profile(args.profile, args.profile_output):
+                yield
+        else:
+            yield
+    finally:
+        if enabled():
+            if args.report: report()
+            if args.trace is not None: write_trace(args.trace)
+            disable()
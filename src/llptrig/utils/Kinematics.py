@@ -0,0 +1,51 @@
+"""
+Event-level kinematic variables computed from the NanoAOD jet collection, used as the
+second axis of the AD score histograms. awkward is only imported once a variable is computed,
+so the plotting command can use VARIABLES without it.
+"""
+
+import numpy as np
+
+# branches each variable needs; Jet_eta is used for the acceptance cut when it is there
+VARIABLES = {
+    "HT": {"branches": ["Jet_pt"], "range": (0, 3000), "xlabel": "$H_T$ [GeV]"},
+    "lead_jet_pt": {"branches": ["Jet_pt"], "range": (0, 1500), "xlabel": "Leading jet $p_T$ [GeV]"},
+}
+OPTIONAL_BRANCHES = ["Jet_eta"]
+
+def _jets(arrays, min_pt, max_eta):
+    import awkward as ak
+    pt = ak.Array(arrays["Jet_pt"])
+    keep = pt > min_pt
+    if max_eta is not None and "Jet_eta" in _fields(arrays):
+        keep = keep & (abs(ak.Array(arrays["Jet_eta"])) < max_eta)
+    return pt[keep]
+
+def _fields(arrays):
+    return arrays.fields if hasattr(arrays, "fields") else list(arrays.keys())
+
+def ht(arrays, min_pt=30, max_eta=2.5):
+    """Scalar sum of the pT of the jets above min_pt within |eta| < max_eta."""
+    import awkward as ak
+    return ak.to_numpy(ak.sum(_jets(arrays, min_pt, max_eta), axis=1)).astype(np.float64)
+
+def lead_jet_pt(arrays, min_pt=30, max_eta=2.5):
+    """pT of the leading jet above min_pt within |eta| < max_eta, 0 in events without one."""
+    import awkward as ak
+    return ak.to_numpy(ak.fill_none(ak.max(_jets(arrays, min_pt, max_eta), axis=1), 0)).astype(np.float64)
+
+FUNCS = {"HT": ht, "lead_jet_pt": lead_jet_pt}
+
+def compute(arrays, name):
+    if name not in FUNCS: raise ValueError("Unknown kinematic variable {}, available are {}".format(name, list(FUNCS)))
+    return FUNCS[name](arrays)
+
+def branches(names, available=None):
+    """Branches needed for the given variables, with the optional ones only if available."""
+    needed = list(dict.fromkeys(branch for name in names for branch in VARIABLES[name]["branches"]))
+    if available is not None:
+        available = set(available)
+        missing = [branch for branch in needed if branch not in available]
+        if missing: raise ValueError("Branches {} needed for {} are missing".format(missing, list(names)))
+        if names: needed += [branch for branch in OPTIONAL_BRANCHES if branch in available]
+    return needed
@@ -0,0 +1,332 @@
+import numpy as np
+import os
+import io
+import itertools
+import warnings
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+from .Instrument import stage, timed
+from .EffUncertainty import BOOTSTRAP_SEED
+
+colors = [
+    "#1f77b4",  # blue
+    "#ff7f0e",  # orange
+    "#2ca02c",  # green
+    "#d62728",  # red
+    "#9467bd",  # purple
+    "#8c564b",  # brown
+    "#e377c2",  # pink
+    "#7f7f7f",  # gray
+    "#bcbd22",  # olive
+    "#17becf",  # teal
+    "#aec7e8",  # light blue
+    "#ffbb78",  # light orange
+    "#98df8a",  # light green
+    "#ff9896",  # light red
+    "#c5b0d5",  # light purple
+    "#ff5f00",  # vivid orange
+    "#ff00ff"   # magenta
+]
+
+markers = ['v','o','^','s','d', "*", "P", "X", ">", "<"] * 2
+
+@timed
+def plot_efficiencies(
+    effs_dict, mMed_lst, ctau_lst, mDark_lst, trigs, 
+    figsize=(12,8), 
+    plotbest=True, 
+    title="", 
+    savefig=True, 
+    outdir="./plots/LLPEffPlots", 
+    outfname=None,
+    unitymax=True,
+    cleandir = None,
+    workers=None,
+    errors=None,
+    n_boot=1000,
+    seed=BOOTSTRAP_SEED,
+    counts=None
+):
+    _deprecate_cleandir(cleandir)
+    bands = error_bands(counts, ctau_lst, mDark_lst, trigs, errors, n_boot, seed)
+    pages = [
+        (effs_dict[(ctau, mDark)], mMed_lst, ctau, mDark, trigs, figsize, plotbest, title, unitymax, bands.get((ctau, mDark)))
+        for ctau, mDark in itertools.product(ctau_lst, mDark_lst)
+    ]
+    if savefig:
+        if outfname is None: raise ValueError("No output file name provided.")
+        render_pdf(draw_efficiencies, pages, os.path.join(outdir, outfname+".pdf"), workers=workers)
+    else:
+        return [draw_efficiencies(*page) for page in pages]
+
+def error_bands(counts, ctau_lst, mDark_lst, trigs, errors, n_boot, seed):
+    """
+    errors: None, "wilson" or "clopper-pearson" uncertainty bands, from the raw counts
+    returned by compute_efficiencies(..., return_counts=True) or load_effs(..., return_counts=True).
+    """
+    if errors is None: return {}
+    if counts is None: raise ValueError("Uncertainty bands need the raw counts, see compute_efficiencies(..., return_counts=True)")
+    from .LLPTrigUtils import effs_intervals
+    return effs_intervals({key: counts[key] for key in itertools.product(ctau_lst, mDark_lst)}, trigs, method=errors, n_boot=n_boot, seed=seed)
+
+def draw_efficiencies(effs, mMed_lst, ctau, mDark, trigs, figsize, plotbest, title, unitymax, bands=None):
+    import matplotlib.pyplot as plt
+    print("Plotting: ctau = {}, mDark = {}".format(ctau, mDark))
+    fig, ax = plt.subplots(figsize=figsize)
+    maxeff = 0
+
+    for i, trig in enumerate(trigs):
+        if maxeff < max(effs[trig]): maxeff = max(effs[trig])
+        ax.plot(
+            mMed_lst, effs[trig], 
+            label=trig, 
+            marker=markers[i], linestyle="--", color=colors[i], markerfacecolor='none', markeredgecolor=colors[i], markersize=10.0, markeredgewidth=2
+        )
+        if bands is not None: ax.fill_between(mMed_lst, *bands[trig], color=colors[i], alpha=0.2, linewidth=0)
+    if plotbest: 
+        ax.plot(
+            mMed_lst, effs["best"], 
+            label="best", 
+            marker=markers[i+1], linestyle="--", color=colors[i + 1], markerfacecolor='none', markeredgecolor=colors[i+1], markersize=10.0, markeredgewidth=2
+        )
+        if bands is not None: ax.fill_between(mMed_lst, *bands["best"], color=colors[i+1], alpha=0.2, linewidth=0)
+        if max(effs["best"]) > maxeff: maxeff = max(effs["best"])
+
+
+    # Changing plot aesthetics
+    ax.set_title(title+f"($c\\tau$ = {ctau} mm, Dark Hadron Mass = {mDark} GeV)", fontsize=16)
+    if unitymax:
+        ax.set_ylim(0, 1)
+    else:
+        ax.set_ylim(0, maxeff * 1.05)
+    ax.set_xlim(95, 2000)
+    ax.legend(loc='center left', bbox_to_anchor=(1, 0.5), fontsize=10)
+    ax.tick_params(axis='both', which='major', labelsize=10)
+    ax.set_ylabel("Efficiency", fontsize=12)
+    ax.set_xlabel("Z' Mediator Mass [GeV]", fontsize=12)
+    ax.grid()
+    fig.tight_layout()
+
+    return fig, ax
+
+
+@timed
+def plot_improvements(
+    effs_dict, mMed_lst, ctau_lst, mDark_lst, trigs, 
+    figsize=(12,8), 
+    plotbest=True, 
+    title="", 
+    savefig=False, 
+    outdir="./plots/", 
+    outfname=None,
+    unitymax=True,
+    cleandir = None,
+    workers=None,
+    errors=None,
+    n_boot=1000,
+    seed=BOOTSTRAP_SEED,
+    counts=None
+):
+    _deprecate_cleandir(cleandir)
+    bands = error_bands(counts, ctau_lst, mDark_lst, trigs, errors, n_boot, seed)
+    pages = [
+        (effs_dict[(ctau, mDark)], mMed_lst, ctau, mDark, trigs, figsize, plotbest, title, unitymax, bands.get((ctau, mDark)))
+        for ctau, mDark in itertools.product(ctau_lst, mDark_lst)
+    ]
+    if savefig:
+        if outfname is None: raise ValueError("No output file name provided.")
+        render_pdf(draw_improvements, pages, os.path.join(outdir, outfname+".pdf"), workers=workers)
+    else:
+        return [draw_improvements(*page) for page in pages]
+
+def draw_improvements(effs, mMed_lst, ctau, mDark, trigs, figsize, plotbest, title, unitymax, bands=None):
+    import matplotlib.pyplot as plt
+    print("Plotting: ctau = {}, mDark = {}".format(ctau, mDark))
+    fig, (ax, ax_ratio) = plt.subplots(2, 1, figsize=figsize, gridspec_kw={'height_ratios': [3, 1]}, sharex=True)
+    maxeff = 0
+
+    # Plotting 
+    for i, trig in enumerate(trigs):
+        if maxeff < max(effs["best+"+trig]): maxeff = max(effs["best+"+trig])
+        ax.plot(
+            mMed_lst, effs["best+"+trig], label="best+"+trig, 
+            marker=markers[i], linestyle="--", color=colors[i], markerfacecolor='none', markeredgecolor=colors[i], markersize=10.0, markeredgewidth=2
+        )
+        ratio = np.array(effs["best+"+trig])/np.array(effs["best"])
+        ax_ratio.plot(mMed_lst, ratio, label="best+" + trig, marker=markers[i], linestyle="--", markersize=10.0, color=colors[i])
+        if bands is not None:
+            ax.fill_between(mMed_lst, *bands["best+"+trig], color=colors[i], alpha=0.2, linewidth=0)
+            ax_ratio.fill_between(mMed_lst, *bands["best+"+trig+"/best"][1:], color=colors[i], alpha=0.2, linewidth=0)
+    
+    if plotbest: 
+        print("Printing best: " + str(effs["best_name"]))
+        ax.plot(
+            mMed_lst, effs["best"], label="best",
+            marker=markers[i+1], linestyle="--", color=colors[i + 1], markerfacecolor='none', markeredgecolor=colors[i+1], markersize=10.0, markeredgewidth=2
+        )
+        if bands is not None: ax.fill_between(mMed_lst, *bands["best"], color=colors[i+1], alpha=0.2, linewidth=0)
+
+    if max(effs["best"]) > maxeff: maxeff = max(effs["best"])
+
+    ax.set_title(title+f"($c\\tau$ = {ctau} mm, Dark Hadron Mass = {mDark} GeV)", fontsize=16)
+    if unitymax:
+        ax.set_ylim(0, 1)
+    else:
+        ax.set_ylim(0, maxeff * 1.05)
+    ax.set_xlim(95, 2000)
+    ax.legend(loc='center left', bbox_to_anchor=(1, 0.5), fontsize=10)
+    ax.tick_params(axis='both', which='major', labelsize=10)
+    ax.set_ylabel("Efficiency", fontsize=12)
+    ax.grid()
+
+    ax_ratio.set_xlabel("Z' Mediator Mass [GeV]", fontsize=10)
+    ax_ratio.set_ylabel("best+LLP/best", fontsize=10)
+    ax_ratio.tick_params(axis='both', which='major', labelsize=10)
+    ax_ratio.grid()
+
+    fig.tight_layout()
+
+    return fig, ax, ax_ratio
+
+@timed
+def plot_overlaps(
+    overlaps, metric="jaccard",
+    figsize=(10,9),
+    title="",
+    outdir="./plots/LLPOverlapPlots",
+    outfname=None,
+    annotate=None,
+    workers=None
+):
+    # overlaps: {key: TrigOverlap.SampleOverlap}, one heat map page per key
+    if outfname is None: raise ValueError("No output file name provided.")
+    pages = [(overlap, key, metric, figsize, title, annotate) for key, overlap in overlaps.items()]
+    render_pdf(draw_overlap, pages, os.path.join(outdir, outfname+".pdf"), workers=workers)
+
+def draw_overlap(overlap, key, metric, figsize, title, annotate=None):
+    import matplotlib.pyplot as plt
+    # metric: "jaccard", "conditional" (fraction of the row path's events also firing the column path) or "cofire" counts
+    values = {"jaccard": overlap.jaccard, "conditional": overlap.conditional, "cofire": lambda: overlap.cofire}[metric]()
+    n = len(overlap.names)
+    if annotate is None: annotate = n <= 20
+    fig, ax = plt.subplots(figsize=figsize)
+    im = ax.imshow(values, cmap="viridis", vmin=0, vmax=None if metric == "cofire" else 1)
+    fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04).set_label(metric, fontsize=12)
+    if annotate:
+        for i, j in itertools.product(range(n), repeat=2):
+            ax.text(j, i, "{:d}".format(values[i, j]) if metric == "cofire" else "{:.2f}".format(values[i, j]), ha="center", va="center", fontsize=7, color="w")
+    labels = ["{} ({:.3f})".format(name, unique) for name, unique in zip(overlap.names, overlap.unique_acceptance())]
+    ax.set_xticks(range(n))
+    ax.set_xticklabels(overlap.names, rotation=90, fontsize=8)
+    ax.set_yticks(range(n))
+    ax.set_yticklabels(labels, fontsize=8)
+    key = key if isinstance(key, tuple) else (key,)
+    ax.set_title(title + "(" + ", ".join(str(value) for value in key) + "), unique acceptance in brackets", fontsize=12)
+    fig.tight_layout()
+
+    return fig, ax
+
+@timed
+def plot_turn_ons(
+    turn_ons, paths=None,
+    figsize=(12,8),
+    title="",
+    xlabel=None,
+    outdir="./plots/LLPTurnOnPlots",
+    outfname=None,
+    errors="wilson",
+    workers=None
+):
+    # turn_ons: {key: TurnOn.TurnOn}, e.g. per sample from compute_turn_ons, one page per key
+    if outfname is None: raise ValueError("No output file name provided.")
+    pages = [(turn_on, key, paths, figsize, title, xlabel, errors) for key, turn_on in turn_ons.items()]
+    render_pdf(draw_turn_on, pages, os.path.join(outdir, outfname+".pdf"), workers=workers)
+
+def draw_turn_on(turn_on, key, paths, figsize, title, xlabel=None, errors="wilson"):
+    import matplotlib.pyplot as plt
+    paths = turn_on.paths if paths is None else paths
+    effs, lower, upper = turn_on.intervals(errors) if errors is not None else (turn_on.efficiency(), None, None)
+    fig, ax = plt.subplots(figsize=figsize)
+    halfwidth = np.diff(turn_on.edges) / 2
+    for i, path in enumerate(paths):
+        j = turn_on.paths.index(path)
+        yerr = None if lower is None else np.nan_to_num([effs[j] - lower[j], upper[j] - effs[j]])
+        ax.errorbar(
+            turn_on.centers, effs[j], xerr=halfwidth, yerr=yerr,
+            label=path, marker=markers[i], linestyle="none", color=colors[i % len(colors)], markerfacecolor='none', markersize=8.0, markeredgewidth=2
+        )
+
+    key = key if isinstance(key, tuple) else (key,)
+    ax.set_title(title + "(" + ", ".join(str(value) for value in key) + ")", fontsize=16)
+    ax.set_ylim(0, 1.05)
+    ax.set_xlim(turn_on.edges[0], turn_on.edges[-1])
+    ax.legend(loc='center left', bbox_to_anchor=(1, 0.5), fontsize=10)
+    ax.tick_params(axis='both', which='major', labelsize=10)
+    ax.set_ylabel("Efficiency" if turn_on.reference is None else "Efficiency w.r.t. " + turn_on.reference, fontsize=12)
+    ax.set_xlabel(turn_on.variable if xlabel is None else xlabel, fontsize=12)
+    ax.grid()
+    fig.tight_layout()
+
+    return fig, ax
+
+def _deprecate_cleandir(cleandir):
+    # pages are merged in memory since no per-page files are written, so there is nothing to clean
+    if cleandir is not None:
+        warnings.warn("cleandir has no effect and will be removed, no temporary page files are written", DeprecationWarning, stacklevel=4)
+
+def render_page(draw, page):
+    """Draws one page and returns it as PDF bytes, closing the figure right away."""
+    import matplotlib.pyplot as plt
+    fig = draw(*page)[0]
+    buf = io.BytesIO()
+    # no creation date, so that the same page always gives the same bytes
+    fig.savefig(buf, format="pdf", metadata={"CreationDate": None})
+    plt.close(fig)
+    return buf.getvalue()
+
+def _use_agg():
+    import matplotlib.pyplot as plt
+    plt.switch_backend("Agg")
+
+@contextmanager
+def _agg_backend():
+    """Draws with the Agg backend, as the pool workers do, and restores the previous backend after."""
+    import matplotlib.pyplot as plt
+    backend = plt.get_backend()
+    _use_agg()
+    try:
+        yield
+    finally:
+        plt.switch_backend(backend)
+
+def render_pdf(draw, pages, outpath, workers=None):
+    """
+    Renders every page with draw(*page) into a single multi-page PDF. Pages are drawn with the Agg
+    backend, on a process pool if workers is given; the output is the same as the serial one.
+    """
+    with stage("render_pdf"):
+        with stage("draw"):
+            if workers is None:
+                with _agg_backend():
+                    rendered = [render_page(draw, page) for page in pages]
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_use_agg) as pool:
+                    rendered = list(pool.map(render_page, [draw] * len(pages), pages))
+
+        with stage("merge"):
+            from pypdf import PdfMerger
+            merger = PdfMerger()
+            for page in rendered:
+                merger.append(io.BytesIO(page))
+            merger.write(outpath)
+            merger.close()
+
+def load_effs(store_path, tag, channel, trigs, mode=None, ctau_lst=None, mDark_lst=None, mMed_lst=None, return_counts=False):
+    """effs_dict of the given triggers rebuilt from a results store written by compute_efficiencies (and its raw counts if return_counts)."""
+    from .ResultsStore import ResultsStore
+    store = ResultsStore(store_path)
+    try:
+        return store.effs_dict(tag, channel, trigs, tag if mode is None else mode, ctau_lst, mDark_lst, mMed_lst, return_counts)
+    finally:
+        store.close()
@@ -0,0 +1,202 @@
+import os
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from .TrigUtils import genFileName
+from .TrigMatrix import trig_matrix, count_matrix
+from .TrigBits import PackedMenu
+from .BranchPlan import BranchPlan, BranchReader
+from .SampleTable import table_counts
+from .Incremental import file_fingerprint, fingerprint
+from .EffUncertainty import eff_intervals, nested_ratio_intervals, BOOTSTRAP_SEED
+from .Instrument import stage, timed
+
+@timed
+def compute_efficiencies(interestTrigs, data_dir, mMed_lst, mDark_lst, ctau_lst, channel, mode, unprescaled=[], excludedtrigs=[], entry_stop=-1, workers=None, executor=None, cache=None, store=None, tag=None, incremental=False, read_workers=None, stager=None, engine="sample", return_counts=False):
+    # engine: "sample" reduces each sample on its own, "table" reads all of them into one SampleTable first
+    # return_counts: also return the raw pass counts and totals (see raw_counts), e.g. for effs_intervals
+    if mode not in ["L1", "HLT"]: raise ValueError("Mode must be either L1 or HLT")
+    for trig in interestTrigs: 
+        if not trig.startswith(mode): raise ValueError("Mode does not match type of triggers given. Use HLT or L1 for mode.")
+    if incremental and store is None: raise ValueError("Incremental mode needs a results store")
+    if engine not in ["sample", "table"]: raise ValueError("Engine must be either sample or table")
+    if engine == "table" and (workers is not None or executor is not None): raise ValueError("The table engine runs in a single process")
+    tag = mode if tag is None else tag
+
+    samples = [(ctau, mDark, mMed) for ctau, mDark in itertools.product(ctau_lst, mDark_lst) for mMed in mMed_lst]
+    exclude = interestTrigs + excludedtrigs
+    candidates = sorted(set(unprescaled) - set(exclude))
+
+    # Work out what each sample needs: everything, only the stale triggers, or nothing
+    tasks, fingerprints, previous = [], [], []
+    for ctau, mDark, mMed in samples:
+        data_file = os.path.join(data_dir, genFileName(mMed, mDark, ctau, channel=channel))
+        fingerprints.append(cell_fingerprints(data_file, interestTrigs, candidates, entry_stop))
+        task = (data_file, interestTrigs, mode, list(unprescaled), exclude, entry_stop, cache)
+        stored = None
+        if incremental:
+            old = store.fingerprints(tag, channel, ctau, mDark, mMed)
+            if old.get("best") == fingerprints[-1]["best"]:
+                stored = store.sample_counts(tag, channel, ctau, mDark)[(ctau, mDark, mMed)]
+                stale = [trig for trig in interestTrigs if old.get(trig) != fingerprints[-1][trig]]
+                task = None if not stale else (data_file, stale, mode, list(unprescaled), exclude, entry_stop, cache, stored["best_name"])
+        tasks.append(task)
+        previous.append(stored)
+    if incremental:
+        print("Recomputing {} of {} samples".format(sum(task is not None for task in tasks), len(tasks)))
+
+    # Reduce every sample to its pass counts, either serially or on a process pool
+    results = [None] * len(tasks)
+    todo = [i for i, task in enumerate(tasks) if task is not None]
+    if engine == "table" and todo:
+        if stager is not None: stager.plan([tasks[i][0] for i in todo])
+        with BranchReader(cache, read_workers, stager) as reader:
+            for i, result in zip(todo, table_counts([tasks[i] for i in todo], [samples[i] for i in todo], reader, stager)):
+                results[i] = result
+    elif workers is None and executor is None:
+        # one reader, and its decompression threads, for all samples; staged files are prefetched in this order
+        if stager is not None: stager.plan([tasks[i][0] for i in todo])
+        with BranchReader(cache, read_workers, stager) as reader:
+            for i in todo:
+                print("Loading sample: ctau = {}, mDark = {}, mMed = {}".format(*samples[i]))
+                with stage("sample"):
+                    results[i] = sample_counts(*tasks[i], reader=reader)
+    elif todo:
+        print("Processing {} samples in parallel".format(len(todo)))
+        pool = executor if executor is not None else ProcessPoolExecutor(max_workers=workers)
+        # stages inside the workers are not recorded, only the wall time of the whole pool
+        try:
+            with stage("pool"):
+                futures = {i: pool.submit(sample_counts, *tasks[i]) for i in todo}
+                for i, future in futures.items():
+                    results[i] = future.result()
+        finally:
+            if executor is None: pool.shutdown()
+
+    counts = []
+    for i, (ctau, mDark, mMed) in enumerate(samples):
+        sample = dict(previous[i]) if previous[i] is not None else {}
+        if results[i] is not None: sample.update(results[i])
+        counts.append(sample)
+        if store is not None and results[i] is not None:
+            store.put_sample(tag, channel, ctau, mDark, mMed, sample)
+            store.put_fingerprints(tag, channel, ctau, mDark, mMed, fingerprints[i])
+
+    effs_dict = merge_counts(samples, counts, interestTrigs, mode)
+    if return_counts: return effs_dict, raw_counts(samples, counts, interestTrigs)
+    return effs_dict
+
+def cell_fingerprints(data_file, interestTrigs, candidates, entry_stop):
+    """Input fingerprints of the best-trigger cell and of each interest trigger cell of a sample."""
+    best = fingerprint(file_fingerprint(data_file), candidates, entry_stop)
+    fingerprints = {"best": best}
+    for trig in interestTrigs:
+        fingerprints[trig] = fingerprint(best, trig)
+    return fingerprints
+
+def sample_counts(data_file, interestTrigs, mode, unprescaled, exclude, entry_stop=-1, cache=None, best_name=None, reader=None):
+    """
+    Pass counts of the interest triggers, the best unprescaled trigger and their ORs for one sample.
+    Only the interest triggers and the candidates for the best trigger are read, or only the best
+    trigger if it is already known.
+    """
+    if best_name is not None: unprescaled, exclude = [best_name], []
+    plan = BranchPlan(interestTrigs, unprescaled, exclude, mode=mode)
+    if reader is None: reader = BranchReader(cache)
+    data = reader.read(data_file, plan.branches(), entry_stop=entry_stop)
+    menu = list(data.keys())
+    with stage("matrix"):
+        matrix = trig_matrix(data, menu)
+    with stage("count"):
+        return count_matrix(matrix, menu, interestTrigs, unprescaled, exclude)
+
+def merge_counts(samples, counts, interestTrigs, mode):
+    """Turns per-sample counts, ordered as (ctau, mDark, mMed), into the effs_dict layout."""
+    effs_dict = {}
+    for (ctau, mDark, mMed), sample in zip(samples, counts):
+        if (ctau, mDark) not in effs_dict:
+            effs_dict[(ctau, mDark)] = {mode: []}
+            for trig in interestTrigs:
+                effs_dict[(ctau, mDark)][trig] = []
+                effs_dict[(ctau, mDark)]["best_name"] = []
+                effs_dict[(ctau, mDark)]["best"] = []
+                effs_dict[(ctau, mDark)]["best+" + trig] = []
+        effs = effs_dict[(ctau, mDark)]
+        denom = sample["denom"]
+        for trig in interestTrigs:
+            effs[trig].append(sample[trig] / denom)
+            effs["best+" + trig].append(sample["best+" + trig] / denom)
+        if interestTrigs:
+            effs["best_name"].append(sample["best_name"])
+            effs["best"].append(sample["best"] / denom)
+    return effs_dict
+
+def raw_counts(samples, counts, interestTrigs):
+    """
+    Pass counts and totals behind an effs_dict, as {(ctau, mDark): {"denom": [...], "counts": {name: [...]}}}
+    with one entry per mMed, in the order of the efficiencies.
+    """
+    raw = {}
+    for (ctau, mDark, mMed), sample in zip(samples, counts):
+        if (ctau, mDark) not in raw:
+            raw[(ctau, mDark)] = {"denom": [], "counts": {name: [] for name in count_names(interestTrigs)}}
+        cell = raw[(ctau, mDark)]
+        cell["denom"].append(sample["denom"])
+        for name in cell["counts"]:
+            cell["counts"][name].append(sample[name])
+    return raw
+
+def count_names(interestTrigs):
+    return list(interestTrigs) + (["best"] if interestTrigs else []) + ["best+" + trig for trig in interestTrigs]
+
+def effs_intervals(counts, interestTrigs, method="wilson", n_boot=1000, seed=BOOTSTRAP_SEED):
+    """
+    Intervals of every efficiency of an effs_dict and of every best+X / best ratio, computed for all
+    cells of the grid at once from their raw_counts. Returns {(ctau, mDark): {name: (lower, upper)}},
+    where the ratio of best+X over best is under "best+X/best" as (ratio, lower, upper).
+    """
+    keys = list(counts)
+    names = count_names(interestTrigs)
+    numer = np.array([[counts[key]["counts"][name] for name in names] for key in keys])
+    denom = np.array([counts[key]["denom"] for key in keys])[:, None, :]
+    _, lower, upper = eff_intervals(numer, denom, method=method)
+
+    n_or = numer[:, [names.index("best+" + trig) for trig in interestTrigs]]
+    n_best = numer[:, [names.index("best")]]
+    ratio, ratio_lower, ratio_upper = nested_ratio_intervals(n_or, n_best, denom, n_boot=n_boot, seed=seed)
+
+    intervals = {}
+    for k, key in enumerate(keys):
+        intervals[key] = {name: (lower[k, i], upper[k, i]) for i, name in enumerate(names)}
+        for i, trig in enumerate(interestTrigs):
+            intervals[key]["best+" + trig + "/best"] = (ratio[k, i], ratio_lower[k, i], ratio_upper[k, i])
+    return intervals
+
+@timed
+def load_menus(data_dir, mMed_lst, mDark_lst, ctau_lst, channel, mode, trigs=None, entry_stop=-1, cache=None, read_workers=None):
+    """Bit-packed trigger decisions of every sample of the grid, keyed by (ctau, mDark, mMed). Only trigs are read if given."""
+    if mode not in ["L1", "HLT"]: raise ValueError("Mode must be either L1 or HLT")
+    menus = {}
+    branches = mode + "_*" if trigs is None else BranchPlan(trigs, mode=mode).branches()
+    with BranchReader(cache, read_workers) as reader:
+        for ctau, mDark, mMed in itertools.product(ctau_lst, mDark_lst, mMed_lst):
+            data_file = os.path.join(data_dir, genFileName(mMed, mDark, ctau, channel=channel))
+            data = reader.read(data_file, branches, entry_stop=entry_stop)
+            menus[(ctau, mDark, mMed)] = PackedMenu.from_arrays(data, list(data.keys()))
+    return menus
+
+@timed
+def findBestTrig(trig_rslts, unprescaled, exclude=[]):
+    trigs_unprescaled = [trig for trig in trig_rslts.fields if trig not in exclude and trig in unprescaled]
+    trues = np.count_nonzero(trig_matrix(trig_rslts, trigs_unprescaled), axis=0)
+    return trigs_unprescaled[int(np.argmax(trues))]
+
+def printBestTrigs(effs_dict, printeff=True):
+    for key in effs_dict.keys():
+        best_names = effs_dict[key]["best_name"]
+        best_effs = effs_dict[key]["best"]
+        print("Best triggers for ctau = {} and dark hadron mass = {}:".format(key[0], key[1]))
+        print(best_names)
+        if printeff: print(best_effs)
+        print()
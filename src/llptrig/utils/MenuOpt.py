@@ -0,0 +1,105 @@
+"""
+Trigger menu optimisation: choose the K paths whose OR maximises the mean efficiency
+over a set of samples (e.g. the whole EMJ grid), optionally under a rate budget.
+
+The per-sample PackedMenus are laid side by side into one (paths x words) bitset, so
+the marginal gain of every candidate path over the current selection is a single
+vectorised ANDNOT + popcount, reduced per sample with np.add.reduceat.
+"""
+
+import numpy as np
+
+from .TrigBits import word_popcount
+
+class MenuProblem:
+    def __init__(self, menus, candidates=None, weights=None, rates=None):
+        menus = list(menus.values()) if isinstance(menus, dict) else list(menus)
+        if candidates is None:
+            candidates = [name for name in menus[0].names if all(name in menu for menu in menus)]
+        self.candidates = list(candidates)
+        self.num_entries = np.array([menu.num_entries for menu in menus], dtype=np.float64)
+        self.weights = np.full(len(menus), 1 / len(menus)) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.rates = None if rates is None else np.array([rates.get(name, np.inf) for name in self.candidates])
+
+        # all samples side by side, paths missing from a sample never fire there
+        self.offsets = np.cumsum([0] + [menu.bits.shape[1] for menu in menus[:-1]])
+        self.bits = np.zeros((len(self.candidates), sum(menu.bits.shape[1] for menu in menus)), dtype=np.uint64)
+        for menu, offset in zip(menus, self.offsets):
+            for i, name in enumerate(self.candidates):
+                if name in menu: self.bits[i, offset:offset + menu.bits.shape[1]] = menu.row(name)
+
+    def value(self, covered):
+        """Weighted mean efficiency of the events set in covered."""
+        counts = np.add.reduceat(word_popcount(covered).astype(np.int64), self.offsets)
+        return float(counts / self.num_entries @ self.weights)
+
+    def gains(self, covered, block_words=1 << 24):
+        """Weighted efficiency gained by adding each candidate path to the events already covered."""
+        gains = np.empty(len(self.candidates))
+        block = max(block_words // max(self.bits.shape[1], 1), 1)
+        for start in range(0, len(self.candidates), block):
+            new = word_popcount(self.bits[start:start + block] & ~covered).astype(np.int64)
+            gains[start:start + block] = np.add.reduceat(new, self.offsets, axis=1) / self.num_entries @ self.weights
+        return gains
+
+    def feasible(self, chosen, rate_budget):
+        if rate_budget is None or self.rates is None: return np.ones(len(self.candidates), dtype=bool)
+        return self.rates <= rate_budget - sum(self.rates[i] for i in chosen)
+
+def greedy_menu(menus, k, candidates=None, weights=None, rates=None, rate_budget=None, per_rate=False):
+    """
+    Greedy selection of up to k paths. Returns a list of (path, marginal gain, efficiency of the OR so far).
+    rates maps path names to their rate; with rate_budget the summed rate of the chosen paths stays
+    within it, and per_rate ranks candidates by gain per unit rate instead of by gain.
+    """
+    problem = menus if isinstance(menus, MenuProblem) else MenuProblem(menus, candidates, weights, rates)
+    covered = np.zeros(problem.bits.shape[1], dtype=np.uint64)
+    chosen, report = [], []
+    for _ in range(k):
+        gains = problem.gains(covered)
+        score = gains / problem.rates if per_rate and problem.rates is not None else gains.copy()
+        score[~problem.feasible(chosen, rate_budget)] = -np.inf
+        score[chosen] = -np.inf
+        best = int(np.argmax(score))
+        if not np.isfinite(score[best]) or gains[best] <= 0: break
+        chosen.append(best)
+        covered |= problem.bits[best]
+        report.append((problem.candidates[best], float(gains[best]), problem.value(covered)))
+    return report
+
+def exact_menu(menus, k, candidates=None, weights=None, rates=None, rate_budget=None, pool=None):
+    """
+    Branch-and-bound search for the best set of at most k paths, practical for small k.
+    pool restricts the search to the paths with the highest individual efficiency.
+    Returns the same report as greedy_menu.
+    """
+    problem = menus if isinstance(menus, MenuProblem) else MenuProblem(menus, candidates, weights, rates)
+    empty = np.zeros(problem.bits.shape[1], dtype=np.uint64)
+    order = np.argsort(-problem.gains(empty), kind="stable")
+    if pool is not None: order = order[:pool]
+
+    greedy = greedy_menu(problem, k, rate_budget=rate_budget)
+    best = {"value": greedy[-1][2] if greedy else 0.0, "chosen": [problem.candidates.index(p) for p, _, _ in greedy]}
+
+    def search(chosen, covered, value, start):
+        if len(chosen) == k: return
+        remaining = order[start:]
+        gains = problem.gains(covered)[remaining]
+        gains[~problem.feasible(chosen, rate_budget)[remaining]] = 0
+        for j in range(len(remaining)):
+            # submodularity: the best k - |chosen| marginal gains left bound any completion
+            if value + np.sort(gains[j:])[::-1][:k - len(chosen)].sum() <= best["value"] + 1e-12: return
+            if gains[j] <= 0: continue
+            i = remaining[j]
+            if value + gains[j] > best["value"] + 1e-12:
+                best["value"], best["chosen"] = value + gains[j], chosen + [i]
+            search(chosen + [i], covered | problem.bits[i], value + gains[j], start + j + 1)
+
+    search([], empty, 0.0, 0)
+
+    covered, report = empty.copy(), []
+    for i in best["chosen"]:
+        gain = problem.value(covered | problem.bits[i]) - problem.value(covered)
+        covered |= problem.bits[i]
+        report.append((problem.candidates[i], gain, problem.value(covered)))
+    return report
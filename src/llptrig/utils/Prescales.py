@@ -0,0 +1,110 @@
+"""
+Prescale-weighted efficiencies and rates from the full prescale table.
+
+A path with prescale N accepts an event it fires on with probability 1/N (0 if the
+path is disabled), independently of the other paths, so the probability that the
+menu keeps an event is 1 - prod(1 - 1/N) over the paths that fired. In log space the
+product is a sum, so for every lumi column at once it is a (events x paths) @
+(paths x columns) matrix product, done block by block on the unpacked PackedMenu bits.
+"""
+
+import csv
+import numpy as np
+
+class PrescaleTable:
+    """Prescales of every path (rows) in every lumi column (columns), as read from the csv of getHLTTableFromConfig.py."""
+    def __init__(self, names, columns, prescales):
+        self.names = list(names)
+        self.columns = list(columns)
+        self.prescales = np.asarray(prescales, dtype=np.int64)
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def from_csv(cls, path, menu=None):
+        """
+        Reads a csv with a Name column followed by one column per lumi label (an Index column before Name is ignored).
+        Combined tables of several menus have a Menu column, and menu selects which one to read.
+        """
+        with open(path, newline="") as f:
+            rows = list(csv.reader(f))
+        header, rows = rows[0], rows[1:]
+        if "Menu" in header:
+            menus = list(dict.fromkeys(row[header.index("Menu")] for row in rows))
+            if menu is None and len(menus) > 1: raise ValueError("{} holds several menus, choose one of {}".format(path, menus))
+            menu = menus[0] if menu is None else menu
+            rows = [row for row in rows if row[header.index("Menu")] == menu]
+        start = header.index("Name")
+        # lumi labels that this menu does not have are left empty
+        cols = [i for i in range(start + 1, len(header)) if any(row[i] != "" for row in rows)]
+        names = [row[start] for row in rows]
+        prescales = [[int(float(row[i])) for i in cols] for row in rows]
+        return cls(names, [header[i] for i in cols], prescales)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def column(self, column):
+        return self.prescales[:, self.columns.index(column)]
+
+    def unprescaled(self, column):
+        """Paths with prescale 1 in the given column."""
+        return [name for name, ps in zip(self.names, self.column(column)) if ps == 1]
+
+    def weights(self, names=None, columns=None):
+        """Acceptance 1/prescale of each path (rows) in each column, 0 for disabled paths and paths not in the table."""
+        names = self.names if names is None else list(names)
+        columns = self.columns if columns is None else list(columns)
+        cols = [self.columns.index(column) for column in columns]
+        weights = np.zeros((len(names), len(cols)))
+        for i, name in enumerate(names):
+            if name not in self._index: continue
+            ps = self.prescales[self._index[name], cols]
+            weights[i] = np.where(ps > 0, 1 / np.maximum(ps, 1), 0)
+        return weights
+
+def pass_probability(menu, weights, names=None, mask=None, block_words=1 << 12):
+    """
+    Probability that each event of a PackedMenu is kept, for each column of weights (paths x columns,
+    in the order of names). Returns an (events x columns) array. If a packed mask is given, the events
+    set in it are kept for sure (e.g. an unprescaled AD seed ORed with the menu).
+    """
+    rows = menu.bits if names is None else menu.rows(names)
+    weights = np.asarray(weights, dtype=np.float64)
+    # unprescaled paths keep the event for sure, the others multiply the probability of being dropped
+    sure = (weights >= 1).astype(np.float32)
+    with np.errstate(divide="ignore"):
+        log_drop = np.where(weights < 1, np.log1p(-np.minimum(weights, 1)), 0)
+
+    prob = np.empty((rows.shape[1] * 64, weights.shape[1]))
+    for start in range(0, rows.shape[1], block_words):
+        fired = np.unpackbits(rows[:, start:start + block_words].view(np.uint8), axis=1).T
+        block = slice(start * 64, start * 64 + fired.shape[0])
+        prob[block] = np.where(fired @ sure > 0, 1.0, -np.expm1(fired @ log_drop))
+    prob = prob[:menu.num_entries]
+    if mask is not None:
+        prob[menu.unpack(mask)] = 1.0
+    return prob
+
+def weighted_counts(menu, table, columns=None, names=None, mask=None):
+    """Expected number of events kept by the prescaled menu in each lumi column, as {column: count}."""
+    names = [name for name in (menu.names if names is None else names) if name in table and name in menu]
+    columns = table.columns if columns is None else list(columns)
+    prob = pass_probability(menu, table.weights(names, columns), names, mask=mask)
+    return dict(zip(columns, prob.sum(axis=0)))
+
+def weighted_efficiency(menu, table, columns=None, names=None, mask=None):
+    """Expected efficiency of the prescaled menu in each lumi column, as {column: efficiency}."""
+    counts = weighted_counts(menu, table, columns, names, mask)
+    return {column: count / menu.num_entries for column, count in counts.items()}
+
+def weighted_rates(menu, table, bx_rate_khz, columns=None, names=None):
+    """
+    Expected rate in kHz of the prescaled menu in each column, and of each path alone, from a
+    zero-bias sample. Returns ({column: rate}, {column: {path: rate}}).
+    """
+    names = [name for name in (menu.names if names is None else names) if name in table and name in menu]
+    columns = table.columns if columns is None else list(columns)
+    weights = table.weights(names, columns)
+    total = pass_probability(menu, weights, names).mean(axis=0) * bx_rate_khz
+    paths = menu.counts(names)[:, None] * weights / menu.num_entries * bx_rate_khz
+    return dict(zip(columns, total)), {column: dict(zip(names, paths[:, j])) for j, column in enumerate(columns)}
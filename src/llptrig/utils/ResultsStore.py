@@ -0,0 +1,172 @@
+"""
+SQLite store for efficiency results.
+
+Every sample (tag, channel, ctau, mDark, mMed) keeps its raw counts, one row per
+trigger or AD working point with the numerator, plus the denominator and best
+trigger of the sample and its histograms. Writes are upserts, so samples can be
+added or recomputed one at a time, and the loaders rebuild the effs_dict of
+compute_efficiencies and the signals list of trigger_effs for plotting.
+"""
+
+import json
+import sqlite3
+import itertools
+import numpy as np
+
+from .Hists import encode, decode
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    tag TEXT, channel TEXT, ctau NUMERIC, mDark NUMERIC, mMed NUMERIC,
+    denom INTEGER, best_name TEXT,
+    PRIMARY KEY (tag, channel, ctau, mDark, mMed)
+);
+CREATE TABLE IF NOT EXISTS counts (
+    tag TEXT, channel TEXT, ctau NUMERIC, mDark NUMERIC, mMed NUMERIC, name TEXT,
+    pos INTEGER, numer INTEGER,
+    PRIMARY KEY (tag, channel, ctau, mDark, mMed, name)
+);
+CREATE TABLE IF NOT EXISTS hists (
+    tag TEXT, channel TEXT, ctau NUMERIC, mDark NUMERIC, mMed NUMERIC, key TEXT,
+    counts BLOB, edges BLOB,
+    PRIMARY KEY (tag, channel, ctau, mDark, mMed, key)
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    tag TEXT, channel TEXT, ctau NUMERIC, mDark NUMERIC, mMed NUMERIC, name TEXT,
+    fingerprint TEXT,
+    PRIMARY KEY (tag, channel, ctau, mDark, mMed, name)
+);
+CREATE TABLE IF NOT EXISTS signals (
+    tag TEXT, channel TEXT, ctau NUMERIC, mDark NUMERIC,
+    pos INTEGER, meta TEXT,
+    PRIMARY KEY (tag, channel, ctau, mDark)
+);
+"""
+
+# keys of a trigger_effs signal dict that are results rather than metadata
+RESULT_KEYS = ["results", "hists", "counts"]
+
+class ResultsStore:
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def put_sample(self, tag, channel, ctau, mDark, mMed, counts):
+        """
+        Upserts the counts of one sample, given as {"denom": ..., "best_name": ..., name: numerator, ...}
+        (the format returned by LLPTrigUtils.sample_counts). Float numerators (prescale-weighted) are kept as floats.
+        """
+        key = (tag, channel, ctau, mDark, mMed)
+        numers = [(name, numer) for name, numer in counts.items() if name not in ["denom", "best_name"]]
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO samples VALUES (?,?,?,?,?,?,?)", key + (int(counts["denom"]), counts.get("best_name")))
+            self.db.execute("DELETE FROM counts WHERE tag=? AND channel=? AND ctau=? AND mDark=? AND mMed=?", key)
+            self.db.executemany(
+                "INSERT INTO counts VALUES (?,?,?,?,?,?,?,?)",
+                [key + (name, pos, numer if isinstance(numer, float) else int(numer)) for pos, (name, numer) in enumerate(numers)]
+            )
+
+    def put_hists(self, tag, channel, ctau, mDark, mMed, hists):
+        """Upserts histograms given as {key: hist}, each a Hist1D/Hist2D or an np.histogram-style (counts, edges) pair."""
+        key = (tag, channel, ctau, mDark, mMed)
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO hists VALUES (?,?,?,?,?,?,?,?)",
+                [key + (name,) + encode(hist) for name, hist in hists.items()]
+            )
+
+    def put_fingerprints(self, tag, channel, ctau, mDark, mMed, fingerprints):
+        """Upserts the input fingerprints of the cells of one sample, given as {name: fingerprint}."""
+        key = (tag, channel, ctau, mDark, mMed)
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO fingerprints VALUES (?,?,?,?,?,?,?)", [key + (name, fp) for name, fp in fingerprints.items()])
+
+    def fingerprints(self, tag, channel, ctau, mDark, mMed):
+        rows = self.db.execute("SELECT name, fingerprint FROM fingerprints WHERE tag=? AND channel=? AND ctau=? AND mDark=? AND mMed=?", (tag, channel, ctau, mDark, mMed))
+        return dict(rows.fetchall())
+
+    def put_signal(self, tag, signal):
+        """Upserts a trigger_effs signal dict: its metadata, and the counts and histograms of each mass."""
+        channel, ctau, mDark = signal_key(signal)
+        meta = {k: v for k, v in signal.items() if k not in RESULT_KEYS}
+        with self.db:
+            row = self.db.execute("SELECT pos FROM signals WHERE tag=? AND channel=? AND ctau=? AND mDark=?", (tag, channel, ctau, mDark)).fetchone()
+            pos = row[0] if row is not None else self.db.execute("SELECT COUNT(*) FROM signals WHERE tag=?", (tag,)).fetchone()[0]
+            self.db.execute("INSERT OR REPLACE INTO signals VALUES (?,?,?,?,?,?)", (tag, channel, ctau, mDark, pos, json.dumps(meta)))
+        for mass, counts in signal.get("counts", {}).items():
+            self.put_sample(tag, channel, ctau, mDark, mass, counts)
+        hists = {}
+        for key, per_mass in signal.get("hists", {}).items():
+            for mass, hist in per_mass.items():
+                hists.setdefault(mass, {})[key] = hist
+        for mass, mass_hists in hists.items():
+            self.put_hists(tag, channel, ctau, mDark, mass, mass_hists)
+
+    def samples(self, tag, channel=None):
+        """Stored samples of a tag as (channel, ctau, mDark, mMed) tuples."""
+        query, params = "SELECT channel, ctau, mDark, mMed FROM samples WHERE tag=?", (tag,)
+        if channel is not None: query, params = query + " AND channel=?", params + (channel,)
+        return [tuple(row) for row in self.db.execute(query + " ORDER BY channel, ctau, mDark, mMed", params)]
+
+    def sample_counts(self, tag, channel, ctau=None, mDark=None):
+        """Counts of the stored samples, as {(ctau, mDark, mMed): counts}, in the put_sample format."""
+        query, params = "SELECT ctau, mDark, mMed, denom, best_name FROM samples WHERE tag=? AND channel=?", (tag, channel)
+        if ctau is not None: query, params = query + " AND ctau=? AND mDark=?", params + (ctau, mDark)
+        samples = {}
+        for ctau_, mDark_, mMed, denom, best_name in self.db.execute(query, params):
+            samples[(ctau_, mDark_, mMed)] = {"denom": denom, "best_name": best_name}
+        query = "SELECT ctau, mDark, mMed, name, numer FROM counts WHERE tag=? AND channel=?" + (" AND ctau=? AND mDark=?" if ctau is not None else "")
+        for ctau_, mDark_, mMed, name, numer in self.db.execute(query + " ORDER BY pos", params):
+            if (ctau_, mDark_, mMed) in samples: samples[(ctau_, mDark_, mMed)][name] = numer
+        return samples
+
+    def hists(self, tag, channel, ctau, mDark):
+        """Histograms as {key: {mMed: Hist1D or Hist2D}}."""
+        hists = {}
+        rows = self.db.execute("SELECT mMed, key, counts, edges FROM hists WHERE tag=? AND channel=? AND ctau=? AND mDark=?", (tag, channel, ctau, mDark))
+        for mMed, key, counts, edges in rows:
+            hists.setdefault(key, {})[mMed] = decode(counts, edges)
+        return hists
+
+    def effs_dict(self, tag, channel, interestTrigs, mode, ctau_lst=None, mDark_lst=None, mMed_lst=None, return_counts=False):
+        """Rebuilds the effs_dict of compute_efficiencies from the stored counts, and their raw_counts if return_counts."""
+        from .LLPTrigUtils import merge_counts, raw_counts
+        counts = self.sample_counts(tag, channel)
+        if ctau_lst is None: ctau_lst = sorted({key[0] for key in counts})
+        if mDark_lst is None: mDark_lst = sorted({key[1] for key in counts})
+        if mMed_lst is None: mMed_lst = sorted({key[2] for key in counts})
+        samples = [(ctau, mDark, mMed) for ctau, mDark, mMed in itertools.product(ctau_lst, mDark_lst, mMed_lst) if (ctau, mDark, mMed) in counts]
+        counts = [counts[sample] for sample in samples]
+        effs_dict = merge_counts(samples, counts, interestTrigs, mode)
+        if return_counts: return effs_dict, raw_counts(samples, counts, interestTrigs)
+        return effs_dict
+
+    def signals(self, tag):
+        """Rebuilds the list of trigger_effs signal dicts, with results and hists, in the order they were stored."""
+        signals = []
+        for channel, ctau, mDark, meta in self.db.execute("SELECT channel, ctau, mDark, meta FROM signals WHERE tag=? ORDER BY pos", (tag,)).fetchall():
+            signal = json.loads(meta)
+            counts = {key[2]: sample for key, sample in self.sample_counts(tag, channel, ctau, mDark).items()}
+            masses = [mass for mass in signal["masses"] if mass in counts]
+            results = []
+            for mass in masses:
+                effs = {"mass": mass}
+                for name, numer in counts[mass].items():
+                    if name in ["denom", "best_name"]: continue
+                    effs[name] = float(numer)/float(counts[mass]["denom"])
+                results.append(effs)
+            if results:
+                effs_dtype = {"names": list(results[0].keys()), "formats": ['f8']*len(results[0].keys())}
+                signal["results"] = np.array([tuple(effs.values()) for effs in results], effs_dtype)
+            signal["hists"] = self.hists(tag, channel, ctau, mDark)
+            signal["counts"] = counts
+            signals.append(signal)
+        return signals
+
+def signal_key(signal):
+    """(channel, ctau, mDark) of a trigger_effs signal dict; signals without them (e.g. bkg) use their name."""
+    return signal.get("channel", signal["name"]), signal.get("ctau", 0), signal.get("mDark", 0)
@@ -0,0 +1,148 @@
+"""
+All samples of a grid in one contiguous columnar table.
+
+The trigger bits of every sample are copied into a single preallocated (paths x events)
+boolean matrix, one contiguous row per path with the events sorted by sample, plus an
+integer sample-id column and the offset of each sample, so the memory needed is known
+before the first file is read. Pass counts of all paths in
+all samples are then one np.add.reduceat over the sample offsets, and best+X ORs one
+more, instead of a Python loop over samples and triggers.
+"""
+
+import numpy as np
+import uproot
+
+from .TrigUtils import uproot_entry_stop
+from .TrigMatrix import best_index
+from .BranchPlan import BranchPlan, BranchReader
+from .Instrument import stage, timed
+
+def _num_rows(num_entries, entry_stop):
+    # same convention as BranchReader.read: None or -1 for all, other negative values count from the end
+    entry_stop = uproot_entry_stop(entry_stop)
+    if entry_stop is None: return num_entries
+    if entry_stop < 0: return max(num_entries + entry_stop, 0)
+    return min(entry_stop, num_entries)
+
+class SampleTable:
+    def __init__(self, samples, names, matrix, sizes, present, orders=None):
+        self.samples = list(samples)
+        self.names = list(names)
+        self.matrix = matrix
+        self.sizes = np.asarray(sizes, dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(self.sizes)[:-1]]).astype(np.int64)
+        # present[s, j]: path j exists in the file of sample s
+        self.present = present
+        # order of the paths in each file, which breaks ties between best candidates as in sample_counts
+        self.orders = orders
+        self._index = {name: j for j, name in enumerate(self.names)}
+
+    @classmethod
+    def from_files(cls, samples, files, names, reader=None, entry_stop=None, stager=None):
+        """
+        Reads the named paths of each file into one table, each file once (through the stager if
+        given). Paths missing from a file never fire there.
+        """
+        names = list(names)
+        reader = BranchReader(stager=stager) if reader is None else reader
+        # entry counts come from the tree metadata of the source files, so nothing is staged before the
+        # reads (which then go through the stager in order, within its scratch cap)
+        sizes = []
+        for data_file in files:
+            with uproot.open(data_file) as f:
+                sizes.append(_num_rows(f["Events"].num_entries, entry_stop))
+        matrix = np.zeros((len(names), sum(sizes)), dtype=bool)
+        present = np.zeros((len(files), len(names)), dtype=bool)
+        orders = []
+        start = 0
+        for s, (data_file, size) in enumerate(zip(files, sizes)):
+            with stage("sample"):
+                data = reader.read(data_file, names, entry_stop=entry_stop)
+                for j, name in enumerate(names):
+                    if name not in data: continue
+                    if len(data[name]) != size: raise RuntimeError("Expected {} entries of {} in {}, got {}".format(size, name, data_file, len(data[name])))
+                    matrix[j, start:start + size] = np.asarray(data[name])
+                    present[s, j] = True
+                orders.append(list(data.keys()))
+                del data
+            start += size
+        return cls(samples, names, matrix, sizes, present, orders)
+
+    @property
+    def sample_ids(self):
+        """Sample index of every row of the table."""
+        return np.repeat(np.arange(len(self.samples), dtype=np.int32), self.sizes)
+
+    def columns(self, names):
+        return [self._index[name] for name in names]
+
+    def reduce(self, matrix, block_bytes=1 << 24):
+        """
+        Per-sample sums of each row of a (k x events) matrix aligned with the table, as (samples x k) int64.
+        Events are reduced in blocks, so the int64 temporary of reduceat stays within block_bytes.
+        """
+        sums = np.zeros((len(self.samples), matrix.shape[0]), dtype=np.int64)
+        ids = self.sample_ids
+        events = max(block_bytes // (8 * max(matrix.shape[0], 1)), 1)
+        for start in range(0, matrix.shape[1], events):
+            block_ids = ids[start:start + events]
+            # segments of the block start where the sample id changes; samples without events never appear
+            starts = np.flatnonzero(np.diff(block_ids, prepend=-1))
+            sums[block_ids[starts]] += np.add.reduceat(matrix[:, start:start + events], starts, axis=1, dtype=np.int64).T
+        return sums
+
+    def counts(self, names=None):
+        """Pass counts of every path (or of names) in every sample, (samples x paths)."""
+        return self.reduce(self.matrix if names is None else self.matrix[self.columns(names)])
+
+    def best(self, counts, candidates):
+        """Column of the best of the candidates[s] present in each sample s, given the (samples x paths) counts."""
+        best = np.empty(len(self.samples), dtype=np.int64)
+        for s, cands in enumerate(candidates):
+            cands = set(cands)
+            order = self.orders[s] if self.orders is not None else self.names
+            names = [name for name in order if name in cands and self.present[s, self._index[name]]]
+            cols = self.columns(names)
+            best[s] = cols[best_index(counts[s, cols], names, names)]
+        return best
+
+    def or_counts(self, names, columns):
+        """Per-sample counts of each of names ORed with the per-sample column given in columns."""
+        best = np.empty(self.matrix.shape[1], dtype=bool)
+        for s, column in enumerate(columns):
+            best[self.offsets[s]:self.offsets[s] + self.sizes[s]] = self.matrix[column, self.offsets[s]:self.offsets[s] + self.sizes[s]]
+        return self.reduce(self.matrix[self.columns(names)] | best)
+
+@timed
+def table_counts(tasks, samples, reader=None, stager=None):
+    """
+    Same results as LLPTrigUtils.sample_counts for a list of its argument tuples, all computed on
+    one SampleTable: one reduction for the counts of every path and one for the best+X ORs.
+    """
+    plans = []
+    for task in tasks:
+        data_file, interestTrigs, mode, unprescaled, exclude = task[:5]
+        best_name = task[7] if len(task) > 7 else None
+        if best_name is not None: unprescaled, exclude = [best_name], []
+        plans.append((interestTrigs, BranchPlan(interestTrigs, unprescaled, exclude, mode=mode)))
+    names = list(dict.fromkeys(name for _, plan in plans for name in plan.branches()))
+    entry_stop = tasks[0][5]
+    if any(task[5] != entry_stop for task in tasks): raise ValueError("All samples of a table need the same entry_stop")
+
+    table = SampleTable.from_files(samples, [task[0] for task in tasks], names, reader, entry_stop, stager)
+    with stage("reduce"):
+        counts = table.counts()
+        best = table.best(counts, [plan.candidates for _, plan in plans])
+        interest = list(dict.fromkeys(trig for trigs, _ in plans for trig in trigs))
+        or_counts = table.or_counts(interest, best)
+
+    results = []
+    for s, (interestTrigs, _) in enumerate(plans):
+        for trig in interestTrigs:
+            if not table.present[s, table.columns([trig])[0]]: raise ValueError("{} is not in {}".format(trig, tasks[s][0]))
+        result = {"denom": int(table.sizes[s]), "best_name": table.names[best[s]], "best": int(counts[s, best[s]])}
+        for trig in interestTrigs:
+            result[trig] = int(counts[s, table.columns([trig])[0]])
+            result["best+" + trig] = int(or_counts[s, interest.index(trig)])
+        results.append(result)
+    return results
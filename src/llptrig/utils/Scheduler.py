@@ -0,0 +1,175 @@
+"""
+Checkpointed task scheduling for the signal grid.
+
+A work directory holds a manifest (the job configuration and the list of tasks) and
+one checkpoint per finished task, written atomically, plus an error file per failed
+task. Any task without a checkpoint can be (re)submitted, so an interrupted or partly
+failed grid is resumed by submitting only the tasks that are not done yet.
+
+Backends only differ in where a task runs: LocalBackend on a process pool in this
+process, CondorBackend as an HTCondor job array running the run-task command, and
+FakeBackend runs that same command in subprocesses, one at a time, for testing the
+batch path without a cluster.
+"""
+
+import os
+import sys
+import json
+import shlex
+import traceback
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+MANIFEST = "manifest.json"
+
+def _write_json(path, obj):
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "w") as f:
+        json.dump(obj, f)
+    os.replace(tmp_path, path)
+
+def _read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+class WorkDir:
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.task_dir = os.path.join(self.path, "tasks")
+
+    def create(self, config, tasks):
+        """Writes the manifest; tasks is a list of JSON-serialisable dicts with a unique "id"."""
+        os.makedirs(self.task_dir, exist_ok=True)
+        _write_json(os.path.join(self.path, MANIFEST), {"config": config, "tasks": tasks})
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.path, MANIFEST))
+
+    def manifest(self):
+        return _read_json(os.path.join(self.path, MANIFEST))
+
+    def task(self, task_id):
+        return next(task for task in self.manifest()["tasks"] if task["id"] == task_id)
+
+    def _checkpoint(self, task_id):
+        return os.path.join(self.task_dir, task_id + ".json")
+
+    def _error(self, task_id):
+        return os.path.join(self.task_dir, task_id + ".err")
+
+    def save(self, task_id, result):
+        _write_json(self._checkpoint(task_id), result)
+        if os.path.exists(self._error(task_id)): os.remove(self._error(task_id))
+
+    def fail(self, task_id, message):
+        with open(self._error(task_id), "w") as f:
+            f.write(message)
+
+    def result(self, task_id):
+        return _read_json(self._checkpoint(task_id))
+
+    def status(self):
+        """{task_id: "done" | "failed" | "pending"} for every task of the manifest."""
+        status = {}
+        for task in self.manifest()["tasks"]:
+            if os.path.exists(self._checkpoint(task["id"])): status[task["id"]] = "done"
+            elif os.path.exists(self._error(task["id"])): status[task["id"]] = "failed"
+            else: status[task["id"]] = "pending"
+        return status
+
+    def todo(self):
+        return [task_id for task_id, state in self.status().items() if state != "done"]
+
+def run_checkpointed(runner, workdir_path, task_id):
+    """Runs runner(config, task) and checkpoints its result; failures leave an error file and are re-raised."""
+    workdir = WorkDir(workdir_path)
+    try:
+        result = runner(workdir.manifest()["config"], workdir.task(task_id))
+    except BaseException:
+        workdir.fail(task_id, traceback.format_exc())
+        raise
+    workdir.save(task_id, result)
+    return task_id
+
+class LocalBackend:
+    """Runs tasks on a process pool of this machine and waits for them."""
+    def __init__(self, runner, workers=None):
+        self.runner = runner
+        self.workers = workers
+
+    def submit(self, workdir, task_ids):
+        failed = []
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {task_id: pool.submit(run_checkpointed, self.runner, workdir.path, task_id) for task_id in task_ids}
+            for task_id, future in futures.items():
+                try:
+                    future.result()
+                    print("done:", task_id)
+                except Exception as e:
+                    print("failed:", task_id, repr(e))
+                    failed.append(task_id)
+        return failed
+
+class CondorBackend:
+    """
+    Submits one HTCondor job per task, running command + [workdir, task_id].
+    The jobs run asynchronously; use the status of the work directory to follow them.
+    """
+    def __init__(self, command, requirements=None, dry_run=False):
+        self.command = list(command)
+        self.requirements = requirements
+        self.dry_run = dry_run
+
+    def submit_file(self, workdir, task_ids):
+        log_dir = os.path.join(workdir.path, "logs")
+        os.makedirs(log_dir, exist_ok=True)
+        with open(os.path.join(workdir.path, "task_ids.txt"), "w") as f:
+            f.write("\n".join(task_ids) + "\n")
+        lines = [
+            "universe = vanilla",
+            "executable = {}".format(self.command[0]),
+            "arguments = {} {} $(task_id)".format(" ".join(shlex.quote(arg) for arg in self.command[1:]), workdir.path),
+            "getenv = true",
+            "output = {}/$(task_id).out".format(log_dir),
+            "error = {}/$(task_id).err".format(log_dir),
+            "log = {}/condor.log".format(log_dir),
+        ]
+        if self.requirements is not None: lines.append("requirements = {}".format(self.requirements))
+        lines.append("queue task_id from {}".format(os.path.join(workdir.path, "task_ids.txt")))
+        path = os.path.join(workdir.path, "submit.jdl")
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+    def submit(self, workdir, task_ids):
+        path = self.submit_file(workdir, task_ids)
+        if self.dry_run:
+            print("wrote", path)
+        else:
+            subprocess.run(["condor_submit", path], check=True)
+        return []
+
+class FakeBackend(CondorBackend):
+    """
+    Writes the same submit file as CondorBackend, then runs each job's command in a subprocess,
+    one after the other. Tasks listed in fail are not run and get an error file instead.
+    """
+    def __init__(self, command, fail=()):
+        super().__init__(command)
+        self.fail = set(fail)
+
+    def submit(self, workdir, task_ids):
+        self.submit_file(workdir, task_ids)
+        failed = []
+        for task_id in task_ids:
+            if task_id in self.fail:
+                workdir.fail(task_id, "failure injected by FakeBackend\n")
+                failed.append(task_id)
+                continue
+            if subprocess.run(self.command + [workdir.path, task_id]).returncode != 0:
+                failed.append(task_id)
+        return failed
+
+def task_command(module, *command):
+    """Command that runs one task through the run-task subcommand of a module, e.g. task_command("llptrig", "grid")."""
+    return [sys.executable, "-m", module] + list(command) + ["run-task"]
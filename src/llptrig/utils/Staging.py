@@ -0,0 +1,119 @@
+"""
+Staging of input files from a slow (e.g. EOS FUSE) mount into a local scratch directory.
+
+The files of a run are registered in processing order with plan(). Each get() waits for
+its own file and starts copying the next `prefetch` files on a bounded thread pool, so
+the network reads of the next samples overlap with the reduction of the current one.
+Staged files are opened memory-mapped. The scratch directory is capped at max_bytes by
+evicting the least recently used staged files that are neither in use nor in flight.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+import uproot
+from concurrent.futures import ThreadPoolExecutor
+
+from .Incremental import file_fingerprint
+
+class Stager:
+    def __init__(self, scratch_dir, max_bytes=50 * 1024**3, prefetch=2, workers=2):
+        self.scratch_dir = scratch_dir
+        self.max_bytes = max_bytes
+        self.prefetch = prefetch
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.futures = {}
+        self.order = []
+        self.in_use = set()
+        self.consumed = set()
+        os.makedirs(scratch_dir, exist_ok=True)
+
+    def local_path(self, path):
+        digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+        return os.path.join(self.scratch_dir, digest + "_" + os.path.basename(path))
+
+    def plan(self, paths):
+        """Registers the order in which files will be read and starts prefetching the first ones."""
+        self.order = list(dict.fromkeys(paths))
+        for path in self.order[:self.prefetch]:
+            self._submit(path)
+
+    def get(self, path):
+        """Local copy of path, staged now if it was not prefetched, and prefetches the files after it."""
+        future = self._submit(path)
+        if path in self.order:
+            i = self.order.index(path)
+            for next_path in self.order[i + 1:i + 1 + self.prefetch]:
+                self._submit(next_path)
+        local = future.result()
+        with self.lock:
+            self.in_use = {local}
+            self.consumed.add(path)
+            os.utime(local)
+        return local
+
+    def open(self, path):
+        """
+        uproot file of the staged copy of path, memory-mapped. The caller closes it, e.g. by
+        opening it in a with block, like a file from uproot.open.
+        """
+        return uproot.open(self.get(path), handler=uproot.MemmapSource)
+
+    def _submit(self, path):
+        with self.lock:
+            if path not in self.futures:
+                self.futures[path] = self.pool.submit(self._stage, path)
+            return self.futures[path]
+
+    def _stage(self, path):
+        local = self.local_path(path)
+        meta_path = local + ".json"
+        source = file_fingerprint(path)
+        if os.path.exists(local) and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if json.load(f) == source: return local
+        self._evict(os.path.getsize(path), keep=local)
+        tmp_path = "{}.{}.tmp".format(local, threading.get_ident())
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, local)
+        with open(meta_path, "w") as f:
+            json.dump(source, f)
+        return local
+
+    def staged(self):
+        """Staged files as (last use, size, path), least recently used first."""
+        entries = []
+        for name in os.listdir(self.scratch_dir):
+            path = os.path.join(self.scratch_dir, name)
+            if name.endswith(".json") or name.endswith(".tmp") or not os.path.isfile(path): continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def _evict(self, needed, keep=None):
+        with self.lock:
+            # the file being read and files still being copied or waiting to be read stay
+            busy = set(self.in_use) | {self.local_path(p) for p in self.futures if p not in self.consumed} | {keep}
+            entries = self.staged()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total + needed <= self.max_bytes: break
+                if path in busy: continue
+                os.remove(path)
+                if os.path.exists(path + ".json"): os.remove(path + ".json")
+                for p in [p for p in self.futures if self.local_path(p) == path]:
+                    del self.futures[p]
+                    self.consumed.discard(p)
+                total -= size
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
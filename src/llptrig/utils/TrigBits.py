@@ -0,0 +1,86 @@
+import numpy as np
+
+if hasattr(np, "bitwise_count"):
+    def word_popcount(words):
+        return np.bitwise_count(words)
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    def word_popcount(words):
+        return _POPCOUNT_TABLE[words.view(np.uint8).reshape(words.shape + (8,))].sum(axis=-1, dtype=np.uint8)
+
+def _popcount(words, axis=None):
+    return word_popcount(words).sum(axis=axis, dtype=np.int64)
+
+class PackedMenu:
+    """
+    Trigger decisions of a sample packed into 64-bit words, one row per trigger.
+    OR/AND/ANDNOT queries and their counts work on the packed words directly,
+    so combinations never go through a full-size boolean array.
+    """
+    def __init__(self, names, bits, num_entries):
+        self.names = list(names)
+        self.bits = bits
+        self.num_entries = num_entries
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def from_arrays(cls, data, names):
+        names = list(names)
+        num_entries = len(data[names[0]]) if names else 0
+        bits = np.empty((len(names), _num_words(num_entries)), dtype=np.uint64)
+        for i, name in enumerate(names):
+            bits[i] = pack(data[name])
+        return cls(names, bits, num_entries)
+
+    @classmethod
+    def from_matrix(cls, matrix, names):
+        return cls.from_arrays({name: matrix[:, i] for i, name in enumerate(names)}, names)
+
+    def __len__(self):
+        return self.num_entries
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def row(self, name):
+        return self.bits[self._index[name]]
+
+    def rows(self, names):
+        return self.bits[[self._index[name] for name in names]]
+
+    def any(self, names):
+        return np.bitwise_or.reduce(self.rows(names), axis=0)
+
+    def all(self, names):
+        return np.bitwise_and.reduce(self.rows(names), axis=0)
+
+    def andnot(self, names, vetoes):
+        return self.any(names) & ~self.any(vetoes)
+
+    def pack(self, mask):
+        return pack(mask)
+
+    def count(self, words):
+        return int(_popcount(words))
+
+    def counts(self, names=None, mask=None):
+        """Number of events passing each trigger, optionally only among the events set in the packed mask."""
+        rows = self.bits if names is None else self.rows(names)
+        if mask is not None: rows = rows & mask
+        return _popcount(rows, axis=1)
+
+    def efficiency(self, words):
+        return self.count(words) / self.num_entries
+
+    def unpack(self, words):
+        return np.unpackbits(words.view(np.uint8), count=self.num_entries).view(bool)
+
+def _num_words(num_entries):
+    return (num_entries + 63) // 64
+
+def pack(mask):
+    """Packs a boolean array into 64-bit words, padding the last word with zeros."""
+    mask = np.asarray(mask, dtype=bool)
+    packed = np.zeros(_num_words(len(mask)) * 8, dtype=np.uint8)
+    packed[:(len(mask) + 7) // 8] = np.packbits(mask)
+    return packed.view(np.uint64)
@@ -0,0 +1,153 @@
+"""
+Local on-disk cache of flat NanoAOD columns (trigger bits and AD scores).
+
+Each cached read lives in its own directory with one .npy file per column. Boolean
+columns are stored bit-packed, all others as plain arrays that are memory-mapped
+on load. Entries are keyed by the source file (path, size and mtime, or a content
+checksum), the branch filter and entry_stop, and the least recently used entries
+are evicted once the cache grows beyond max_bytes.
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import uproot
+import awkward as ak
+
+from .Incremental import file_checksum
+from .TrigUtils import uproot_entry_stop
+from . import Instrument
+
+class TrigCache:
+    def __init__(self, cache_dir, max_bytes=20 * 1024**3, checksum=False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.checksum = checksum
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, file_path, filter_name, entry_stop=None):
+        file_path = os.path.abspath(file_path)
+        if self.checksum:
+            source = [file_path, file_checksum(file_path)]
+        else:
+            stat = os.stat(file_path)
+            source = [file_path, stat.st_size, stat.st_mtime_ns]
+        if not isinstance(filter_name, str): filter_name = sorted(filter_name)
+        return hashlib.sha1(json.dumps([source, filter_name, entry_stop]).encode()).hexdigest()
+
+    def _entry(self, file_path, filter_name, entry_stop=None):
+        entry_stop = uproot_entry_stop(entry_stop)
+        entry_dir = os.path.join(self.cache_dir, self.key(file_path, filter_name, entry_stop))
+        meta_file = os.path.join(entry_dir, "meta.json")
+        if not os.path.exists(meta_file):
+            with uproot.open(file_path) as f:
+                data = Instrument.read_arrays(f["Events"], filter_name=filter_name, entry_stop=entry_stop, library="np")
+            self._store(entry_dir, file_path, data)
+            self._evict(keep=entry_dir)
+        with open(meta_file) as f:
+            meta = json.load(f)
+        os.utime(meta_file)
+        return entry_dir, meta
+
+    def fields(self, file_path, filter_name, entry_stop=None):
+        """Names of the columns cached for this read, filling the entry if needed."""
+        return [column["name"] for column in self._entry(file_path, filter_name, entry_stop)[1]["columns"]]
+
+    def arrays(self, file_path, filter_name, entry_stop=None, library="ak", columns=None):
+        """
+        Same columns as uproot's tree.arrays(filter_name=...), served from the cache when possible.
+        With columns, only those of the cached columns are loaded.
+        """
+        return next(self.iterate(file_path, filter_name, columns=columns, entry_stop=entry_stop, library=library))
+
+    def iterate(self, file_path, filter_name, columns=None, step_size=None, entry_stop=None, library="ak"):
+        """
+        Cached columns (or the given subset) in chunks of step_size entries, or of about step_size
+        bytes once unpacked for a size string such as '100 MB', like uproot's iterate. Each chunk is
+        sliced from the memory-mapped files when it is reached, so only one chunk is in memory.
+        """
+        if library not in ["ak", "np"]: raise ValueError("library must be either ak or np")
+        entry_dir, meta = self._entry(file_path, filter_name, entry_stop)
+        stored = self._open(entry_dir, meta, columns)
+        n = meta["num_entries"]
+        step = _step_entries(step_size, stored.values(), n)
+        for start in range(0, max(n, 1), step):
+            stop = min(start + step, n)
+            data = {name: _slice(kind, column, start, stop) for name, (kind, column) in stored.items()}
+            if library == "np": yield data
+            else: yield ak.Array({name: ak.from_numpy(column) for name, column in data.items()})
+
+    def _store(self, entry_dir, file_path, data):
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp")
+        columns = []
+        for i, (name, column) in enumerate(data.items()):
+            if column.dtype == object: raise ValueError("Only flat branches can be cached, {} is jagged".format(name))
+            kind = "bits" if column.dtype == bool else "array"
+            np.save(os.path.join(tmp_dir, "{}.npy".format(i)), np.packbits(column) if kind == "bits" else column)
+            columns.append({"name": name, "kind": kind})
+        n = len(next(iter(data.values()))) if data else 0
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({"source": os.path.abspath(file_path), "num_entries": n, "columns": columns}, f)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another process filled this entry first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _open(self, entry_dir, meta, columns=None):
+        index = {column["name"]: i for i, column in enumerate(meta["columns"])}
+        names = list(index) if columns is None else list(columns)
+        missing = [name for name in names if name not in index]
+        if missing: raise ValueError("Columns {} are not in the cache entry {}".format(missing, entry_dir))
+        return {name: (meta["columns"][index[name]]["kind"], np.load(os.path.join(entry_dir, "{}.npy".format(index[name])), mmap_mode="r")) for name in names}
+
+    def entries(self):
+        """Cached entries as (last access time, size in bytes, path), least recently used first."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            meta_file = os.path.join(entry_dir, "meta.json")
+            if name.startswith(".tmp") or not os.path.exists(meta_file): continue
+            size = sum(os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir))
+            entries.append((os.path.getmtime(meta_file), size, entry_dir))
+        return sorted(entries)
+
+    def _evict(self, keep=None):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in entries:
+            if total <= self.max_bytes: break
+            if entry_dir == keep: continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for _, _, entry_dir in self.entries():
+            shutil.rmtree(entry_dir, ignore_errors=True)
+
+_UNITS = {"B": 1, "KB": 1000, "MB": 1000**2, "GB": 1000**3, "TB": 1000**4, "KIB": 1024, "MIB": 1024**2, "GIB": 1024**3, "TIB": 1024**4}
+
+def memory_size(size):
+    """Bytes in a size string such as '100 MB' (units as in uproot, kB = 1000 B and KiB = 1024 B)."""
+    match = re.fullmatch(r"\s*([0-9.]+)\s*([a-zA-Z]*)\s*", size)
+    unit = match.group(2).upper() if match is not None else None
+    if unit == "": unit = "B"
+    if unit not in _UNITS: raise ValueError("Invalid size {!r}, expected e.g. '100 MB'".format(size))
+    return int(float(match.group(1)) * _UNITS[unit])
+
+def _step_entries(step_size, stored, num_entries):
+    if step_size is None: step = num_entries
+    elif isinstance(step_size, str):
+        width = sum(1 if kind == "bits" else column.dtype.itemsize for kind, column in stored)
+        step = memory_size(step_size) // max(width, 1)
+    else: step = int(step_size)
+    return max(step, 1)
+
+def _slice(kind, column, start, stop):
+    # bit-packed columns are unpacked from the byte holding start, dropping the bits before it
+    if kind == "bits": return np.unpackbits(column[start // 8:(stop + 7) // 8], count=stop - start // 8 * 8)[start % 8:].view(bool)
+    return column[start:stop]
@@ -0,0 +1,133 @@
+"""
+Trigger logic expressions, e.g. "L1_SingleLLPJet | (axol1tl_score >= 734.8) & ~HLT_X".
+
+Expressions use Python operator syntax: branch names, | & ^ ~, comparisons of a
+branch with a number, any(...)/all(...) and parentheses. They are parsed with ast
+into canonical trees, where the operands of | and & are flattened and sorted, so
+"a | b" and "b | a" are the same node. An ExprEvaluator evaluates a batch of
+expressions over one sample on bit-packed words and memoizes every node it computes,
+including the sorted prefixes of n-ary ORs/ANDs, so sub-expressions shared across the
+batch (e.g. the same best trigger ORed with hundreds of candidates) are computed once.
+"""
+
+import ast
+import operator
+import functools
+import numpy as np
+
+from .TrigBits import pack, word_popcount
+
+COMPARISONS = {ast.GtE: ">=", ast.Gt: ">", ast.LtE: "<=", ast.Lt: "<", ast.Eq: "==", ast.NotEq: "!="}
+COMPARE_FUNCS = {">=": operator.ge, ">": operator.gt, "<=": operator.le, "<": operator.lt, "==": operator.eq, "!=": operator.ne}
+FLIPPED = {">=": "<=", ">": "<", "<=": ">=", "<": ">", "==": "==", "!=": "!="}
+
+def _node(tree, text):
+    if isinstance(tree, ast.Name):
+        return ("branch", tree.id)
+    if isinstance(tree, ast.Constant) and isinstance(tree.value, bool):
+        return ("const", tree.value)
+    if isinstance(tree, ast.UnaryOp) and isinstance(tree.op, ast.Invert):
+        return ("not", _node(tree.operand, text))
+    if isinstance(tree, ast.BinOp) and isinstance(tree.op, (ast.BitOr, ast.BitAnd, ast.BitXor)):
+        kind = {ast.BitOr: "or", ast.BitAnd: "and", ast.BitXor: "xor"}[type(tree.op)]
+        return _nary(kind, [_node(tree.left, text), _node(tree.right, text)])
+    if isinstance(tree, ast.Call) and isinstance(tree.func, ast.Name) and tree.func.id in ("any", "all") and not tree.keywords:
+        return _nary("or" if tree.func.id == "any" else "and", [_node(arg, text) for arg in tree.args])
+    if isinstance(tree, ast.Compare) and len(tree.ops) == 1 and type(tree.ops[0]) in COMPARISONS:
+        op, left, right = COMPARISONS[type(tree.ops[0])], tree.left, tree.comparators[0]
+        if isinstance(left, ast.Constant): op, left, right = FLIPPED[op], right, left
+        if isinstance(left, ast.Name) and isinstance(right, ast.Constant) and isinstance(right.value, (int, float)):
+            return ("cmp", left.id, op, float(right.value))
+    raise ValueError("Unsupported syntax in trigger expression {!r}: {}".format(text, ast.dump(tree)))
+
+def _nary(kind, operands):
+    flat = []
+    for operand in operands:
+        flat.extend(operand[1] if operand[0] == kind else [operand])
+    # a ^ a is not a, so only | and & drop repeated operands
+    flat = sorted(flat if kind == "xor" else set(flat), key=repr)
+    return flat[0] if len(flat) == 1 else (kind, tuple(flat))
+
+@functools.lru_cache(maxsize=None)
+def compile_expr(text):
+    """Canonical tree of an expression."""
+    return _node(ast.parse(text.strip(), mode="eval").body, text)
+
+def expr_branches(exprs):
+    """Branches referenced by a list of expressions (texts or compiled trees)."""
+    names = []
+    def walk(node):
+        if node[0] in ("branch", "cmp"): names.append(node[1])
+        elif node[0] == "not": walk(node[1])
+        elif node[0] in ("or", "and", "xor"):
+            for operand in node[1]: walk(operand)
+    for expr in exprs:
+        walk(compile_expr(expr) if isinstance(expr, str) else expr)
+    return list(dict.fromkeys(names))
+
+class ExprEvaluator:
+    """
+    Evaluates expressions over the columns of one sample (a dict of arrays or an awkward record array).
+    Trigger bits already packed in menu (a PackedMenu) are used as they are.
+    """
+    def __init__(self, data, menu=None, num_entries=None):
+        self.data = data
+        self.menu = menu
+        if num_entries is None:
+            num_entries = menu.num_entries if menu is not None else len(data[next(iter(data.keys() if hasattr(data, "keys") else data.fields))])
+        self.num_entries = num_entries
+        self.valid = pack(np.ones(num_entries, dtype=bool))
+        self.memo = {}
+        self.hits = 0
+
+    def words(self, expr):
+        """Packed pass words of an expression."""
+        return self._eval(compile_expr(expr) if isinstance(expr, str) else expr)
+
+    def _eval(self, node):
+        if node in self.memo:
+            self.hits += 1
+            return self.memo[node]
+        kind = node[0]
+        if kind == "branch":
+            if self.menu is not None and node[1] in self.menu: words = self.menu.row(node[1])
+            else: words = pack(np.asarray(self.data[node[1]], dtype=bool))
+        elif kind == "const":
+            words = self.valid if node[1] else np.zeros_like(self.valid)
+        elif kind == "cmp":
+            words = pack(COMPARE_FUNCS[node[2]](np.asarray(self.data[node[1]]), node[3]))
+        elif kind == "not":
+            words = ~self._eval(node[1]) & self.valid
+        else:
+            # fold over the sorted operands, so every prefix is a memoized node of its own
+            operands = node[1]
+            func = {"or": np.bitwise_or, "and": np.bitwise_and, "xor": np.bitwise_xor}[kind]
+            words = self._eval(operands[0])
+            for i in range(1, len(operands)):
+                prefix = (kind, operands[:i + 1])
+                if prefix in self.memo:
+                    self.hits += 1
+                    words = self.memo[prefix]
+                else:
+                    words = func(words, self._eval(operands[i]))
+                    self.memo[prefix] = words
+        self.memo[node] = words
+        return words
+
+    def count(self, expr):
+        return int(word_popcount(self.words(expr)).sum(dtype=np.int64))
+
+    def counts(self, exprs):
+        return np.array([self.count(expr) for expr in exprs], dtype=np.int64)
+
+    def efficiency(self, expr):
+        return self.count(expr) / self.num_entries
+
+    def mask(self, expr):
+        """Boolean per-event result of an expression."""
+        return np.unpackbits(self.words(expr).view(np.uint8), count=self.num_entries).view(bool)
+
+def evaluate(data, exprs, menu=None):
+    """Pass counts of a batch of expressions over one sample, as {expr: count}."""
+    evaluator = ExprEvaluator(data, menu)
+    return {expr: evaluator.count(expr) for expr in exprs}
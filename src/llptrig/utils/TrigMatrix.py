@@ -0,0 +1,32 @@
+import numpy as np
+
+def trig_matrix(data, trigs):
+    """Dense (events x triggers) boolean matrix built from the trigger bit columns of data."""
+    matrix = np.empty((len(data[trigs[0]]) if trigs else 0, len(trigs)), dtype=bool)
+    for i, trig in enumerate(trigs):
+        matrix[:, i] = np.asarray(data[trig])
+    return matrix
+
+def best_index(counts, names, unprescaled, exclude=[]):
+    """Column of the unprescaled, non-excluded trigger with the highest count (first one on ties)."""
+    unprescaled, exclude = set(unprescaled), set(exclude)
+    candidates = [i for i, name in enumerate(names) if name not in exclude and name in unprescaled]
+    if not candidates: raise ValueError("No unprescaled trigger left to choose the best one from.")
+    return candidates[int(np.argmax(counts[candidates]))]
+
+def count_matrix(matrix, names, interestTrigs, unprescaled, exclude=[]):
+    """
+    Per-trigger counts, best unprescaled trigger and best+X OR counts of a trigger bit matrix,
+    all from a single pass over the events.
+    """
+    names = list(names)
+    counts = np.count_nonzero(matrix, axis=0)
+    best = best_index(counts, names, unprescaled, exclude)
+    interest = [names.index(trig) for trig in interestTrigs]
+    or_counts = np.count_nonzero(matrix[:, interest] | matrix[:, [best]], axis=0)
+
+    result = {"denom": len(matrix), "best_name": names[best], "best": int(counts[best])}
+    for trig, idx, or_count in zip(interestTrigs, interest, or_counts):
+        result[trig] = int(counts[idx])
+        result["best+" + trig] = int(or_count)
+    return result
@@ -0,0 +1,210 @@
+"""
+Pairwise overlaps of trigger paths.
+
+The co-firing counts of all pairs of paths of a sample are the entries of BᵀB, where B is
+its (events x paths) bit matrix, so the whole N x N matrix comes from one matrix product.
+The product runs on BLAS in float32 over blocks of events small enough for every partial
+sum to be exact, and is accumulated in int64. Jaccard overlaps, unique (exclusive)
+acceptances and marginal gains over a reference set are derived from the same pass.
+"""
+
+import os
+import csv
+import itertools
+import numpy as np
+
+from .TrigUtils import genFileName
+from .TrigMatrix import trig_matrix, best_index
+from .BranchPlan import BranchPlan, BranchReader
+from .Instrument import stage, timed
+
+# float32 sums of 0/1 values are exact up to 2**24
+_MAX_BLOCK_ROWS = 1 << 24
+
+def cofire_counts(matrix, block_bytes=1 << 26):
+    """N x N int64 matrix of the number of events in which both paths fired (BᵀB), counts on the diagonal."""
+    num_events, num_paths = matrix.shape
+    cofire = np.zeros((num_paths, num_paths), dtype=np.int64)
+    rows = int(min(_MAX_BLOCK_ROWS, max(block_bytes // (4 * max(num_paths, 1)), 1)))
+    for start in range(0, num_events, rows):
+        block = matrix[start:start + rows].astype(np.float32)
+        cofire += (block.T @ block).astype(np.int64)
+    return cofire
+
+class SampleOverlap:
+    """
+    Co-firing counts of a set of paths over denom events, with the number of events in which
+    each path fired alone (unique) and fired while none of the reference paths did (gain).
+    """
+    def __init__(self, names, cofire, unique, denom, reference=(), gain=None, best_name=None):
+        self.names = list(names)
+        self.cofire = np.asarray(cofire, dtype=np.int64)
+        self.unique = np.asarray(unique, dtype=np.int64)
+        self.denom = int(denom)
+        self.reference = list(reference)
+        self.gain = self.counts.copy() if gain is None else np.asarray(gain, dtype=np.int64)
+        self.best_name = best_name
+
+    @classmethod
+    def from_matrix(cls, matrix, names, reference=(), best_name=None):
+        matrix = np.asarray(matrix, dtype=bool)
+        names = list(names)
+        cofire = cofire_counts(matrix)
+        alone = np.count_nonzero(matrix, axis=1) == 1
+        unique = np.count_nonzero(matrix[alone], axis=0)
+        gain = None
+        if reference:
+            fired = matrix[:, [names.index(name) for name in reference]].any(axis=1)
+            gain = np.count_nonzero(matrix[~fired], axis=0)
+        return cls(names, cofire, unique, len(matrix), reference, gain, best_name)
+
+    @classmethod
+    def merge(cls, overlaps):
+        """Overlap of the union of the events of several samples with the same paths and reference."""
+        overlaps = list(overlaps)
+        first = overlaps[0]
+        for overlap in overlaps[1:]:
+            if overlap.names != first.names or overlap.reference != first.reference:
+                raise ValueError("Only overlaps of the same paths and reference set can be merged")
+        return cls(
+            first.names,
+            sum(overlap.cofire for overlap in overlaps),
+            sum(overlap.unique for overlap in overlaps),
+            sum(overlap.denom for overlap in overlaps),
+            first.reference,
+            sum(overlap.gain for overlap in overlaps),
+        )
+
+    @property
+    def counts(self):
+        return np.diagonal(self.cofire).copy()
+
+    def index(self, names):
+        return [self.names.index(name) for name in names]
+
+    def efficiencies(self):
+        return self.counts / max(self.denom, 1)
+
+    def jaccard(self):
+        """|A and B| / |A or B| of every pair of paths, 0 where neither fired."""
+        counts = self.counts
+        union = counts[:, None] + counts[None, :] - self.cofire
+        return np.divide(self.cofire, union, out=np.zeros(self.cofire.shape), where=union > 0)
+
+    def conditional(self):
+        """Fraction of the events of the path of each row in which the path of each column also fired."""
+        counts = self.counts[:, None]
+        return np.divide(self.cofire, counts, out=np.zeros(self.cofire.shape), where=counts > 0)
+
+    def unique_acceptance(self):
+        """Fraction of all events in which each path was the only one to fire."""
+        return self.unique / max(self.denom, 1)
+
+    def marginal_gain(self, reference=None):
+        """
+        Efficiency added by each path on top of the reference set. Without reference, the set the
+        overlap was built with; a single other path is answered from the pairwise counts.
+        """
+        if reference is None or list(reference) == self.reference:
+            return self.gain / max(self.denom, 1)
+        reference = [reference] if isinstance(reference, str) else list(reference)
+        if len(reference) != 1:
+            raise ValueError("Marginal gains over several paths need the overlap to be built with that reference set")
+        i = self.names.index(reference[0])
+        return (self.counts - self.cofire[i]) / max(self.denom, 1)
+
+    def subset(self, names):
+        """Overlap restricted to some of the paths; the unique counts and gains keep their original meaning."""
+        idx = self.index(names)
+        return SampleOverlap(names, self.cofire[np.ix_(idx, idx)], self.unique[idx], self.denom, self.reference, self.gain[idx], self.best_name)
+
+@timed
+def compute_overlaps(data_dir, mMed_lst, mDark_lst, ctau_lst, channel, mode, trigs, reference=None, unprescaled=[], excludedtrigs=[], entry_stop=-1, cache=None, read_workers=None):
+    """
+    SampleOverlap of trigs for every sample of the grid, keyed by (ctau, mDark, mMed).
+    reference is a list of paths, or "best" for the best unprescaled trigger of each sample
+    (as findBestTrig picks it, with trigs and excludedtrigs excluded), which is then included
+    in the overlap matrix too.
+    """
+    if mode not in ["L1", "HLT"]: raise ValueError("Mode must be either L1 or HLT")
+    for trig in trigs:
+        if not trig.startswith(mode): raise ValueError("Mode does not match type of triggers given. Use HLT or L1 for mode.")
+
+    overlaps = {}
+    with BranchReader(cache, read_workers) as reader:
+        for ctau, mDark, mMed in itertools.product(ctau_lst, mDark_lst, mMed_lst):
+            data_file = os.path.join(data_dir, genFileName(mMed, mDark, ctau, channel=channel))
+            print("Loading sample: ctau = {}, mDark = {}, mMed = {}".format(ctau, mDark, mMed))
+            overlaps[(ctau, mDark, mMed)] = sample_overlap(data_file, mode, trigs, reference, unprescaled, excludedtrigs, entry_stop, reader=reader)
+    return overlaps
+
+def sample_overlap(data_file, mode, trigs, reference=None, unprescaled=[], excludedtrigs=[], entry_stop=-1, reader=None):
+    """SampleOverlap of trigs in one file, with reference as for compute_overlaps. Paths of trigs that are not in the file are left out."""
+    use_best = reference == "best"
+    reference = [] if reference is None or use_best else list(reference)
+    exclude = list(trigs) + list(excludedtrigs)
+    plan = BranchPlan(list(trigs) + reference, unprescaled if use_best else (), exclude, mode=mode)
+    if reader is None: reader = BranchReader()
+    with stage("sample"):
+        data = reader.read(data_file, plan.branches(), entry_stop=entry_stop)
+        names, ref, best_name = [name for name in trigs if name in data], reference, None
+        if use_best:
+            menu = list(data.keys())
+            counts = np.count_nonzero(trig_matrix(data, menu), axis=0)
+            best_name = menu[best_index(counts, menu, unprescaled, exclude)]
+            names, ref = names + [best_name], [best_name]
+        else:
+            names += [name for name in reference if name not in names]
+        with stage("overlap"):
+            return SampleOverlap.from_matrix(trig_matrix(data, names), names, ref, best_name)
+
+def aggregate_overlaps(overlaps, by=("ctau", "mDark")):
+    """
+    Overlaps of a grid merged over the sample coordinates not in by, e.g. by=() for the whole
+    grid or by=("ctau",) per lifetime. Per-sample best triggers are collapsed to "best".
+    """
+    axes = ("ctau", "mDark", "mMed")
+    groups = {}
+    for key, overlap in overlaps.items():
+        if overlap.best_name is not None:
+            names = [name if name != overlap.best_name else "best" for name in overlap.names]
+            overlap = SampleOverlap(names, overlap.cofire, overlap.unique, overlap.denom, ["best"], overlap.gain)
+        group = tuple(value for axis, value in zip(axes, key) if axis in by)
+        groups.setdefault(group, []).append(overlap)
+    return {group: SampleOverlap.merge(members) for group, members in groups.items()}
+
+def overlap_rows(overlaps):
+    """Long-format rows (key, path_a, path_b, cofire, jaccard, conditional, counts, unique and gain) for export."""
+    header = ["key", "path_a", "path_b", "denom", "cofire", "jaccard", "p_b_given_a", "count_a", "unique_a", "gain_a"]
+    rows = []
+    for key, overlap in overlaps.items():
+        jaccard, conditional, counts = overlap.jaccard(), overlap.conditional(), overlap.counts
+        label = "/".join(str(value) for value in key) if isinstance(key, tuple) else str(key)
+        for i, j in itertools.product(range(len(overlap.names)), repeat=2):
+            rows.append([
+                label, overlap.names[i], overlap.names[j], overlap.denom, int(overlap.cofire[i, j]),
+                float(jaccard[i, j]), float(conditional[i, j]), int(counts[i]), int(overlap.unique[i]), int(overlap.gain[i]),
+            ])
+    return header, rows
+
+def write_overlaps(overlaps, out_path):
+    """
+    Writes {key: SampleOverlap} as long-format csv or, for a .npz path, as the raw matrices
+    (one set of arrays per key, ready for heat maps).
+    """
+    if out_path.endswith(".npz"):
+        arrays = {}
+        for n, (key, overlap) in enumerate(overlaps.items()):
+            arrays["keys_{}".format(n)] = np.array([str(value) for value in (key if isinstance(key, tuple) else (key,))])
+            arrays["names_{}".format(n)] = np.array(overlap.names)
+            arrays["cofire_{}".format(n)] = overlap.cofire
+            arrays["unique_{}".format(n)] = overlap.unique
+            arrays["gain_{}".format(n)] = overlap.gain
+            arrays["denom_{}".format(n)] = np.array(overlap.denom)
+        np.savez_compressed(out_path, **arrays)
+        return
+    header, rows = overlap_rows(overlaps)
+    with open(out_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
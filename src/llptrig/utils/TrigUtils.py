@@ -4,4 +4,8 @@ By: Roy F. Cruz Candelaria
 """
 
 def genFileName(mMed, mDark, ctau, channel="s"):
-    return "step_NANOAODv12_{}-channel_mMed-{}_mDark-{}_ctau-{}_unflavored-down_n-1000_wScores.root".format(channel, mMed, mDark, ctau)
\ No newline at end of file
+    return "step_NANOAODv12_{}-channel_mMed-{}_mDark-{}_ctau-{}_unflavored-down_n-1000_wScores.root".format(channel, mMed, mDark, ctau)
+
+def uproot_entry_stop(entry_stop):
+    """entry_stop to pass to uproot: -1, the default of the grid functions, reads every event, which uproot would not."""
+    return None if entry_stop == -1 else entry_stop
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""
+Trigger turn-on curves: efficiency of trigger paths versus an event variable.
+
+The variable (a Kinematics variable such as HT, or any flat branch) is binned once per
+sample and the pass counts of all requested paths, which can be TrigExpr expressions
+such as ORs, come from a single np.bincount over (path, bin) pairs of the set bits.
+Turn-ons of several samples add up, and intervals are binomial (see EffUncertainty).
+"""
+
+import os
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from .TrigUtils import genFileName
+from .TrigExpr import ExprEvaluator, expr_branches
+from .BranchPlan import BranchReader
+from .Hists import bin_index
+from .EffUncertainty import eff_intervals
+from . import Kinematics
+from .Instrument import stage, timed
+
+class TurnOn:
+    """Pass counts (paths x bins) and totals (bins) of a set of paths in bins of a variable."""
+    def __init__(self, variable, edges, paths, numer=None, denom=None, reference=None):
+        self.variable = variable
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.paths = list(paths)
+        self.reference = reference
+        nbins = len(self.edges) - 1
+        self.numer = np.zeros((len(self.paths), nbins), dtype=np.int64) if numer is None else np.asarray(numer, dtype=np.int64)
+        self.denom = np.zeros(nbins, dtype=np.int64) if denom is None else np.asarray(denom, dtype=np.int64)
+
+    @property
+    def centers(self):
+        return (self.edges[1:] + self.edges[:-1]) / 2
+
+    def fill(self, values, passed):
+        """Adds events given their variable values and an (events x paths) boolean pass matrix."""
+        nbins = len(self.denom)
+        idx = bin_index(self.edges, np.asarray(values, dtype=np.float64))
+        inside = (idx >= 0) & (idx < nbins)
+        idx, passed = idx[inside], np.asarray(passed, dtype=bool)[inside]
+        self.denom += np.bincount(idx, minlength=nbins)
+        events, paths = np.nonzero(passed)
+        self.numer += np.bincount(paths * nbins + idx[events], minlength=len(self.paths) * nbins).reshape(len(self.paths), nbins)
+        return self
+
+    def __iadd__(self, other):
+        if not np.array_equal(self.edges, other.edges) or self.paths != other.paths or self.variable != other.variable or self.reference != other.reference:
+            raise ValueError("Only turn-ons of the same variable, binning, paths and reference can be added")
+        self.numer += other.numer
+        self.denom += other.denom
+        return self
+
+    def __add__(self, other):
+        return self.copy().__iadd__(other)
+
+    def __radd__(self, other):
+        return self.copy() if other == 0 else self.__add__(other)
+
+    def copy(self):
+        return TurnOn(self.variable, self.edges.copy(), self.paths, self.numer.copy(), self.denom.copy(), self.reference)
+
+    def efficiency(self, path=None):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            effs = self.numer / self.denom
+        return effs if path is None else effs[self.paths.index(path)]
+
+    def intervals(self, method="wilson"):
+        """Efficiencies (paths x bins) with their lower and upper binomial bounds, NaN in empty bins."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return eff_intervals(self.numer, self.denom[None, :], method=method)
+
+    def plateau_crossing(self, fraction=0.95, path=None):
+        """Lowest bin center where each path (or one path) reaches fraction of its maximum efficiency, NaN if never."""
+        effs = np.nan_to_num(self.efficiency())
+        reached = effs >= fraction * effs.max(axis=1, keepdims=True)
+        reached &= effs.max(axis=1, keepdims=True) > 0
+        first = np.where(reached.any(axis=1), self.centers[np.argmax(reached, axis=1)], np.nan)
+        return first if path is None else first[self.paths.index(path)]
+
+    def to_dict(self):
+        return {"variable": self.variable, "edges": self.edges.tolist(), "paths": self.paths, "numer": self.numer.tolist(), "denom": self.denom.tolist(), "reference": self.reference}
+
+    @classmethod
+    def from_dict(cls, turn_on):
+        return cls(turn_on["variable"], turn_on["edges"], turn_on["paths"], turn_on["numer"], turn_on["denom"], turn_on.get("reference"))
+
+def variable_values(data, variable):
+    """Values of a Kinematics variable, or of a flat branch of data."""
+    if variable in Kinematics.FUNCS: return Kinematics.compute(data, variable)
+    return np.asarray(data[variable], dtype=np.float64)
+
+def turn_on_branches(paths, variable, reference=None, available=None):
+    """Branches to read for the turn-ons of paths (names or TrigExpr expressions) in variable."""
+    exprs = list(paths) + ([reference] if reference is not None else [])
+    branches = expr_branches(exprs)
+    if variable in Kinematics.FUNCS: branches += Kinematics.branches([variable], available)
+    elif variable not in branches: branches.append(variable)
+    if available is not None:
+        missing = [branch for branch in branches if branch not in set(available)]
+        if missing: raise ValueError("Branches {} are missing".format(missing))
+    return list(dict.fromkeys(branches))
+
+def fill_turn_on(turn_on, data):
+    """Fills a TurnOn from the arrays of one chunk of events."""
+    evaluator = ExprEvaluator(data)
+    values = variable_values(data, turn_on.variable)
+    passed = np.stack([evaluator.mask(path) for path in turn_on.paths], axis=1)
+    if turn_on.reference is not None:
+        # orthogonal-dataset style: only events passing the reference enter the denominator
+        keep = evaluator.mask(turn_on.reference)
+        values, passed = values[keep], passed[keep]
+    return turn_on.fill(values, passed)
+
+def sample_turn_on(data_file, paths, variable, edges, reference=None, entry_stop=-1, reader=None):
+    """TurnOn of one file."""
+    if reader is None:
+        with BranchReader() as reader:
+            return sample_turn_on(data_file, paths, variable, edges, reference, entry_stop, reader)
+    branches = turn_on_branches(paths, variable, reference)
+    # optional branches are only read if the file has them, so the file is opened once
+    optional = [branch for branch in Kinematics.OPTIONAL_BRANCHES if branch not in branches] if variable in Kinematics.FUNCS else []
+    data = reader.read(data_file, branches + optional, entry_stop=entry_stop, library="ak")
+    missing = [branch for branch in branches if branch not in data.fields]
+    if missing: raise ValueError("Branches {} are missing".format(missing))
+    with stage("turn_on"):
+        return fill_turn_on(TurnOn(variable, edges, paths, reference=reference), data)
+
+@timed
+def compute_turn_ons(data_dir, mMed_lst, mDark_lst, ctau_lst, channel, paths, variable, edges=None, reference=None, entry_stop=-1, workers=None, executor=None, read_workers=None):
+    """
+    TurnOn of the paths in variable for every sample of the grid, keyed by (ctau, mDark, mMed).
+    Samples are processed serially, or on a process pool with workers (or a given executor).
+    Without edges, 50 bins over the range of the Kinematics variable are used. entry_stop=-1
+    reads every event, as in compute_efficiencies, so that denominators match the efficiency tables.
+    """
+    if edges is None:
+        if variable not in Kinematics.VARIABLES: raise ValueError("Bin edges are needed for variable {}".format(variable))
+        edges = np.linspace(*Kinematics.VARIABLES[variable]["range"], 51)
+    samples = list(itertools.product(ctau_lst, mDark_lst, mMed_lst))
+    files = [os.path.join(data_dir, genFileName(mMed, mDark, ctau, channel=channel)) for ctau, mDark, mMed in samples]
+    turn_ons = {}
+    if workers is None and executor is None:
+        with BranchReader(workers=read_workers) as reader:
+            for sample, data_file in zip(samples, files):
+                print("Loading sample: ctau = {}, mDark = {}, mMed = {}".format(*sample))
+                with stage("sample"):
+                    turn_ons[sample] = sample_turn_on(data_file, paths, variable, edges, reference, entry_stop, reader)
+        return turn_ons
+    pool = executor if executor is not None else ProcessPoolExecutor(max_workers=workers)
+    try:
+        with stage("pool"):
+            futures = [pool.submit(sample_turn_on, data_file, paths, variable, edges, reference, entry_stop) for data_file in files]
+            for sample, future in zip(samples, futures):
+                turn_ons[sample] = future.result()
+    finally:
+        if executor is None: pool.shutdown()
+    return turn_ons
@@ -0,0 +1,65 @@
+import os
+import types
+import itertools
+import numpy as np
+import awkward as ak
+import pytest
+import uproot
+
+from llptrig.utils.TrigUtils import genFileName
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+AD_KEYS = {"axol1tl_score": 3000, "CICADA_score_v2p1p2": 200}
+
+def write_sample(path, n_events, names, seed):
+    """One file of independent trigger bits with per-path rates, AD scores with ties and a jagged Jet_pt."""
+    rng = np.random.default_rng(seed)
+    rates = np.clip(rng.lognormal(np.log(0.05), 1.5, len(names)), 1e-3, 0.9)
+    data = {name: rng.random(n_events) < rate for name, rate in zip(names, rates)}
+    for ad_key, top in AD_KEYS.items():
+        # rounded, so that some events share a score
+        data[ad_key] = np.round(top * rng.beta(2, 5, n_events)).astype(np.float32)
+    counts = rng.poisson(3, n_events)
+    data["Jet_pt"] = ak.unflatten(rng.exponential(50, counts.sum()).astype(np.float32), counts)
+    with uproot.recreate(path) as f:
+        f["Events"] = data
+
+@pytest.fixture(scope="session")
+def grid(tmp_path_factory):
+    """Small synthetic grid: 2 ctau x 1 mDark x 2 mMed files of 2000 events with 20 L1 and 10 HLT paths."""
+    data_dir = str(tmp_path_factory.mktemp("grid"))
+    mMed_lst, mDark_lst, ctau_lst = [100, 500], [10], [1, 100]
+    l1 = ["L1_Test{}".format(i) for i in range(20)]
+    hlt = ["HLT_Test{}".format(i) for i in range(10)]
+    paths = {}
+    for seed, (ctau, mDark, mMed) in enumerate(itertools.product(ctau_lst, mDark_lst, mMed_lst)):
+        paths[(ctau, mDark, mMed)] = os.path.join(data_dir, genFileName(mMed, mDark, ctau, channel="s"))
+        write_sample(paths[(ctau, mDark, mMed)], 2000, l1 + hlt, seed)
+    return types.SimpleNamespace(data_dir=data_dir, paths=paths, mMed_lst=mMed_lst, mDark_lst=mDark_lst, ctau_lst=ctau_lst, channel="s", l1=l1, hlt=hlt)
+
+@pytest.fixture
+def opened(monkeypatch):
+    """Files opened with uproot.open during a test, to check that they get closed."""
+    files = []
+    open_file = uproot.open
+    def recording_open(*args, **kwargs):
+        files.append(open_file(*args, **kwargs))
+        return files[-1]
+    monkeypatch.setattr(uproot, "open", recording_open)
+    return files
+
+def read_branches(path, filter_name, entry_stop=None):
+    with uproot.open(path) as f:
+        return f["Events"].arrays(filter_name=filter_name, entry_stop=entry_stop, library="np")
+
+def brute_counts(data, names, interest, unprescaled, exclude):
+    """Counts of compute_efficiencies from plain numpy: ties for the best trigger go to the first in names."""
+    counts = {name: int(np.count_nonzero(data[name])) for name in names}
+    candidates = [name for name in names if name in unprescaled and name not in exclude]
+    best = max(candidates, key=lambda name: (counts[name], -candidates.index(name)))
+    result = {"denom": len(data[names[0]]), "best_name": best, "best": counts[best]}
+    for trig in interest:
+        result[trig] = counts[trig]
+        result["best+" + trig] = int(np.count_nonzero(data[trig] | data[best]))
+    return result
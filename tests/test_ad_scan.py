@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from llptrig.utils.ADScan import scan_efficiencies, scan_rates, scan_thresholds
+
+@pytest.fixture
+def scores():
+    # rounded scores so that cuts land on ties, plus NaN scores that must never pass
+    rng = np.random.default_rng(3)
+    scores = np.round(rng.exponential(50.0, 5000))
+    scores[rng.choice(len(scores), 100, replace=False)] = np.nan
+    return scores
+
+@pytest.fixture
+def cuts(scores):
+    return np.concatenate([[-1.0, 0.0, 0.5, 1e9], np.unique(scores[np.isfinite(scores)])[::7]])
+
+def test_scan_thresholds_matches_brute_force(scores, cuts):
+    rng = np.random.default_rng(4)
+    flags = rng.random((len(scores), 3)) < [0.1, 0.5, 0.9]
+    n_pass, n_flagged = scan_thresholds(scores, cuts, flags)
+    with np.errstate(invalid="ignore"):
+        passed = scores[None, :] >= cuts[:, None]
+    np.testing.assert_array_equal(n_pass, passed.sum(axis=1))
+    np.testing.assert_array_equal(n_flagged, passed.astype(int) @ flags.astype(int))
+    np.testing.assert_array_equal(scan_thresholds(scores, cuts), n_pass)
+    np.testing.assert_array_equal(scan_thresholds(scores, cuts, flags[:, 0])[1], n_flagged[:, 0])
+
+def test_scan_efficiencies_and_rates_match_brute_force(scores, cuts):
+    rng = np.random.default_rng(5)
+    pass_best = rng.random(len(scores)) < 0.3
+    pass_l1 = pass_best | (rng.random(len(scores)) < 0.2)
+    effs = scan_efficiencies(scores, cuts, pass_best, pass_l1)
+    rates = scan_rates(scores, cuts, 1000.0)
+    for i, cut in enumerate(cuts):
+        with np.errstate(invalid="ignore"):
+            ad = scores >= cut
+        assert effs["AD"][i] == np.mean(ad)
+        assert effs["best+AD"][i] == np.mean(ad | pass_best)
+        assert effs["L1+AD"][i] == np.mean(ad | pass_l1)
+        assert rates[i] == np.count_nonzero(ad) / len(scores) * 1000.0
+
+def test_all_nan_scores_never_pass():
+    scores = np.full(10, np.nan)
+    n_pass, n_flagged = scan_thresholds(scores, np.array([-np.inf, 0.0]), np.ones(10, dtype=bool))
+    np.testing.assert_array_equal(n_pass, [0, 0])
+    np.testing.assert_array_equal(n_flagged, [0, 0])
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from llptrig.utils.BranchPlan import BranchPlan, BranchReader
+from llptrig.utils.TrigCache import TrigCache
+from llptrig.utils.Staging import Stager
+
+from conftest import read_branches
+
+def test_plan_reads_interest_and_candidates_only():
+    plan = BranchPlan(["L1_A", "L1_B"], unprescaled=["L1_B", "L1_C", "L1_D", "HLT_E"], exclude=["L1_D"], extra=["axol1tl_score"], mode="L1")
+    assert plan.branches() == ["L1_A", "L1_B", "L1_C", "axol1tl_score"]
+    available = ["L1_A", "L1_C", "L1_X", "L1_Y", "axol1tl_score"]
+    assert plan.branches(available) == ["L1_A", "L1_C", "axol1tl_score"]
+    assert plan.fraction(available) == 3 / 5
+
+def test_reader_matches_uproot(grid):
+    path = grid.paths[(100, 10, 500)]
+    expected = read_branches(path, grid.l1[:4], entry_stop=777)
+    with BranchReader(workers=2) as reader:
+        data = reader.read(path, grid.l1[:4], entry_stop=777)
+    assert list(data) == list(expected)
+    for name in expected:
+        np.testing.assert_array_equal(data[name], expected[name])
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_default_entry_stop_reads_every_event(grid, tmp_path, cached):
+    path = grid.paths[(1, 10, 100)]
+    with BranchReader(cache=TrigCache(str(tmp_path)) if cached else None) as reader:
+        assert len(reader.read(path, grid.l1[:2], entry_stop=-1)[grid.l1[0]]) == 2000
+        # other negative values count from the end, as in uproot
+        assert len(reader.read(path, grid.l1[:2], entry_stop=-10)[grid.l1[0]]) == 1990
+
+def test_reader_closes_files(grid, opened):
+    with BranchReader() as reader:
+        for path in grid.paths.values():
+            reader.read(path, grid.l1[:2])
+    assert len(opened) == len(grid.paths) and all(f.closed for f in opened)
+
+def test_reader_takes_a_cache_or_a_stager(tmp_path):
+    with Stager(str(tmp_path / "scratch")) as stager:
+        with pytest.raises(ValueError, match="not both"):
+            BranchReader(cache=TrigCache(str(tmp_path / "cache")), stager=stager)
+
+@pytest.mark.parametrize("branches", ["L1_*", ["L1_Test1*", "HLT_Test2"], ["L1_Test3", "L1_Test0"]])
+def test_cached_reader_takes_names_and_patterns(grid, tmp_path, branches):
+    path = grid.paths[(1, 10, 500)]
+    expected = read_branches(path, branches)
+    with BranchReader(cache=TrigCache(str(tmp_path))) as reader:
+        data = reader.read(path, branches)
+    # columns come in file order, like uproot's
+    assert list(data) == list(expected)
+    for name in expected:
+        np.testing.assert_array_equal(data[name], expected[name])
@@ -0,0 +1,43 @@
+import os
+import sys
+import subprocess
+import pytest
+
+from llptrig import cli
+
+from conftest import SRC
+
+CONFIG = '''process.PrescaleService = cms.Service( "PrescaleService",
+    lvl1Labels = cms.vstring( '2p0E34' ),
+    prescaleTable = cms.VPSet( cms.PSet( pathName = cms.string( "HLT_A_v1" ), prescales = cms.vuint32( 2 ) ) )
+)
+'''
+
+HEAVY = ["uproot", "awkward", "matplotlib", "pypdf"]
+
+def run_python(code):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [SRC, os.environ.get("PYTHONPATH")])))
+    # modules loaded at the end of code, from the last line it prints
+    out = subprocess.run([sys.executable, "-c", code + "; import sys; print(); print(*[m for m in {!r} if m in sys.modules])".format(HEAVY)], env=env, capture_output=True, text=True, check=True).stdout
+    return out.splitlines()[-1].split()
+
+def test_dispatch(tmp_path):
+    config = tmp_path / "hlt.py"
+    config.write_text(CONFIG)
+    out = tmp_path / "table.csv"
+    cli.main(["prescales", str(config), "-o", str(out)])
+    assert out.read_text().splitlines() == ["Name,2p0E34", "HLT_A_v1,2"]
+    with pytest.raises(SystemExit):
+        cli.main(["nope"])
+    with pytest.raises(SystemExit):
+        cli.main(["prescales", "--no-such-option"])
+
+def test_commands_import_lazily(tmp_path):
+    # a fresh interpreter, since this one has the heavy modules loaded already
+    assert run_python("import llptrig.cli") == []
+    config = tmp_path / "hlt.py"
+    config.write_text(CONFIG)
+    assert run_python("from llptrig.cli import main; main(['prescales', {!r}, '-o', {!r}])".format(str(config), str(tmp_path / "t.csv"))) == []
+    # the other commands only load what they use
+    assert "matplotlib" not in run_python("from llptrig.cli import command_parser; command_parser('effs')")
+    assert "uproot" not in run_python("from llptrig.cli import command_parser; command_parser('plots')")
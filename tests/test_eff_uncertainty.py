@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from llptrig.utils.EffUncertainty import wilson, clopper_pearson, eff_intervals, ratio_bootstrap, nested_ratio_intervals
+
+def test_wilson_reference_values():
+    # 95% Wilson interval of 8/10, as tabulated by Newcombe (1998)
+    lower, upper = wilson(8, 10, cl=0.95)
+    assert lower == pytest.approx(0.4902, abs=1e-4)
+    assert upper == pytest.approx(0.9433, abs=1e-4)
+    lower, upper = wilson(np.array([0, 10]), 10)
+    assert lower[0] == 0 and upper[1] == 1
+
+def test_clopper_pearson_matches_beta_quantiles():
+    stats = pytest.importorskip("scipy.stats")
+    numer, denom = np.array([0, 3, 10]), np.array([10, 10, 10])
+    lower, upper = clopper_pearson(numer, denom, cl=0.9)
+    np.testing.assert_allclose(lower, [0, stats.beta.ppf(0.05, 3, 8), stats.beta.ppf(0.05, 10, 1)])
+    np.testing.assert_allclose(upper, [stats.beta.ppf(0.95, 1, 10), stats.beta.ppf(0.95, 4, 7), 1])
+
+def test_eff_intervals_vectorised():
+    numer = np.array([[1, 5], [0, 20]])
+    denom = np.array([[10], [20]])
+    eff, lower, upper = eff_intervals(numer, denom)
+    assert eff.shape == lower.shape == upper.shape == (2, 2)
+    assert np.all((lower <= eff) & (eff <= upper))
+    np.testing.assert_array_equal(lower[1], wilson(numer[1], 20)[0])
+
+def test_bootstrap_is_reproducible_and_covers_the_ratio():
+    n_or, n_base, denom = np.array([600, 90]), np.array([500, 60]), np.array([1000, 1000])
+    first = nested_ratio_intervals(n_or, n_base, denom)
+    second = nested_ratio_intervals(n_or, n_base, denom)
+    for a, b in zip(first, second):
+        np.testing.assert_array_equal(a, b)
+    ratio, lower, upper = first
+    np.testing.assert_array_equal(ratio, n_or / n_base)
+    assert np.all((lower <= ratio) & (ratio <= upper))
+    # a nested ratio is never below 1
+    assert np.all(lower >= 1)
+    other = nested_ratio_intervals(n_or, n_base, denom, seed=1)
+    assert not np.array_equal(other[1], lower)
+
+def test_bootstrap_empty_cells_and_methods():
+    lower, upper = ratio_bootstrap([0, 50], [0, 10], 0, [0, 100], n_boot=200, method="poisson")
+    assert np.isnan(lower[0]) and np.isnan(upper[0])
+    assert lower[1] <= 60 / 50 <= upper[1]
+    with pytest.raises(ValueError):
+        ratio_bootstrap(1, 1, 0, 10, method="normal")
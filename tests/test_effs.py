@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from llptrig.effs import get_effs
+from llptrig.utils.ADThresholds import thresholds
+from llptrig.utils.TrigCache import TrigCache
+
+from conftest import read_branches
+
+@pytest.fixture
+def template(grid):
+    return grid.paths[(1, 10, 100)].replace("mMed-100", "mMed-{}")
+
+def assert_same(result, expected):
+    assert result[0] == expected[0]
+    assert result[1].tobytes() == expected[1].tobytes()
+    assert result[2] == expected[2]
+
+def test_get_effs_matches_numpy(grid, template):
+    unprescaled = grid.l1[:6] + ["L1_NotInFile"]
+    best, effs, hists = get_effs(template, 100, unprescaled)
+    data = read_branches(template.format(100), grid.l1[:6] + list(thresholds))
+    bits = np.column_stack([data[name] for name in grid.l1[:6]])
+    arg_best = int(np.argmax(bits.sum(axis=0)))
+    assert best == grid.l1[arg_best]
+    assert effs["L1"][0] == np.mean(bits.any(axis=1))
+    assert effs["best"][0] == np.mean(bits[:, arg_best])
+    for rate, cut in thresholds["axol1tl_score"].items():
+        ad = data["axol1tl_score"] >= cut
+        assert effs["axol1tl_score_AD@{}kHz".format(rate)][0] == np.mean(ad)
+        assert effs["axol1tl_score_best+AD@{}kHz".format(rate)][0] == np.mean(ad | bits[:, arg_best])
+        assert effs["axol1tl_score_L1+AD@{}kHz".format(rate)][0] == np.mean(ad | bits.any(axis=1))
+
+@pytest.mark.parametrize("step_size", [1000, 333, 2000, 5000, "20 kB"])
+def test_streaming_matches_single_read(grid, template, tmp_path, step_size):
+    expected = get_effs(template, 500, grid.l1)
+    assert_same(get_effs(template, 500, grid.l1, step_size=step_size), expected)
+    assert_same(get_effs(template, 500, grid.l1, cache=TrigCache(str(tmp_path)), step_size=step_size), expected)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+
+from llptrig.utils.LLPTrigUtils import compute_efficiencies
+from llptrig.utils.TrigMatrix import count_matrix
+from llptrig.utils.TrigCache import TrigCache
+
+from conftest import read_branches, brute_counts
+
+def run(grid, **kwargs):
+    interest = grid.l1[:2]
+    unprescaled = grid.l1[2::2]
+    return interest, unprescaled, compute_efficiencies(interest, grid.data_dir, grid.mMed_lst, grid.mDark_lst, grid.ctau_lst, grid.channel, "L1", unprescaled=unprescaled, **kwargs)
+
+def test_sample_engine_matches_numpy(grid):
+    interest, unprescaled, (effs, counts) = run(grid, return_counts=True)
+    for (ctau, mDark, mMed), path in grid.paths.items():
+        # the default entry_stop=-1 reads every event
+        data = read_branches(path, "L1_*")
+        expected = brute_counts(data, list(data), interest, unprescaled, interest)
+        i = grid.mMed_lst.index(mMed)
+        cell = effs[(ctau, mDark)]
+        # same layout as before the counts were kept
+        assert sorted(cell) == sorted(["L1", "best_name", "best"] + interest + ["best+" + trig for trig in interest])
+        assert cell["best_name"][i] == expected["best_name"]
+        assert counts[(ctau, mDark)]["denom"][i] == expected["denom"]
+        for name in ["best"] + interest + ["best+" + trig for trig in interest]:
+            assert cell[name][i] == expected[name] / expected["denom"], name
+            assert counts[(ctau, mDark)]["counts"][name][i] == expected[name], name
+
+def test_process_pool_matches_serial(grid):
+    serial = run(grid, return_counts=True)
+    assert run(grid, workers=2, return_counts=True) == serial
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        assert run(grid, executor=pool, return_counts=True) == serial
+
+def test_count_matrix_ties_and_exclusions():
+    matrix = np.array([[1, 1, 0, 1], [0, 1, 1, 1], [1, 0, 1, 0]], dtype=bool)
+    names = ["A", "B", "C", "D"]
+    # every path fires twice; B is excluded and D is prescaled, so C is the best
+    counts = count_matrix(matrix, names, ["A"], unprescaled=["B", "C"], exclude=["A", "B"])
+    assert counts == {"denom": 3, "best_name": "C", "best": 2, "A": 2, "best+A": 3}
+    with pytest.raises(ValueError):
+        count_matrix(matrix, names, ["A"], unprescaled=["A"], exclude=["A"])
+
+def test_cached_reads_match(grid, tmp_path):
+    cache = TrigCache(str(tmp_path / "cache"))
+    _, _, plain = run(grid)
+    for _ in range(2):
+        _, _, cached = run(grid, cache=cache)
+        assert plain == cached
+    assert len(cache.entries()) == len(grid.paths)
+    # another trigger list of the same files is served from the same entries
+    compute_efficiencies(grid.l1[3:5], grid.data_dir, grid.mMed_lst, grid.mDark_lst, grid.ctau_lst, grid.channel, "L1", unprescaled=grid.l1[6:], cache=cache)
+    assert len(cache.entries()) == len(grid.paths)
+
+def test_shared_read_pool_matches(grid):
+    assert run(grid, read_workers=2) == run(grid)
+
+@pytest.mark.parametrize("entry_stop", [-1, 500, None])
+def test_table_engine_matches_sample_engine(grid, entry_stop):
+    assert run(grid, entry_stop=entry_stop, engine="table") == run(grid, entry_stop=entry_stop)
@@ -0,0 +1,121 @@
+import warnings
+import numpy as np
+import pytest
+
+from llptrig.utils.Hists import Hist1D, Hist2D, as_hist, decode, encode
+from llptrig.utils import Kinematics
+
+EDGES = np.array([0.0, 1.0, 2.5, 3.0, 5.0])
+
+def values(seed, n=1000):
+    values = np.random.default_rng(seed).normal(2.5, 2.0, n)
+    # values on every edge, the last one included in the last bin, and NaN
+    return np.concatenate([values, EDGES, EDGES, [np.nan, np.nan, np.nan]])
+
+def test_fill_matches_np_histogram():
+    data = values(0)
+    hist = Hist1D(EDGES)
+    for chunk in np.array_split(data, 7):
+        hist.fill(chunk)
+    expected, _ = np.histogram(data[np.isfinite(data)], EDGES)
+    np.testing.assert_array_equal(hist.counts, expected)
+    assert hist.counts.dtype == np.int64
+    assert hist.underflow == np.count_nonzero(data < EDGES[0])
+    # NaN goes to the overflow
+    assert hist.overflow == np.count_nonzero(data > EDGES[-1]) + 3
+    assert hist.total(flow=True) == len(data)
+
+def test_weighted_fill_matches_np_histogram():
+    data = values(1)
+    weights = np.random.default_rng(2).random(len(data))
+    hist = Hist1D(EDGES, weighted=True).fill(data, weights)
+    finite = np.isfinite(data)
+    np.testing.assert_allclose(hist.counts, np.histogram(data[finite], EDGES, weights=weights[finite])[0])
+    np.testing.assert_allclose(hist.overflow, weights[~finite | (data > EDGES[-1])].sum())
+    with pytest.raises(ValueError):
+        Hist1D(EDGES).fill(data, weights)
+
+def test_density_matches_np_histogram():
+    data = values(3)
+    hist = Hist1D(EDGES).fill(data)
+    np.testing.assert_allclose(hist.density(), np.histogram(data[np.isfinite(data)], EDGES, density=True)[0])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        np.testing.assert_array_equal(Hist1D(EDGES).fill([-1.0, 10.0]).density(), np.zeros(4))
+
+def test_merging():
+    parts = [Hist1D(EDGES).fill(values(seed)) for seed in range(3)]
+    full = Hist1D(EDGES).fill(np.concatenate([values(seed) for seed in range(3)]))
+    assert parts[0] + parts[1] + parts[2] == full
+    assert sum(parts) == full
+    # + leaves its operands alone
+    assert parts[0] == Hist1D(EDGES).fill(values(0))
+    weighted = parts[0] + Hist1D(EDGES, weighted=True).fill([0.5], [0.25])
+    assert weighted.weighted and weighted.counts[0] == parts[0].counts[0] + 0.25
+    with pytest.raises(ValueError):
+        parts[0] + Hist1D(EDGES[:-1])
+    x, y = values(4, 500)[:500], values(5, 500)[:500]
+    hist2d = Hist2D(EDGES, EDGES[:3]).fill(x[:200], y[:200]) + Hist2D(EDGES, EDGES[:3]).fill(x[200:], y[200:])
+    assert hist2d == Hist2D(EDGES, EDGES[:3]).fill(x, y)
+    assert sum([hist2d, hist2d]).total() == 2 * hist2d.total()
+
+def test_hists_are_not_hashable():
+    with pytest.raises(TypeError):
+        {Hist1D(EDGES)}
+    with pytest.raises(TypeError):
+        {Hist2D(EDGES, EDGES)}
+
+def test_rebin():
+    hist = Hist1D.regular(6, 0.0, 6.0).fill(np.concatenate([np.arange(6) + 0.5, [-1.0, 0.5, 7.0, np.nan]]))
+    merged = hist.rebin(2)
+    np.testing.assert_array_equal(merged.edges, [0, 2, 4, 6])
+    np.testing.assert_array_equal(merged.counts, [3, 2, 2])
+    assert (merged.underflow, merged.overflow) == (1, 2)
+    # bins cut away at either end move to the flow
+    subset = hist.rebin([1.0, 2.0, 5.0])
+    np.testing.assert_array_equal(subset.counts, [1, 3])
+    assert (subset.underflow, subset.overflow) == (1 + 2, 2 + 1)
+    assert subset.total(flow=True) == hist.total(flow=True)
+    with pytest.raises(ValueError):
+        hist.rebin(4)
+    with pytest.raises(ValueError):
+        hist.rebin([0.0, 2.5, 6.0])
+
+def test_hist2d_fill_rebin_and_project():
+    x, y = np.random.default_rng(6).normal(2.5, 2.0, (2, 1000))
+    hist = Hist2D(EDGES, [0.0, 1.0, 2.0, 3.0, 4.0]).fill(x, y)
+    expected, _, _ = np.histogram2d(x, y, [EDGES, [0.0, 1.0, 2.0, 3.0, 4.0]])
+    np.testing.assert_array_equal(hist.counts, expected)
+    assert hist.project("x") == Hist1D(EDGES, expected.sum(axis=1))
+    assert hist.project("y") == Hist1D([0.0, 1.0, 2.0, 3.0, 4.0], expected.sum(axis=0))
+    with pytest.raises(ValueError):
+        hist.project("z")
+    rebinned = hist.rebin(2, [1.0, 3.0])
+    np.testing.assert_array_equal(rebinned.counts, [[expected[0:2, 1:3].sum()], [expected[2:4, 1:3].sum()]])
+
+def test_encode_decode_round_trip():
+    hist = Hist1D(EDGES).fill(values(7))
+    assert decode(*encode(hist)) == hist
+    hist2d = Hist2D(EDGES, EDGES[:3]).fill(*np.random.default_rng(8).random((2, 100)) * 3)
+    assert decode(*encode(hist2d)) == hist2d
+    # np.histogram pairs are stored with empty flow
+    counts, edges = np.histogram(values(9)[:1000], EDGES)
+    assert decode(*encode((counts, edges))) == Hist1D(edges, counts)
+    # histograms stored before the flow was kept have one count per bin
+    assert decode(counts.astype(np.int64).tobytes(), edges.tobytes()) == Hist1D(edges, counts)
+    with pytest.raises(ValueError):
+        encode(Hist1D(EDGES, weighted=True))
+
+def test_dict_layout_round_trip():
+    hist = Hist1D(EDGES).fill(values(10))
+    assert as_hist(hist.to_dict()) == hist
+    hist2d = Hist2D(EDGES, EDGES).fill([0.5, 4.0], [1.5, 2.7])
+    assert as_hist(hist2d.to_dict()) == hist2d
+
+def test_optional_branches_only_with_variables():
+    available = ["Jet_pt", "Jet_eta"]
+    assert Kinematics.branches(["HT", "lead_jet_pt"], available) == ["Jet_pt", "Jet_eta"]
+    assert Kinematics.branches(["HT"], ["Jet_pt"]) == ["Jet_pt"]
+    assert Kinematics.branches([], available) == []
+    with pytest.raises(ValueError):
+        Kinematics.branches(["HT"], ["Jet_eta"])
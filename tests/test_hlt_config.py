@@ -0,0 +1,67 @@
+import csv
+import pytest
+
+from llptrig.utils.HLTConfig import read_prescales, cached_prescales, read_menus, write_prescales, parse_statement
+
+CONFIG = '''import FWCore.ParameterSet.Config as cms
+
+process = cms.Process( "HLT" )
+
+process.HLTConfigVersion = cms.PSet(
+  tableName = cms.string( "{table}" )
+)
+process.hltPSet = cms.PSet( prescaleTable = cms.string( "not this one" ) )
+process.PrescaleService = cms.Service( "PrescaleService",
+    lvl1Labels = cms.vstring( '2p0E34',
+      '1p4E34' ),
+    lvl1DefaultLabel = cms.string( "2p0E34" ),
+    forceDefault = cms.bool( False ),
+    prescaleTable = cms.VPSet(
+      cms.PSet(  pathName = cms.string( "HLT_A_v1" ),
+        prescales = cms.vuint32( 1, 2 )
+      ),
+      cms.PSet(  pathName = cms.string( "HLT_B_v3" ), prescales = cms.vuint32( *[0, 5] ) ),
+    )
+)
+process.HLT_A_v1 = cms.Path( process.hltA )
+'''
+
+def write_config(path, table="/dev/CMSSW_14_0_0/GRun/V1"):
+    path.write_text(CONFIG.format(table=table))
+    return str(path)
+
+def test_read_prescales(tmp_path):
+    menu, table = read_prescales(write_config(tmp_path / "hlt.py"))
+    assert menu == "/dev/CMSSW_14_0_0/GRun/V1"
+    assert table.names == ["HLT_A_v1", "HLT_B_v3"]
+    assert table.columns == ["2p0E34", "1p4E34"]
+    assert table.prescales.tolist() == [[1, 2], [0, 5]]
+
+def test_parse_statement():
+    assert parse_statement("x = cms.PSet( a = cms.vint32( 1, *[2, 3] ), b = cms.untracked.bool( True ) )") == {"a": [1, 2, 3], "b": True}
+
+def test_missing_service(tmp_path):
+    path = tmp_path / "empty.py"
+    path.write_text("process = None\n")
+    with pytest.raises(ValueError):
+        read_prescales(str(path))
+
+def test_cache_and_combined_table(tmp_path):
+    first = write_config(tmp_path / "v1.py")
+    second = write_config(tmp_path / "v2.py", table="/dev/CMSSW_14_0_0/GRun/V2")
+    cache_dir = str(tmp_path / "cache")
+    assert cached_prescales(first, cache_dir)[1].prescales.tolist() == cached_prescales(first, cache_dir)[1].prescales.tolist()
+    tables = read_menus([first, second], cache_dir)
+    assert list(tables) == ["/dev/CMSSW_14_0_0/GRun/V1", "/dev/CMSSW_14_0_0/GRun/V2"]
+    out = str(tmp_path / "table.csv")
+    write_prescales(tables, out)
+    with open(out, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["Menu", "Name", "2p0E34", "1p4E34"]
+    assert rows[1:3] == [["/dev/CMSSW_14_0_0/GRun/V1", "HLT_A_v1", "1", "2"], ["/dev/CMSSW_14_0_0/GRun/V1", "HLT_B_v3", "0", "5"]]
+
+def test_menu_name_collision(tmp_path):
+    first = write_config(tmp_path / "a.py")
+    second = write_config(tmp_path / "b.py")
+    with pytest.raises(ValueError, match="a.py and .*b.py"):
+        read_menus([first, second])
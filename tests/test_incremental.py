@@ -0,0 +1,83 @@
+import os
+import shutil
+import pytest
+
+from llptrig import effs
+from llptrig.utils import LLPTrigUtils
+from llptrig.utils.LLPTrigUtils import compute_efficiencies
+from llptrig.utils.ResultsStore import ResultsStore
+
+@pytest.fixture
+def data_dir(grid, tmp_path):
+    # a copy of the grid, whose files can be touched
+    return shutil.copytree(grid.data_dir, str(tmp_path / "grid"))
+
+def record_calls(monkeypatch, module, name):
+    calls = []
+    func = getattr(module, name)
+    def recording(*args, **kwargs):
+        calls.append(args)
+        return func(*args, **kwargs)
+    monkeypatch.setattr(module, name, recording)
+    return calls
+
+def touch(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+def test_incremental_recomputes_stale_samples_and_triggers(grid, data_dir, tmp_path, monkeypatch):
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+    unprescaled = grid.l1[2::2]
+    def run(interest, **kwargs):
+        return compute_efficiencies(interest, data_dir, grid.mMed_lst, grid.mDark_lst, grid.ctau_lst, grid.channel, "L1", unprescaled=unprescaled, **kwargs)
+    calls = record_calls(monkeypatch, LLPTrigUtils, "sample_counts")
+    interest = grid.l1[:2]
+    full = run(interest, store=store, incremental=True, return_counts=True)
+    assert len(calls) == 4
+    assert sorted(store.fingerprints("L1", grid.channel, 1, 10, 100)) == sorted(["best"] + interest)
+
+    # nothing changed
+    del calls[:]
+    assert run(interest, store=store, incremental=True, return_counts=True) == full
+    assert calls == []
+
+    # one sample file changed: only that sample is recomputed, from scratch
+    del calls[:]
+    path = os.path.join(data_dir, os.path.basename(grid.paths[(100, 10, 500)]))
+    touch(path)
+    assert run(interest, store=store, incremental=True, return_counts=True) == full
+    assert [(call[0], call[1]) for call in calls] == [(path, interest)]
+    assert len(calls[0]) == 7
+
+    # a new interest trigger, which is not a candidate for the best trigger: only its cells are computed
+    del calls[:]
+    interest = interest + [grid.l1[3]]
+    assert run(interest, store=store, incremental=True, return_counts=True) == run(interest, return_counts=True)
+    recomputed = calls[:len(calls) // 2]
+    assert len(recomputed) == 4 and all(call[1] == [grid.l1[3]] for call in recomputed)
+    # the best trigger is taken from the store instead of being searched again
+    assert [call[7] for call in recomputed] == [full[0][(ctau, mDark)]["best_name"][grid.mMed_lst.index(mMed)] for ctau, mDark, mMed in grid.paths]
+
+def test_incremental_signals_recompute_stale_masses(grid, data_dir, tmp_path, monkeypatch):
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+    template = os.path.join(data_dir, os.path.basename(grid.paths[(1, 10, 100)]).replace("mMed-100", "mMed-{}"))
+    signal = {"name": "s", "channel": "s", "ctau": 1, "mDark": 10, "masses": grid.mMed_lst, "template": template}
+    calls = record_calls(monkeypatch, effs, "count_effs")
+    effs.get_effs_sig(signal, grid.l1[2::2], store=store, tag="t", incremental=True)
+    first = {key: signal[key] for key in ["counts", "hists"]}
+    assert [call[1] for call in calls] == grid.mMed_lst
+
+    del calls[:]
+    effs.get_effs_sig(signal, grid.l1[2::2], store=store, tag="t", incremental=True)
+    assert calls == [] and {key: signal[key] for key in ["counts", "hists"]} == first
+
+    touch(template.format(500))
+    effs.get_effs_sig(signal, grid.l1[2::2], store=store, tag="t", incremental=True)
+    assert [call[1] for call in calls] == [500] and signal["counts"] == first["counts"]
+
+def test_incremental_needs_a_store(grid):
+    signal = {"name": "s", "channel": "s", "ctau": 1, "mDark": 10, "masses": grid.mMed_lst, "template": grid.paths[(1, 10, 100)]}
+    with pytest.raises(ValueError, match="results store"):
+        effs.get_effs_sig(signal, grid.l1[2::2], incremental=True)
+    with pytest.raises(ValueError, match="results store"):
+        compute_efficiencies(grid.l1[:2], grid.data_dir, grid.mMed_lst, grid.mDark_lst, grid.ctau_lst, grid.channel, "L1", incremental=True)
@@ -0,0 +1,78 @@
+import io
+import json
+import pytest
+import uproot
+
+from llptrig.utils import Instrument
+from llptrig.utils.Instrument import stage, timed, count
+
+@pytest.fixture
+def recorder():
+    recorder = Instrument.enable()
+    yield recorder
+    Instrument.disable()
+
+@timed
+def work(n):
+    with stage("inner"):
+        count("items", n)
+    return n
+
+def test_disabled_records_nothing(tmp_path):
+    assert not Instrument.enabled()
+    with stage("outer"):
+        count("items", 3)
+    assert work(2) == 2
+    assert Instrument.summary() == []
+    out = io.StringIO()
+    Instrument.report(out)
+    assert "No stages recorded" in out.getvalue()
+    with pytest.raises(RuntimeError):
+        Instrument.write_trace(str(tmp_path / "trace.json"))
+
+def test_nested_stages_and_counters(recorder):
+    with stage("outer"):
+        count("items")
+        assert work(2) == 2
+        assert work(3) == 3
+    rows = {row["stage"]: row for row in Instrument.summary()}
+    assert list(rows) == ["outer", "outer/work", "outer/work/inner"]
+    assert [rows[path]["calls"] for path in rows] == [1, 2, 2]
+    # counters belong to the innermost open stage only
+    assert rows["outer"]["items"] == 1 and "items" not in rows["outer/work"] and rows["outer/work/inner"]["items"] == 5
+    assert rows["outer"]["wall_s"] >= rows["outer/work"]["wall_s"] >= rows["outer/work/inner"]["wall_s"] >= 0
+    assert all(row["max_rss_mb"] > 0 for row in rows.values())
+
+def test_write_trace(recorder, tmp_path):
+    with stage("outer"):
+        work(2)
+        work(3)
+    path = tmp_path / "trace.json"
+    Instrument.write_trace(str(path))
+    trace = json.loads(path.read_text())
+    assert trace["summary"] == json.loads(json.dumps(Instrument.summary()))
+    events = trace["traceEvents"]
+    assert [(event["name"], event["cat"]) for event in events] == [("inner", "outer/work/inner"), ("work", "outer/work")] * 2 + [("outer", "outer")]
+    # each event carries the counts of its own call
+    assert [event["args"].get("items") for event in events if event["name"] == "inner"] == [2, 3]
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+    outer = events[-1]
+    assert all(outer["ts"] <= event["ts"] and event["ts"] + event["dur"] <= outer["ts"] + outer["dur"] + 1e-3 for event in events)
+
+def test_reads_count_bytes_requests_and_events(grid, recorder):
+    path = grid.paths[(1, 10, 100)]
+    with uproot.open(path) as f:
+        with stage("load"):
+            arrays = Instrument.read_arrays(f["Events"], filter_name="L1_*", library="np")
+        with stage("stream"):
+            chunks = list(Instrument.iterate_arrays(f["Events"], ["axol1tl_score"], step_size=500, library="np"))
+    assert len(arrays["L1_Test0"]) == 2000 and len(chunks) == 4
+    rows = {row["stage"]: row for row in Instrument.summary()}
+    # the events of a chunk, not the number of branches read with library="np"
+    assert rows["load/read"]["events"] == rows["stream/read"]["events"] == 2000
+    assert rows["stream/read"]["calls"] == 5
+    for path in ["load/read", "stream/read"]:
+        assert rows[path]["bytes_read"] > 0 and rows[path]["read_requests"] > 0
+    out = io.StringIO()
+    Instrument.report(out)
+    assert [line.split()[0] for line in out.getvalue().splitlines()[1:]] == list(rows)
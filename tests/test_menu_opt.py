@@ -0,0 +1,55 @@
+import itertools
+import numpy as np
+import pytest
+
+from llptrig.utils.TrigBits import PackedMenu
+from llptrig.utils.MenuOpt import MenuProblem, greedy_menu, exact_menu
+
+NAMES = ["P{}".format(i) for i in range(8)]
+
+@pytest.fixture
+def menus():
+    rng = np.random.default_rng(7)
+    menus = {}
+    for sample, n in enumerate([300, 517]):
+        # correlated paths, so that the best pair is not the two best singles
+        base = rng.random((n, 3)) < 0.2
+        bits = np.column_stack([base[:, i % 3] | (rng.random(n) < 0.05 * i) for i in range(len(NAMES))])
+        menus[sample] = PackedMenu.from_matrix(bits, NAMES)
+    return menus
+
+def mean_efficiency(menus, names):
+    return np.mean([np.count_nonzero(np.logical_or.reduce([menu.unpack(menu.row(name)) for name in names])) / menu.num_entries for menu in menus.values()])
+
+def best_subset(menus, k, rates=None, budget=None):
+    subsets = [s for r in range(1, k + 1) for s in itertools.combinations(NAMES, r) if budget is None or sum(rates[n] for n in s) <= budget]
+    return max(mean_efficiency(menus, s) for s in subsets)
+
+def test_problem_value_and_gains(menus):
+    problem = MenuProblem(menus)
+    empty = np.zeros(problem.bits.shape[1], dtype=np.uint64)
+    np.testing.assert_allclose(problem.gains(empty), [mean_efficiency(menus, [name]) for name in NAMES])
+    assert problem.value(problem.bits[0] | problem.bits[3]) == pytest.approx(mean_efficiency(menus, ["P0", "P3"]))
+
+@pytest.mark.parametrize("k", [1, 2, 3])
+def test_exact_matches_brute_force(menus, k):
+    report = exact_menu(menus, k)
+    assert len(report) <= k
+    assert report[-1][2] == pytest.approx(best_subset(menus, k))
+    assert report[-1][2] == pytest.approx(mean_efficiency(menus, [name for name, _, _ in report]))
+
+def test_greedy_report(menus):
+    report = greedy_menu(menus, 3)
+    values = [value for _, _, value in report]
+    assert report[0][2] == pytest.approx(best_subset(menus, 1))
+    assert values == sorted(values)
+    assert values[-1] <= best_subset(menus, 3) + 1e-12
+    np.testing.assert_allclose(np.cumsum([gain for _, gain, _ in report]), values)
+
+def test_rate_budget(menus):
+    rates = {name: 1.0 + i for i, name in enumerate(NAMES)}
+    report = exact_menu(menus, 3, rates=rates, rate_budget=6.0)
+    assert sum(rates[name] for name, _, _ in report) <= 6.0
+    assert report[-1][2] == pytest.approx(best_subset(menus, 3, rates, 6.0))
+    greedy = greedy_menu(menus, 3, rates=rates, rate_budget=6.0, per_rate=True)
+    assert sum(rates[name] for name, _, _ in greedy) <= 6.0
@@ -0,0 +1,43 @@
+import matplotlib.pyplot as plt
+import pytest
+
+from llptrig.utils.LLPTrigPlotting import plot_efficiencies, plot_improvements, render_pdf
+
+MMED = [100, 300, 500]
+TRIGS = ["L1_A", "L1_B"]
+
+def effs_dict():
+    effs = {}
+    for i, key in enumerate([(1, 10), (100, 10)]):
+        cell = {"best": [0.2 + i / 10, 0.3, 0.4], "best_name": ["L1_C"] * 3}
+        for j, trig in enumerate(TRIGS):
+            cell[trig] = [0.1 * j + 0.05 * k for k in range(3)]
+            cell["best+" + trig] = [0.5 + 0.1 * j, 0.6, 0.7 - i / 10]
+        effs[key] = cell
+    return effs
+
+@pytest.mark.parametrize("plot", [plot_efficiencies, plot_improvements])
+def test_pooled_rendering_matches_serial(plot, tmp_path):
+    outputs = []
+    for workers in [None, 2]:
+        plot(effs_dict(), MMED, [1, 100], [10], TRIGS, outdir=str(tmp_path), outfname="page{}".format(workers), savefig=True, workers=workers)
+        outputs.append((tmp_path / "page{}.pdf".format(workers)).read_bytes())
+    assert outputs[0] == outputs[1]
+
+def draw_with_backend(backends):
+    backends.append(plt.get_backend().lower())
+    return plt.subplots()
+
+def test_serial_rendering_uses_agg(tmp_path):
+    plt.switch_backend("pdf")
+    backends = []
+    try:
+        render_pdf(draw_with_backend, [(backends,)], str(tmp_path / "out.pdf"))
+        assert backends == ["agg"]
+        assert plt.get_backend().lower() == "pdf"
+    finally:
+        plt.switch_backend("Agg")
+
+def test_cleandir_is_deprecated(tmp_path):
+    with pytest.deprecated_call():
+        plot_efficiencies(effs_dict(), MMED, [1], [10], TRIGS, outdir=str(tmp_path), outfname="out", cleandir=True)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from llptrig.effs import count_effs
+from llptrig.utils.TrigBits import PackedMenu
+from llptrig.utils.Prescales import PrescaleTable, pass_probability, weighted_counts
+
+@pytest.fixture
+def table():
+    # prescale 0 disables a path in that column
+    return PrescaleTable(["A", "B", "C", "D"], ["2E34", "1E34"], [[1, 1], [2, 0], [4, 2], [0, 3]])
+
+def test_from_csv(tmp_path):
+    path = tmp_path / "ps.csv"
+    path.write_text("Menu,Name,2E34,1E34\nv1,A,1,2\nv1,B,0,1\nv2,A,5,\n")
+    v1 = PrescaleTable.from_csv(str(path), menu="v1")
+    assert v1.names == ["A", "B"] and v1.columns == ["2E34", "1E34"]
+    assert v1.unprescaled("2E34") == ["A"] and v1.unprescaled("1E34") == ["B"]
+    v2 = PrescaleTable.from_csv(str(path), menu="v2")
+    assert v2.columns == ["2E34"] and v2.column("2E34").tolist() == [5]
+    with pytest.raises(ValueError):
+        PrescaleTable.from_csv(str(path))
+
+def test_pass_probability_matches_product(table):
+    rng = np.random.default_rng(5)
+    bits = rng.random((130, 4)) < 0.3
+    menu = PackedMenu.from_matrix(bits, table.names)
+    weights = table.weights()
+    expected = 1 - np.prod(np.where(bits[:, :, None], 1 - weights[None], 1), axis=1)
+    np.testing.assert_allclose(pass_probability(menu, weights, block_words=1), expected, atol=1e-12)
+    mask = menu.pack(np.arange(130) % 7 == 0)
+    kept = pass_probability(menu, weights, mask=mask)
+    assert np.all(kept[::7] == 1)
+    counts = weighted_counts(menu, table)
+    assert counts["2E34"] == pytest.approx(expected[:, 0].sum())
+
+def test_weighted_effs_without_enabled_paths(grid):
+    template = grid.paths[(1, 10, 100)].replace("mMed-100", "mMed-{}")
+    # none of the paths of the table is in the file, so the menu keeps no event
+    table = PrescaleTable(["HLT_NotThere"], ["2E34", "1E34"], [[1, 2]])
+    counts = count_effs(template, 100, grid.l1[:3], prescales=table, columns=table.columns)
+    np.testing.assert_array_equal(counts.pass_ps, [0, 0])
+    for rate, kept in counts.pass_ps_ad["axol1tl_score"].items():
+        np.testing.assert_array_equal(kept, [counts.pass_ad["axol1tl_score"][rate]] * 2)
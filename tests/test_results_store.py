@@ -0,0 +1,83 @@
+import numpy as np
+
+from llptrig.plots import load_signals
+from llptrig.utils.Hists import Hist1D, Hist2D
+from llptrig.utils.LLPTrigUtils import compute_efficiencies
+from llptrig.utils.ResultsStore import ResultsStore
+
+def make_signal(name, ctau, masses, seed):
+    rng = np.random.default_rng(seed)
+    counts, results, hists = {}, [], {"axol1tl_score": {}, "axol1tl_score:pt": {}}
+    for mass in masses:
+        denom = int(rng.integers(500, 1000))
+        numers = {"best": int(rng.integers(0, denom)), "best+AD": int(rng.integers(0, denom)), "L1@1kHz": float(rng.random() * denom)}
+        counts[mass] = dict(denom=denom, best_name="L1_Test{}".format(mass % 7), **numers)
+        results.append((mass,) + tuple(numer / denom for numer in numers.values()))
+        hist = Hist1D.regular(5, 0.0, 10.0)
+        hist.fill(rng.normal(5.0, 4.0, 100))
+        hists["axol1tl_score"][mass] = hist
+        hist2d = Hist2D.regular(3, (0.0, 10.0), 2, (0.0, 1.0))
+        hist2d.fill(rng.random(50) * 10, rng.random(50))
+        hists["axol1tl_score:pt"][mass] = hist2d
+    dtype = {"names": ["mass", "best", "best+AD", "L1@1kHz"], "formats": ["f8"] * 4}
+    return {"name": name, "legname": name, "channel": "s", "ctau": ctau, "mDark": 10, "masses": masses, "xlabel": "m",
+            "results": np.array(results, dtype), "hists": hists, "counts": counts}
+
+def assert_same_signal(stored, signal, keys, rtol=0):
+    for key in keys:
+        if key == "results":
+            assert stored["results"].dtype.names == signal["results"].dtype.names
+            for name in signal["results"].dtype.names:
+                np.testing.assert_allclose(stored["results"][name], signal["results"][name], rtol=rtol)
+        else:
+            assert stored[key] == signal[key], key
+
+def test_effs_dict_round_trip(grid, tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+    interest = grid.l1[:2]
+    effs, counts = compute_efficiencies(interest, grid.data_dir, grid.mMed_lst, grid.mDark_lst, grid.ctau_lst, grid.channel, "L1", unprescaled=grid.l1[2::2], store=store, return_counts=True)
+    assert store.effs_dict("L1", grid.channel, interest, "L1", return_counts=True) == (effs, counts)
+    assert store.effs_dict("L1", grid.channel, interest, "L1", ctau_lst=[100]) == {key: effs[key] for key in effs if key[0] == 100}
+    assert store.samples("L1") == [(grid.channel, ctau, mDark, mMed) for ctau in grid.ctau_lst for mDark in grid.mDark_lst for mMed in grid.mMed_lst]
+
+def test_signal_round_trip(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite"))
+    signals = [make_signal("a", 1, [100, 500], 0), make_signal("b", 100, [100, 300, 500], 1)]
+    for signal in signals:
+        store.put_signal("tag", signal)
+    # an upsert replaces the results of a signal but keeps its position
+    signals[0] = make_signal("a", 1, [100, 500], 2)
+    store.put_signal("tag", signals[0])
+    stored = store.signals("tag")
+    assert [signal["name"] for signal in stored] == ["a", "b"]
+    for got, signal in zip(stored, signals):
+        assert_same_signal(got, signal, signal.keys())
+        # prescale-weighted numerators stay floats
+        assert all(isinstance(counts["L1@1kHz"], float) for counts in got["counts"].values())
+    assert store.hists("tag", "s", 100, 10) == signals[1]["hists"]
+    assert store.signals("other") == []
+
+def test_plots_load_store_like_legacy_module(tmp_path):
+    signals = [make_signal("a", 1, [100, 500], 0), make_signal("b", 100, [100, 300, 500], 1)]
+    store = ResultsStore(str(tmp_path / "trigger_eff_results_new.sqlite"))
+    for signal in signals:
+        store.put_signal("new", signal)
+    store.close()
+    # the module written by older versions: np.histogram-style hists and no counts
+    legacy = []
+    for signal in signals:
+        signal = {key: val for key, val in signal.items() if key != "counts"}
+        signal["hists"] = {"axol1tl_score": {mass: (hist.counts, hist.edges) for mass, hist in signal["hists"]["axol1tl_score"].items()}}
+        legacy.append(signal)
+    (tmp_path / "trigger_eff_results_old.py").write_text("from numpy import array\nsignals = " + repr(legacy))
+
+    new, old = load_signals("new", path=str(tmp_path)), load_signals("old", path=str(tmp_path))
+    assert len(new) == len(old) == len(signals)
+    for got_new, got_old, signal in zip(new, old, signals):
+        # the module keeps the 8 significant digits of the numpy repr
+        assert_same_signal(got_new, got_old, ["name", "legname", "channel", "ctau", "mDark", "masses", "xlabel", "results"], rtol=1e-7)
+        assert_same_signal(got_new, signal, ["counts", "hists"])
+        for mass, (counts, edges) in got_old["hists"]["axol1tl_score"].items():
+            hist = got_new["hists"]["axol1tl_score"][mass]
+            np.testing.assert_array_equal(hist.counts, counts)
+            np.testing.assert_array_equal(hist.edges, edges)
@@ -0,0 +1,67 @@
+import os
+import pytest
+
+from llptrig.effs import count_effs
+from llptrig.grid import make_tasks, run_grid_task, reduce_grid
+from llptrig.utils.Scheduler import WorkDir, LocalBackend, FakeBackend, CondorBackend, run_checkpointed, task_command
+from llptrig.utils.ResultsStore import ResultsStore
+
+from conftest import SRC
+
+@pytest.fixture
+def workdir(grid, tmp_path):
+    prescales = tmp_path / "ps.csv"
+    prescales.write_text("Name,2E34\n" + "".join("{},{}\n".format(name, 1 + i % 2) for i, name in enumerate(grid.l1)))
+    template = grid.paths[(1, 10, 100)].replace("mMed-100", "mMed-{}")
+    signals = [{"name": "s", "legname": "s", "channel": "s", "ctau": 1, "mDark": 10, "masses": grid.mMed_lst, "template": template, "xlabel": "m"}]
+    config = {"signals": signals, "prescales": str(prescales), "menu": None, "column": "2E34", "weighted": None,
+              "thresholds": None, "cache": None, "cache_size": 1, "step_size": None}
+    workdir = WorkDir(str(tmp_path / "work"))
+    workdir.create(config, make_tasks(signals))
+    return workdir
+
+def fail_on_500(config, task):
+    if task["mass"] == 500: raise RuntimeError("broken task")
+    return run_grid_task(config, task)
+
+def test_checkpoints_and_resume(workdir):
+    task_ids = [task["id"] for task in workdir.manifest()["tasks"]]
+    with pytest.raises(RuntimeError):
+        for task_id in task_ids:
+            run_checkpointed(fail_on_500, workdir.path, task_id)
+    assert workdir.status() == {task_ids[0]: "done", task_ids[1]: "failed"}
+    assert workdir.todo() == [task_ids[1]]
+    with pytest.raises(RuntimeError):
+        reduce_grid(workdir, "grid", path=os.path.dirname(workdir.path))
+    # resubmitting only runs what is not done, and a success clears the error
+    assert LocalBackend(run_grid_task, workers=1).submit(workdir, workdir.todo()) == []
+    assert set(workdir.status().values()) == {"done"}
+
+def test_fake_backend_runs_the_batch_command(workdir, monkeypatch):
+    # the jobs run `python -m llptrig grid run-task` in subprocesses, which need to find the package
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(filter(None, [SRC, os.environ.get("PYTHONPATH")])))
+    task_ids = [task["id"] for task in workdir.manifest()["tasks"]]
+    backend = FakeBackend(task_command("llptrig", "grid"), fail=[task_ids[0]])
+    assert backend.submit(workdir, task_ids) == [task_ids[0]]
+    assert workdir.status() == {task_ids[0]: "failed", task_ids[1]: "done"}
+    assert os.path.exists(os.path.join(workdir.path, "submit.jdl"))
+    assert FakeBackend(task_command("llptrig", "grid")).submit(workdir, workdir.todo()) == []
+
+    signal = reduce_grid(workdir, "grid", path=os.path.dirname(workdir.path))[0]
+    stored = ResultsStore(os.path.join(os.path.dirname(workdir.path), "trigger_eff_results_grid.sqlite")).signals("grid")[0]
+    config = workdir.manifest()["config"]
+    unprescaled = [line.split(",")[0] for line in open(config["prescales"]).read().splitlines()[1:] if line.endswith(",1")]
+    for i, mass in enumerate(signal["masses"]):
+        counts = count_effs(signal["template"], mass, unprescaled)
+        best, numers = counts.numerators()
+        assert stored["counts"][mass] == dict(denom=counts.denom, best_name=best, **numers)
+        assert stored["results"]["mass"][i] == mass
+
+def test_condor_submit_file(workdir):
+    command = task_command("llptrig", "grid")
+    assert command[1:] == ["-m", "llptrig", "grid", "run-task"]
+    path = CondorBackend(command, requirements="OpSysMajorVer == 9", dry_run=True).submit_file(workdir, ["a", "b"])
+    lines = open(path).read().splitlines()
+    assert "arguments = -m llptrig grid run-task {} $(task_id)".format(workdir.path) in lines
+    assert "requirements = OpSysMajorVer == 9" in lines
+    assert open(os.path.join(workdir.path, "task_ids.txt")).read().split() == ["a", "b"]
@@ -0,0 +1,53 @@
+import os
+import pytest
+
+from llptrig.effs import get_effs
+from llptrig.utils.LLPTrigUtils import compute_efficiencies
+from llptrig.utils.Staging import Stager
+
+def run(grid, **kwargs):
+    return compute_efficiencies(grid.l1[:2], grid.data_dir, grid.mMed_lst, grid.mDark_lst, grid.ctau_lst, grid.channel, "L1", unprescaled=grid.l1[2::2], **kwargs)
+
+@pytest.mark.parametrize("engine", ["sample", "table"])
+def test_staged_runs_match_and_stay_under_the_cap(grid, tmp_path, monkeypatch, engine):
+    sizes = [os.path.getsize(path) for path in grid.paths.values()]
+    max_bytes = 2 * max(sizes)
+    assert max_bytes < sum(sizes)
+    staged, totals = [], []
+    stage = Stager._stage
+    def counting_stage(self, path):
+        staged.append(path)
+        local = stage(self, path)
+        totals.append(sum(size for _, size, _ in self.staged()))
+        return local
+    monkeypatch.setattr(Stager, "_stage", counting_stage)
+
+    with Stager(str(tmp_path / "scratch"), max_bytes=max_bytes, prefetch=1, workers=1) as stager:
+        effs = run(grid, stager=stager, engine=engine)
+    assert effs == run(grid, engine=engine)
+    assert sorted(staged) == sorted(grid.paths.values())
+    assert max(totals) <= max_bytes
+
+def test_copies_are_reused_across_runs(grid, tmp_path, monkeypatch):
+    path = grid.paths[(1, 10, 100)]
+    with Stager(str(tmp_path)) as stager:
+        local = stager.get(path)
+    # a later run finds the copy with a matching fingerprint of the source and does not copy again
+    monkeypatch.setattr("shutil.copyfile", lambda *args: pytest.fail("copied twice"))
+    with Stager(str(tmp_path)) as stager:
+        assert stager.get(path) == local
+        with stager.open(path) as f:
+            assert f["Events"].num_entries == 2000
+        assert f.closed
+    assert len(stager.staged()) == 1
+
+@pytest.mark.parametrize("step_size", [None, 500])
+def test_staged_signal_reads_close_their_files(grid, tmp_path, opened, step_size):
+    template = grid.paths[(1, 10, 100)].replace("mMed-100", "mMed-{}")
+    expected = [get_effs(template, mass, grid.l1[:6], step_size=step_size) for mass in grid.mMed_lst]
+    with Stager(str(tmp_path)) as stager:
+        stager.plan([template.format(mass) for mass in grid.mMed_lst])
+        for mass, (best, effs, hists) in zip(grid.mMed_lst, expected):
+            result = get_effs(template, mass, grid.l1[:6], step_size=step_size, stager=stager)
+            assert result[0] == best and result[1].tobytes() == effs.tobytes() and result[2] == hists
+    assert len(opened) == 2 * len(grid.mMed_lst) and all(f.closed for f in opened)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from llptrig.utils.ADThresholds import TailSketch, derive_thresholds, save_thresholds, load_thresholds
+
+from conftest import read_branches
+
+def brute_cut(scores, fraction):
+    """Smallest observed score whose cut keeps at most k events, or just above the largest if none does."""
+    k = max(int(np.floor(fraction * len(scores))), 1)
+    finite = scores[np.isfinite(scores)]
+    kept = [cut for cut in np.unique(finite) if np.count_nonzero(finite >= cut) <= k]
+    return kept[0] if kept else np.nextafter(finite.max(), np.inf)
+
+def test_sketch_matches_sort_across_chunks_and_merges():
+    scores = np.random.default_rng(0).exponential(size=10000)
+    sketch, left, right = TailSketch(60), TailSketch(60), TailSketch(60)
+    for i, chunk in enumerate(np.array_split(scores, 7)):
+        sketch.update(chunk)
+        (left if i % 2 else right).update(chunk)
+    merged = left.merge(right)
+    for fraction in [1e-4, 1e-3, 5e-3]:
+        assert sketch.cut(fraction) == brute_cut(scores, fraction) == merged.cut(fraction)
+    with pytest.raises(ValueError):
+        sketch.cut(0.5)
+
+def test_sketch_ignores_non_finite_scores():
+    scores = np.random.default_rng(1).random(1000)
+    scores[::50] = np.nan
+    scores[1] = np.inf
+    sketch = TailSketch(20)
+    sketch.update(scores)
+    assert np.all(np.isfinite(sketch.values))
+    # events without a finite score still count in the denominator
+    assert sketch.count == 1000
+    assert sketch.cut(0.01) == np.sort(scores[np.isfinite(scores)])[::-1][9] == brute_cut(scores, 0.01)
+
+def test_ties_never_exceed_the_target_rate():
+    # 5 events at 3, 10 at 2 and 85 at 1
+    scores = np.repeat([3.0, 2.0, 1.0], [5, 10, 85])
+    sketch = TailSketch(50)
+    sketch.update(np.random.default_rng(2).permutation(scores))
+    for fraction, cut in [(0.05, 3.0), (0.1, 3.0), (0.15, 2.0), (0.45, 2.0)]:
+        assert sketch.cut(fraction) == cut == brute_cut(scores, fraction)
+        assert np.count_nonzero(scores >= cut) <= fraction * len(scores)
+    # the top scores are all tied, so no cut keeps a single event
+    sketch = TailSketch(10)
+    sketch.update(np.repeat([2.0, 1.0], [3, 97]))
+    assert sketch.cut(0.01) > 2.0
+
+def test_derive_thresholds_round_trip(grid, tmp_path, opened):
+    files = sorted(grid.paths.values())
+    ad_key = "axol1tl_score"
+    bx_rate = 1000.0
+    with pytest.warns(UserWarning, match="missing_score"):
+        table = derive_thresholds(files, [ad_key, "missing_score"], [5, 20], bx_rate_khz=bx_rate, step_size=300)
+    assert list(table) == [ad_key]
+    assert len(opened) == len(files) and all(f.closed for f in opened)
+    scores = np.concatenate([read_branches(f, [ad_key])[ad_key] for f in files]).astype(np.float64)
+    assert table[ad_key] == {5: brute_cut(scores, 5 / bx_rate), 20: brute_cut(scores, 20 / bx_rate)}
+    # the synthetic scores are rounded, so ties at the cut are likely
+    for rate, cut in table[ad_key].items():
+        assert np.count_nonzero(scores >= cut) / len(scores) * bx_rate <= rate
+    save_thresholds(table, str(tmp_path / "thresholds.json"))
+    assert load_thresholds(str(tmp_path / "thresholds.json")) == table
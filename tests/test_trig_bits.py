@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from llptrig.utils.TrigBits import PackedMenu, pack
+
+NAMES = ["A", "B", "C"]
+
+@pytest.mark.parametrize("n", [0, 1, 63, 64, 65, 200])
+def test_queries_match_boolean_arrays(n):
+    matrix = np.random.default_rng(n).random((n, 3)) < [0.1, 0.5, 0.9]
+    menu = PackedMenu.from_matrix(matrix, NAMES)
+    assert len(menu) == n and "B" in menu and "D" not in menu
+    np.testing.assert_array_equal(menu.counts(), matrix.sum(axis=0))
+    np.testing.assert_array_equal(menu.unpack(menu.row("B")), matrix[:, 1])
+    np.testing.assert_array_equal(menu.unpack(menu.any(NAMES)), matrix.any(axis=1))
+    np.testing.assert_array_equal(menu.unpack(menu.all(["A", "C"])), matrix[:, 0] & matrix[:, 2])
+    # the padding bits of the last word stay clear under the negation
+    assert menu.count(menu.andnot(["C"], ["A", "B"])) == np.count_nonzero(matrix[:, 2] & ~matrix[:, 0] & ~matrix[:, 1])
+    assert menu.count(menu.pack(matrix[:, 0])) == menu.counts(["A"])[0]
+
+def test_pack_pads_the_last_word():
+    words = pack(np.ones(65, dtype=bool))
+    assert words.dtype == np.uint64 and len(words) == 2
+    assert words[1] == 1 << 7
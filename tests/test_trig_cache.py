@@ -0,0 +1,75 @@
+import os
+import shutil
+import numpy as np
+import pytest
+
+from llptrig.utils.TrigCache import TrigCache, memory_size
+
+from conftest import read_branches
+
+@pytest.fixture
+def path(grid):
+    return grid.paths[(1, 10, 100)]
+
+def test_arrays_match_uproot(path, tmp_path):
+    cache = TrigCache(str(tmp_path))
+    # 1001 entries, so that the packed bits do not end on a byte boundary
+    expected = read_branches(path, ["L1_*", "axol1tl_score"], entry_stop=1001)
+    for _ in range(2):
+        data = cache.arrays(path, ["L1_*", "axol1tl_score"], entry_stop=1001, library="np")
+        assert list(data) == list(expected)
+        for name in expected:
+            np.testing.assert_array_equal(data[name], expected[name])
+    assert len(cache.entries()) == 1
+    assert cache.arrays(path, ["L1_*", "axol1tl_score"], entry_stop=1001).fields == list(expected)
+    names = list(expected)[3:5]
+    assert list(cache.arrays(path, ["L1_*", "axol1tl_score"], entry_stop=1001, library="np", columns=names)) == names
+    with pytest.raises(ValueError):
+        cache.arrays(path, ["L1_*", "axol1tl_score"], entry_stop=1001, columns=["Jet_pt"])
+    with pytest.raises(ValueError):
+        cache.arrays(path, "Jet_pt")
+
+@pytest.mark.parametrize("step_size", [1, 7, 64, 333, "3 kB", "1 KiB"])
+def test_iterate_chunks(path, tmp_path, step_size):
+    cache = TrigCache(str(tmp_path))
+    full = cache.arrays(path, ["L1_*"], library="np")
+    names = list(full)[:4]
+    chunks = list(cache.iterate(path, ["L1_*"], columns=names, step_size=step_size, library="np"))
+    if isinstance(step_size, int):
+        assert all(len(chunk[names[0]]) == step_size for chunk in chunks[:-1])
+    else:
+        # size strings are converted with the unpacked width of the selected columns, one byte per bit
+        assert len(chunks[0][names[0]]) == memory_size(step_size) // len(names)
+    for name in names:
+        np.testing.assert_array_equal(np.concatenate([chunk[name] for chunk in chunks]), full[name])
+
+def test_memory_size():
+    assert memory_size("100 MB") == 100 * 1000**2
+    assert memory_size("2MiB") == 2 * 1024**2
+    assert memory_size("512") == 512
+    with pytest.raises(ValueError):
+        memory_size("lots")
+
+def test_cache_misses_close_the_source(path, tmp_path, opened):
+    cache = TrigCache(str(tmp_path))
+    cache.arrays(path, "L1_*", entry_stop=10)
+    cache.arrays(path, "L1_*", entry_stop=10)
+    assert len(opened) == 1 and opened[0].closed
+
+def test_changed_source_is_read_again(path, tmp_path):
+    source = str(tmp_path / "source.root")
+    shutil.copyfile(path, source)
+    cache = TrigCache(str(tmp_path / "cache"))
+    cache.arrays(source, "L1_*")
+    os.utime(source, ns=(0, 0))
+    cache.arrays(source, "L1_*")
+    assert len(cache.entries()) == 2
+
+def test_eviction_keeps_the_newest_entry(path, tmp_path):
+    cache = TrigCache(str(tmp_path), max_bytes=1)
+    for entry_stop in [10, 20, 30]:
+        cache.arrays(path, "L1_*", entry_stop=entry_stop)
+    assert len(cache.entries()) == 1
+    assert cache.arrays(path, "L1_*", entry_stop=30, library="np")["L1_Test0"].shape == (30,)
+    cache.clear()
+    assert cache.entries() == []
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from llptrig.utils.TrigBits import PackedMenu
+from llptrig.utils.TrigExpr import ExprEvaluator, compile_expr, evaluate, expr_branches
+
+EXPRS = [
+    "A",
+    "A | B",
+    "B | A | C",
+    "A & ~B",
+    "(A | B) & (C | D)",
+    "A ^ B ^ A",
+    "(score >= 0.7) | D",
+    "0.3 > score",
+    "any(A, B, C) & ~all(C, D)",
+    "(A | B) & (score != 0.5) | True",
+]
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(3)
+    # 203 events, so that the last packed word is partly filled
+    columns = {name: rng.random(203) < rate for name, rate in zip("ABCD", [0.1, 0.3, 0.5, 0.02])}
+    columns["score"] = rng.random(203)
+    return columns
+
+def numpy_eval(expr, data):
+    funcs = {"any": lambda *a: np.logical_or.reduce(a), "all": lambda *a: np.logical_and.reduce(a)}
+    result = eval(expr, funcs, dict(data))
+    return np.broadcast_to(result, len(data["A"]))
+
+@pytest.mark.parametrize("expr", EXPRS)
+def test_matches_numpy(data, expr):
+    evaluator = ExprEvaluator(data)
+    expected = numpy_eval(expr, data)
+    np.testing.assert_array_equal(evaluator.mask(expr), expected)
+    assert evaluator.count(expr) == np.count_nonzero(expected)
+
+def test_packed_menu_and_batch(data):
+    menu = PackedMenu.from_arrays(data, list("ABCD"))
+    counts = evaluate(data, EXPRS, menu)
+    assert counts == {expr: int(np.count_nonzero(numpy_eval(expr, data))) for expr in EXPRS}
+
+def test_canonical_trees_and_memo(data):
+    assert compile_expr("A | B") == compile_expr("B | A") == compile_expr("any(B, A, B)")
+    assert compile_expr("(A | B) | C") == compile_expr("A | (C | B)")
+    assert compile_expr("score < 1") == compile_expr("1 > score")
+    evaluator = ExprEvaluator(data)
+    evaluator.counts(["A | B | C", "A | B | D"])
+    # the sorted prefix A | B is computed once
+    assert evaluator.hits > 0
+
+def test_branches_and_errors():
+    assert expr_branches(["L1_A | (axol1tl_score >= 734.8)", "~HLT_X & L1_A"]) == ["L1_A", "axol1tl_score", "HLT_X"]
+    with pytest.raises(ValueError):
+        compile_expr("A + B")
+    with pytest.raises(ValueError):
+        compile_expr("score >= other")
@@ -0,0 +1,118 @@
+import csv
+import numpy as np
+import pytest
+
+from llptrig.utils.TrigOverlap import SampleOverlap, aggregate_overlaps, cofire_counts, compute_overlaps, write_overlaps
+
+from conftest import read_branches, brute_counts
+
+# events x paths A, B, C: A alone twice, B alone once, A and B twice, B and C once, all three once, none once
+MATRIX = np.array([
+    [1, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0], [1, 1, 0], [0, 1, 1], [1, 1, 1], [0, 0, 0],
+], dtype=bool)
+
+@pytest.mark.parametrize("block_bytes", [1, 4 * 3 * 7, 4 * 3 * 8, 1 << 26])
+@pytest.mark.parametrize("num_events", [0, 56, 1000])
+def test_cofire_counts_match_matrix_product(block_bytes, num_events):
+    # blocks of 1, 7 or 8 rows: 56 events fill the last block exactly, 1000 leave a partial one for 7
+    matrix = np.random.default_rng(0).random((num_events, 3)) < [0.1, 0.5, 0.9]
+    np.testing.assert_array_equal(cofire_counts(matrix, block_bytes), matrix.astype(np.int64).T @ matrix.astype(np.int64))
+
+def test_hand_built_overlap():
+    overlap = SampleOverlap.from_matrix(MATRIX, ["A", "B", "C"], reference=["A"])
+    np.testing.assert_array_equal(overlap.cofire, [[5, 3, 1], [3, 5, 2], [1, 2, 2]])
+    assert overlap.denom == 8
+    np.testing.assert_array_equal(overlap.counts, [5, 5, 2])
+    # |A and B| / |A or B|
+    np.testing.assert_allclose(overlap.jaccard(), [[1, 3 / 7, 1 / 6], [3 / 7, 1, 2 / 5], [1 / 6, 2 / 5, 1]])
+    np.testing.assert_allclose(overlap.conditional(), [[1, 3 / 5, 1 / 5], [3 / 5, 1, 2 / 5], [1 / 2, 1, 1]])
+    np.testing.assert_array_equal(overlap.unique, [2, 1, 0])
+    np.testing.assert_allclose(overlap.unique_acceptance(), [2 / 8, 1 / 8, 0])
+    # events without A: B fires in 2 of them, C in 1
+    np.testing.assert_array_equal(overlap.gain, [0, 2, 1])
+    np.testing.assert_allclose(overlap.marginal_gain(), [0, 2 / 8, 1 / 8])
+    np.testing.assert_allclose(overlap.marginal_gain("B"), [2 / 8, 0, 0])
+    with pytest.raises(ValueError):
+        overlap.marginal_gain(["B", "C"])
+    sub = overlap.subset(["C", "A"])
+    np.testing.assert_array_equal(sub.cofire, [[2, 1], [1, 5]])
+    np.testing.assert_array_equal(sub.gain, [1, 0])
+
+def test_jaccard_of_paths_that_never_fire():
+    overlap = SampleOverlap.from_matrix(np.zeros((4, 2), dtype=bool), ["A", "B"])
+    np.testing.assert_array_equal(overlap.jaccard(), np.zeros((2, 2)))
+    np.testing.assert_array_equal(overlap.conditional(), np.zeros((2, 2)))
+
+def test_merge_equals_overlap_of_all_events():
+    matrix = np.random.default_rng(1).random((300, 4)) < 0.3
+    names = ["A", "B", "C", "D"]
+    parts = [SampleOverlap.from_matrix(part, names, ["D"]) for part in np.array_split(matrix, [50, 51, 200])]
+    merged, full = SampleOverlap.merge(parts), SampleOverlap.from_matrix(matrix, names, ["D"])
+    for attr in ["cofire", "unique", "gain"]:
+        np.testing.assert_array_equal(getattr(merged, attr), getattr(full, attr))
+    assert merged.denom == full.denom == 300 and merged.reference == ["D"]
+    with pytest.raises(ValueError):
+        SampleOverlap.merge([parts[0], SampleOverlap.from_matrix(matrix, names, ["C"])])
+
+def test_aggregate_with_best_reference_matches_brute_force(grid):
+    trigs = grid.l1[:3]
+    unprescaled = grid.l1[3::2]
+    overlaps = compute_overlaps(grid.data_dir, grid.mMed_lst, grid.mDark_lst, grid.ctau_lst, grid.channel, "L1", trigs, reference="best", unprescaled=unprescaled, entry_stop=None)
+    matrices = {}
+    for key, path in grid.paths.items():
+        data = read_branches(path, "L1_*")
+        best = brute_counts(data, list(data), [], unprescaled, trigs)["best_name"]
+        assert overlaps[key].best_name == best and overlaps[key].names == trigs + [best]
+        matrices[key] = np.column_stack([data[name] for name in trigs + [best]])
+    for by, groups in [((), {(): list(grid.paths)}), (("ctau",), {(ctau,): [key for key in grid.paths if key[0] == ctau] for ctau in grid.ctau_lst})]:
+        aggregated = aggregate_overlaps(overlaps, by=by)
+        assert list(aggregated) == list(groups)
+        for group, keys in groups.items():
+            expected = SampleOverlap.from_matrix(np.concatenate([matrices[key] for key in keys]), trigs + ["best"], ["best"])
+            assert aggregated[group].names == expected.names and aggregated[group].reference == ["best"]
+            for attr in ["cofire", "unique", "gain", "denom"]:
+                np.testing.assert_array_equal(getattr(aggregated[group], attr), getattr(expected, attr))
+
+def test_write_overlaps(tmp_path):
+    overlaps = {
+        (1, 10): SampleOverlap.from_matrix(MATRIX, ["A", "B", "C"], ["A"]),
+        "all": SampleOverlap.from_matrix(MATRIX[:5, :2], ["A", "B"]),
+    }
+    write_overlaps(overlaps, str(tmp_path / "overlaps.csv"))
+    with open(tmp_path / "overlaps.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 9 + 4
+    row = next(row for row in rows if row["key"] == "1/10" and row["path_a"] == "B" and row["path_b"] == "C")
+    assert row == {"key": "1/10", "path_a": "B", "path_b": "C", "denom": "8", "cofire": "2", "jaccard": str(2 / 5),
+                   "p_b_given_a": str(2 / 5), "count_a": "5", "unique_a": "1", "gain_a": "2"}
+    assert {row["key"] for row in rows} == {"1/10", "all"}
+
+    write_overlaps(overlaps, str(tmp_path / "overlaps.npz"))
+    with np.load(tmp_path / "overlaps.npz") as arrays:
+        for n, (key, overlap) in enumerate(overlaps.items()):
+            assert arrays["keys_{}".format(n)].tolist() == [str(value) for value in (key if isinstance(key, tuple) else (key,))]
+            assert arrays["names_{}".format(n)].tolist() == overlap.names
+            for attr in ["cofire", "unique", "gain", "denom"]:
+                np.testing.assert_array_equal(arrays["{}_{}".format(attr, n)], getattr(overlap, attr))
+
+def test_effs_command_writes_overlaps(grid, tmp_path):
+    from llptrig import cli
+    template = grid.paths[(1, 10, 100)].replace("mMed-100", "mMed-{}")
+    signals = [{"name": "s", "legname": "s", "channel": "s", "ctau": 1, "mDark": 10, "masses": grid.mMed_lst, "template": template, "xlabel": "m"}]
+    (tmp_path / "signals.py").write_text("signals = {!r}".format(signals))
+    # every other seed is unprescaled, and one of them is not in the files
+    (tmp_path / "ps.csv").write_text("Name,2E34\n" + "".join("{},{}\n".format(name, 1 + i % 2) for i, name in enumerate(grid.l1 + ["L1_Missing"])))
+    unprescaled = grid.l1[::2]
+    args = ["effs", "-s", str(tmp_path / "signals.py"), "-o", "t", "-m", str(tmp_path / "ps.csv"), "-p", str(tmp_path)]
+    cli.main(args + ["--overlaps", str(tmp_path / "all.npz")])
+    cli.main(args + ["--overlaps", str(tmp_path / "some.npz"), "--overlap-trigs", grid.l1[0], grid.l1[1]])
+    with np.load(tmp_path / "all.npz") as everything, np.load(tmp_path / "some.npz") as some:
+        for n, mass in enumerate(grid.mMed_lst):
+            data = read_branches(template.format(mass), "L1_*")
+            best = brute_counts(data, list(data), [], unprescaled, grid.l1[:2])["best_name"]
+            for arrays, names, reference in [(everything, unprescaled, None), (some, grid.l1[:2] + [best], [best])]:
+                assert arrays["keys_{}".format(n)].tolist() == ["s", "1", "10", str(mass)]
+                assert arrays["names_{}".format(n)].tolist() == names
+                expected = SampleOverlap.from_matrix(np.column_stack([data[name] for name in names]), names, reference or ())
+                for attr in ["cofire", "unique", "gain", "denom"]:
+                    np.testing.assert_array_equal(arrays["{}_{}".format(attr, n)], getattr(expected, attr))
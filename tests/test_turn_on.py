@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from llptrig.utils.LLPTrigUtils import compute_efficiencies
+from llptrig.utils.TurnOn import TurnOn, compute_turn_ons, sample_turn_on
+
+from conftest import read_branches
+
+EDGES = np.array([0, 50, 100, 200, 400, 1e9])
+
+def brute_turn_on(path, paths, reference=None):
+    data = read_branches(path, ["Jet_pt", "L1_*"])
+    ht = np.array([pt[pt > 30].sum() for pt in data["Jet_pt"]], dtype=np.float64)
+    keep = np.ones(len(ht), dtype=bool) if reference is None else data[reference]
+    passed = [np.logical_or.reduce([data[name] for name in path.split(" | ")]) for path in paths]
+    denom = np.histogram(ht[keep], EDGES)[0]
+    numer = np.array([np.histogram(ht[keep & p], EDGES)[0] for p in passed])
+    return numer, denom
+
+@pytest.mark.parametrize("reference", [None, "L1_Test0"])
+def test_turn_ons_match_numpy(grid, reference):
+    paths = ["L1_Test1", "L1_Test2 | L1_Test3"]
+    turn_ons = compute_turn_ons(grid.data_dir, grid.mMed_lst, grid.mDark_lst, grid.ctau_lst, grid.channel, paths, "HT", edges=EDGES, reference=reference, entry_stop=None)
+    assert sorted(turn_ons) == sorted(grid.paths)
+    for sample, turn_on in turn_ons.items():
+        numer, denom = brute_turn_on(grid.paths[sample], paths, reference)
+        np.testing.assert_array_equal(turn_on.denom, denom)
+        np.testing.assert_array_equal(turn_on.numer, numer)
+
+def test_merge_and_round_trip():
+    first = TurnOn("HT", [0, 1, 2], ["A"]).fill([0.5, 1.5, 1.5], [[True], [False], [True]])
+    second = TurnOn("HT", [0, 1, 2], ["A"]).fill([0.5], [[False]])
+    total = sum([first, second])
+    np.testing.assert_array_equal(total.denom, [2, 2])
+    np.testing.assert_array_equal(total.efficiency("A"), [0.5, 0.5])
+    assert TurnOn.from_dict(total.to_dict()).to_dict() == total.to_dict()
+    with pytest.raises(ValueError):
+        first + TurnOn("HT", [0, 2], ["A"])
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_default_entry_stop_matches_efficiencies(grid, workers):
+    # entry_stop=-1, the default here and in compute_efficiencies, reads every event
+    turn_ons = compute_turn_ons(grid.data_dir, grid.mMed_lst, grid.mDark_lst, grid.ctau_lst, grid.channel, ["L1_Test1"], "HT", edges=[0, 1e9], workers=workers)
+    counts = compute_efficiencies(["L1_Test1"], grid.data_dir, grid.mMed_lst, grid.mDark_lst, grid.ctau_lst, grid.channel, "L1", unprescaled=grid.l1[2:], return_counts=True)[1]
+    for (ctau, mDark, mMed), turn_on in turn_ons.items():
+        assert turn_on.denom.sum() == counts[(ctau, mDark)]["denom"][grid.mMed_lst.index(mMed)] == 2000
+        assert turn_on.numer.sum() == counts[(ctau, mDark)]["counts"]["L1_Test1"][grid.mMed_lst.index(mMed)]
+
+def test_sample_turn_on_opens_the_file_once(grid, opened):
+    path = grid.paths[(1, 10, 100)]
+    turn_on = sample_turn_on(path, ["L1_Test1"], "HT", EDGES, entry_stop=None)
+    assert len(opened) == 1 and opened[0].closed
+    numer, denom = brute_turn_on(path, ["L1_Test1"])
+    np.testing.assert_array_equal(turn_on.denom, denom)
+    np.testing.assert_array_equal(turn_on.numer, numer)
+    with pytest.raises(ValueError, match="L1_Missing"):
+        sample_turn_on(path, ["L1_Missing"], "HT", EDGES)